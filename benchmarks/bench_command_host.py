@@ -0,0 +1,56 @@
+"""Time one short command spawned per call against the same command sent to a long-lived CommandHost.
+
+    python -m benchmarks.bench_command_host [--calls 500] [--netsh]
+
+Reports the p50 and p95 per call for a process per call, a shell per call and a hosted shell. With --netsh
+it also times 'interface ipv4 show interfaces' spawned against the shared netsh host, and an unknown
+command through the host (the framing cost alone); netsh must be on PATH.
+"""
+import argparse
+import shutil
+import time
+
+from core import NETSH_DIALECT, SHELL_DIALECT, CommandHost, run_command
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def report(label, call, calls):
+    timings = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - started) * 1000)
+    print(f"{label:<32} p50 {percentile(timings, 0.5):7.2f} ms  p95 {percentile(timings, 0.95):7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--netsh", action="store_true", help="also time netsh, which must be on PATH")
+    args = parser.parse_args()
+
+    host = CommandHost(SHELL_DIALECT)
+    host.run("true")  # Leave the start out of the timings
+    report("spawn echo", lambda: run_command("bench", ["echo", "hi"]), args.calls)
+    report("spawn echo via shell=True", lambda: run_command("bench", "echo hi", shell=True), args.calls)
+    report("hosted echo", lambda: host.run("echo hi"), args.calls)
+    host.close()
+
+    if args.netsh:
+        if shutil.which("netsh") is None:
+            parser.error("netsh is not on PATH")
+        command = "interface ipv4 show interfaces"
+        host = CommandHost(NETSH_DIALECT)
+        host.run(command)
+        report("spawn netsh", lambda: run_command("bench", ["netsh", *command.split()]), args.calls)
+        report("hosted netsh", lambda: host.run(command), args.calls)
+        report("hosted unknown command", lambda: host.run("nothing"), args.calls)
+        host.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Sample interface counters at 10 Hz and report what the sampling thread costs.
+
+    python -m benchmarks.bench_counters [--seconds 10] [--interval 0.1] [--simulated 16]
+
+Runs CounterSampler once over this machine's counter source (/proc/net/dev or GetIfTable2) and once over
+--simulated made-up interfaces, and reports the sampling thread's CPU time as a share of one core. Then
+times single reads of the machine's source.
+"""
+import argparse
+import time
+
+from core import CounterSampler, SimulatedCounterSource, select_counter_source
+
+
+def run(label, source, interval, seconds):
+    sampler = CounterSampler(source, interval)
+    sampler.start()
+    time.sleep(seconds)
+    sampler.stop()
+    print(f"{label:<28} {sampler.rounds:5} rounds, {len(sampler.interfaces()):3} interfaces, "
+          f"{sampler.cpu_percent():.2f}% of one core")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--interval", type=float, default=0.1)
+    parser.add_argument("--simulated", type=int, default=16)
+    parser.add_argument("--reads", type=int, default=10000)
+    args = parser.parse_args()
+
+    source = select_counter_source()
+    if source is not None:
+        run(type(source).__name__, source, args.interval, args.seconds)
+    else:
+        print("No counter source on this machine")
+    simulated = SimulatedCounterSource({f"Ethernet {index + 1}": (1_000_000 * (index + 1), 100_000)
+                                        for index in range(args.simulated)})
+    run(f"{args.simulated} simulated NICs", simulated, args.interval, args.seconds)
+
+    if source is not None:
+        started = time.perf_counter()
+        for _ in range(args.reads):
+            source.read()
+        print(f"{(time.perf_counter() - started) / args.reads * 1e6:.1f} us per {type(source).__name__} read")
+        source.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Run a fleet query against many simulated hosts with different worker counts, cold and with pooled connections.
+
+    python -m benchmarks.bench_fleet [--hosts 200] [--workers 1 8 64] [--query inventory]
+
+Every host is a FakeHost with --latency seconds per command and --connect-latency seconds to connect. A cold
+run opens every connection; the pooled run repeats it on the same executor. --failures then runs --failure-hosts
+hosts, one hanging, one slow and one refusing connections, with a --timeout second deadline per host.
+"""
+import argparse
+import math
+import time
+
+from fleet import FLEET_QUERIES, FakeTransport, FleetExecutor, fleet_summary
+
+
+def timed_run(executor, hosts, operation):
+    started = time.perf_counter()
+    results = executor.run(hosts, operation)
+    return time.perf_counter() - started, fleet_summary(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hosts", type=int, default=200)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--query", choices=sorted(FLEET_QUERIES), default="inventory")
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--connect-latency", type=float, default=0.1)
+    parser.add_argument("--failures", action="store_true", help="also time a run with failing hosts")
+    parser.add_argument("--failure-hosts", type=int, default=500)
+    parser.add_argument("--timeout", type=float, default=2.0)
+    args = parser.parse_args()
+
+    operation = FLEET_QUERIES[args.query]
+    hosts = [f"host{index}" for index in range(args.hosts)]
+    print(f"{args.hosts} hosts, {args.latency * 1000:g} ms per command, {args.connect_latency * 1000:g} ms connect, "
+          f"{args.query}")
+    print(f"{'workers':>8}  {'cold':>9}  {'pooled':>9}")
+    for workers in args.workers:
+        transport = FakeTransport(hosts, args.latency, args.connect_latency)
+        executor = FleetExecutor(transport, max_workers=workers)
+        cold, summary = timed_run(executor, hosts, operation)
+        pooled, _ = timed_run(executor, hosts, operation)
+        executor.close()
+        assert summary['ok'] == args.hosts, summary['failed']
+        print(f"{workers:>8}  {cold:>8.2f}s  {pooled:>8.2f}s")
+
+    if args.failures:
+        hosts = [f"host{index}" for index in range(args.failure_hosts)]
+        transport = FakeTransport(hosts, args.latency, args.connect_latency, down=hosts[2:3],
+                                  host_latency={hosts[0]: math.inf, hosts[1]: args.timeout})
+        executor = FleetExecutor(transport, max_workers=max(args.workers), timeout=args.timeout)
+        elapsed, summary = timed_run(executor, hosts, operation)
+        executor.close()
+        print(f"{args.failure_hosts} hosts with one hanging, one slow and one refusing, {args.timeout:g}s timeout: "
+              f"{elapsed:.2f}s, {summary['ok']} ok")
+        for host, error in summary['failed'].items():
+            print(f"  {host}: {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Fill a HistoryStore with days of ping and traffic samples, then time the queries and a retention pass.
+
+    python -m benchmarks.bench_history [--pings 2000000] [--hosts 20] [--counters 500000] [--days 10]
+
+Samples are spread evenly over the last --days days. Reports the write rate through the writer thread, the
+cost of one add call, the file size, three History tab queries and the retention pass that rolls up
+everything older than HISTORY_RAW_DAYS.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from core import COUNTER_FIELDS, PingRecord
+from history import HISTORY_RAW_DAYS, HistoryStore
+
+DAY = 86400
+
+
+def raw_samples(path):
+    with sqlite3.connect(path) as connection:
+        return sum(connection.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+                   for table in ("ping_samples", "counter_samples"))
+
+
+def timed(label, function):
+    started = time.perf_counter()
+    value = function()
+    print(f"{label:<44} {(time.perf_counter() - started) * 1000:9.1f} ms")
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pings", type=int, default=2000000)
+    parser.add_argument("--hosts", type=int, default=20)
+    parser.add_argument("--counters", type=int, default=500000)
+    parser.add_argument("--interfaces", type=int, default=4)
+    parser.add_argument("--days", type=float, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    generator = random.Random(args.seed)
+    hosts = [f"10.0.0.{index + 1}" for index in range(args.hosts)]
+    interfaces = [f"Ethernet {index + 1}" for index in range(args.interfaces)]
+    now = time.time()
+    start = now - args.days * DAY
+    replies = [PingRecord(0, generator.uniform(1, 80), 64, "success") for _ in range(1000)]
+    timeout = PingRecord(0, None, None, "timeout")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "history.sqlite3")
+        store = HistoryStore(path).start()
+        added = 0.0
+        started = time.perf_counter()
+        ping_step = args.days * DAY * len(hosts) / max(args.pings, 1)
+        for index in range(args.pings):
+            record = timeout if generator.random() < 0.05 else replies[index % len(replies)]
+            call = time.perf_counter()
+            store.add_ping(hosts[index % len(hosts)], record, when=start + index * ping_step / len(hosts))
+            added += time.perf_counter() - call
+            if index % 100000 == 99999:
+                store.flush()  # Keep the producer from outrunning the writer's queue
+        counter_step = args.days * DAY / max(args.counters // len(interfaces), 1)
+        for index in range(args.counters // len(interfaces)):
+            rates = [generator.uniform(0, 1e6) for _ in COUNTER_FIELDS]
+            call = time.perf_counter()
+            store.add_counters({name: rates for name in interfaces}, when=start + index * counter_step)
+            added += time.perf_counter() - call
+            if index % 25000 == 24999:
+                store.flush()
+        store.close()
+        elapsed = time.perf_counter() - started
+        records = store.written + store.dropped
+        print(f"{store.written} records written in {elapsed:.1f}s: {store.written / elapsed:,.0f} records/s, "
+              f"{added / records * 1e6:.1f} us per add, {store.dropped} dropped")
+        print(f"file size {os.path.getsize(path) / 1e6:.0f} MB")
+
+        host = hosts[0]
+        rows = timed("one host's raw samples over an hour", lambda: store.ping_samples(host, now - 3600, now))
+        print(f"{'':44} {len(rows)} rows")
+        timed("one host over a day in minute buckets", lambda: store.ping_summary(host, now - DAY, now, 60))
+        timed("one host over 10 days in hour buckets", lambda: store.ping_summary(host, now - 10 * DAY, now, 3600))
+        timed("one interface over a day in minute buckets",
+              lambda: store.counter_summary(interfaces[0], now - DAY, now, 60))
+
+        raw = raw_samples(path)
+        timed(f"retention pass (raw kept {HISTORY_RAW_DAYS} days)", lambda: store.maintain(now=now))
+        print(f"{'':44} {raw - raw_samples(path)} samples rolled up")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
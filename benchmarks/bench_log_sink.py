@@ -0,0 +1,81 @@
+"""Push many lines into a LogSink from a worker thread and time it, offscreen.
+
+    python -m benchmarks.bench_log_sink [--lines 1000000]
+
+Reports the wall time until the last line is shown, the peak RSS, the view's block count, and the gaps
+between ticks of a 1 ms timer on the GUI thread (how long the event loop was held up).
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QApplication, QPlainTextEdit
+
+from main import LogSink
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return float("nan")
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # kB on Linux
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=1000000)
+    args = parser.parse_args()
+
+    app = QApplication([])
+    view = QPlainTextEdit()
+    view.setReadOnly(True)
+    view.show()
+    spill_dir = tempfile.TemporaryDirectory()
+    sink = LogSink(view, "bench")
+    sink.spill_path = os.path.join(spill_dir.name, "spill.log")
+
+    ticks = []
+    ticker = QTimer()
+    ticker.setInterval(1)
+    ticker.timeout.connect(lambda: ticks.append(time.perf_counter()))
+    ticker.start()
+
+    last = f"line {args.lines - 1}"
+    started = time.perf_counter()
+    writer = threading.Thread(target=lambda: [sink.append(f"line {number}") for number in range(args.lines)])
+    writer.start()
+
+    def finish():
+        if writer.is_alive() or not view.toPlainText().endswith(last):
+            return
+        elapsed = time.perf_counter() - started
+        gaps = [(b - a) * 1000 for a, b in zip(ticks, ticks[1:])]
+        print(f"{args.lines} lines in {elapsed:.2f}s, peak RSS {peak_rss_mb():.0f} MB, "
+              f"{view.blockCount()} blocks shown")
+        print(f"event loop gaps: p50 {percentile(gaps, 0.5):.0f} ms, p99 {percentile(gaps, 0.99):.0f} ms, "
+              f"max {max(gaps):.0f} ms")
+        app.quit()
+
+    checker = QTimer()
+    checker.setInterval(50)
+    checker.timeout.connect(finish)
+    checker.start()
+    app.exec_()
+    if sink._spill_file is not None:
+        sink._spill_file.close()
+    spill_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
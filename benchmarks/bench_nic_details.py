@@ -0,0 +1,48 @@
+"""get_all_nic_details() against one 'netsh interface ipv4 show config <name>' after another.
+
+    python -m benchmarks.bench_nic_details [--delay 0.2] [--workers 8]
+
+netsh is stood in for by a call that sleeps --delay seconds and answers with the recorded Ethernet block
+from tests/fixtures, so the numbers show the scheduling and not this machine's process start time.
+"""
+import argparse
+import time
+from unittest import mock
+
+import core
+from core import get_all_nic_details, query_nic_config
+from tests.fakes import read_fixture
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--delay", type=float, default=0.2, help="seconds each netsh call takes")
+    parser.add_argument("--workers", type=int, default=core.NIC_DETAILS_WORKERS)
+    args = parser.parse_args()
+
+    output = read_fixture("show_config.txt").split("\n\n")[0] + "\n\n"
+
+    def run_netsh(kind, command):
+        time.sleep(args.delay)
+        return output if command[-1] == "config" or command[-1].startswith("Ethernet") else ""
+
+    with mock.patch.object(core, "run_netsh", run_netsh), mock.patch.object(core, "netsh_host_enabled",
+                                                                             lambda: False):
+        print(f"{'adapters':>8}{'serial':>9}{'parallel':>10}")
+        for count in (4, 16, 32):
+            names = [f"Ethernet {number}" for number in range(count)]
+            started = time.perf_counter()
+            for name in names:
+                query_nic_config(name)
+            serial = time.perf_counter() - started
+
+            core.netsh_snapshot.invalidate()
+            started = time.perf_counter()
+            details, errors = get_all_nic_details(names, args.workers)
+            parallel = time.perf_counter() - started
+            assert len(details) == count and not errors
+            print(f"{count:>8}{serial:>8.2f}s{parallel:>9.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Parser throughput in MB/s on large synthetic outputs shaped like the recorded ones in tests/fixtures.
+
+    python -m benchmarks.bench_parsers [--lines 200000] [--repeat 5]
+
+Each output is built by repeating the data rows of a fixture with new names and addresses until it has
+about --lines lines. The best of --repeat runs is reported, with the time to parse the fixture itself.
+"""
+import argparse
+import os
+import time
+
+from parsers import parse_configs, parse_interfaces, parse_route_print, parse_subinterfaces
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests", "fixtures")
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def address(number):
+    return f"10.{number >> 16 & 255}.{number >> 8 & 255}.{number & 255}"
+
+
+def synthetic_interfaces(lines):
+    header = "".join(read_fixture("show_interfaces.txt").splitlines(True)[:3])
+    return header + "".join(f"{number % 1000:>3}  {number % 100:>10}  {1500:>10}  {'connected':<12}"
+                            f"  Ethernet {number}\n" for number in range(lines))
+
+
+def synthetic_subinterfaces(lines):
+    header = "".join(read_fixture("show_subinterface.txt").splitlines(True)[:3])
+    return header + "".join(f"{1500:>6}  {1:>15}  {number * 7919:>9}  {number * 104729:>9}  Ethernet {number}\n"
+                            for number in range(lines))
+
+
+def synthetic_configs(lines):
+    block = read_fixture("show_config.txt").split("\n\n")[0].lstrip("\n") + "\n\n"
+    count = lines // block.count("\n")
+    return "".join(block.replace('"Ethernet"', f'"Ethernet {number}"').replace("192.168.1.23", address(number))
+                   for number in range(count))
+
+
+def synthetic_route_print(lines):
+    head, _, tail = read_fixture("route_print.txt").partition("Network Destination")
+    tail = tail[tail.index("\n") + 1:]
+    rows = "".join(f"{address(number):>17}  {'255.255.255.0':>15}  {'192.168.1.1':>15}  {'192.168.1.23':>15}"
+                   f"  {25 + number % 500:>5}\n" for number in range(lines))
+    return head + "Network Destination        Netmask          Gateway       Interface  Metric\n" + rows + tail
+
+
+FORMATS = [
+    ("route print", "route_print.txt", synthetic_route_print, parse_route_print),
+    ("show config", "show_config.txt", synthetic_configs, parse_configs),
+    ("interfaces", "show_interfaces.txt", synthetic_interfaces, parse_interfaces),
+    ("subinterface", "show_subinterface.txt", synthetic_subinterfaces, parse_subinterfaces),
+]
+
+
+def best_time(parser, output, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        parser(output)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'format':<14}{'size':>10}{'MB/s':>8}{'fixture':>12}")
+    for name, fixture, build, parse in FORMATS:
+        output = build(args.lines)
+        elapsed = best_time(parse, output, args.repeat)
+        recorded = best_time(parse, read_fixture(fixture), args.repeat * 100)
+        print(f"{name:<14}{len(output) / 1e6:>8.1f}MB{len(output) / elapsed / 1e6:>8.1f}{recorded * 1e6:>9.0f} us")
+
+
+if __name__ == "__main__":
+    main()
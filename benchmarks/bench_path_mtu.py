@@ -0,0 +1,29 @@
+"""Rounds, probes and wall time of discover_path_mtu() per fanout against a simulated path.
+
+    python -m benchmarks.bench_path_mtu [--mtu 1400] [--latency 0.05] [--oversize timeout]
+
+SimulatedPath answers every probe after --latency seconds, and sizes above --mtu with --oversize, so a
+round costs one probe's latency however many sizes it sends.
+"""
+import argparse
+
+from core import SimulatedPath, discover_path_mtu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--min", type=int, default=1100)
+    parser.add_argument("--max", type=int, default=1500)
+    parser.add_argument("--mtu", type=int, default=1400)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per probe")
+    parser.add_argument("--oversize", choices=["fragmentation", "timeout"], default="timeout")
+    args = parser.parse_args()
+
+    print(f"{'fanout':>6}{'mtu':>6}{'rounds':>8}{'probes':>8}{'elapsed':>9}")
+    for fanout in (1, 2, 4, 8):
+        result = discover_path_mtu(args.min, args.max, SimulatedPath(args.mtu, args.latency, args.oversize), fanout)
+        print(f"{fanout:>6}{result['mtu']:>6}{result['rounds']:>8}{result['probes']:>8}{result['elapsed']:>8.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Run a PingMonitor over many loopback targets plus one that never answers, and report its CPU cost.
+
+    python -m benchmarks.bench_ping_monitor [--targets 500] [--interval 0.5] [--seconds 10]
+
+Targets are 127.0.x.y addresses, which the local stack answers, and the unreachable one is TEST-NET-2's
+198.51.100.7. Reports the rounds run, the process CPU time as a share of one core over the run and the
+loss and mean RTT the monitor shows. Needs in-process ICMP (a datagram or raw ICMP socket).
+"""
+import argparse
+import time
+
+from core import PingMonitor, get_icmp_prober
+
+UNREACHABLE = "198.51.100.7"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--targets", type=int, default=500)
+    parser.add_argument("--interval", type=float, default=0.5)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    if get_icmp_prober() is None:
+        parser.error("in-process ICMP is not available here")
+    targets = [f"127.0.{index // 250}.{index % 250 + 1}" for index in range(args.targets)] + [UNREACHABLE]
+
+    monitor = PingMonitor(targets, args.interval)
+    wall, cpu = time.perf_counter(), time.process_time()
+    monitor.start()
+    time.sleep(args.seconds)
+    monitor.stop()
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+
+    summaries = {target: summary for target, _, summary in monitor.snapshot()}
+    loopback = [summaries[target] for target in targets[:-1]]
+    received = sum(summary['received'] for summary in loopback)
+    sent = sum(summary['sent'] for summary in loopback)
+    mean = sum(summary['avg'] * summary['received'] for summary in loopback if summary['received'])
+    print(f"{args.targets} loopback targets + 1 unreachable every {args.interval:g}s for {wall:.1f}s: "
+          f"{monitor.rounds} rounds")
+    print(f"CPU {cpu / wall * 100:.1f}% of one core, {cpu / max(monitor.rounds, 1) * 1000:.2f} ms per round")
+    print(f"loopback loss {100 - received / sent * 100 if sent else 100:.1f}%, "
+          f"mean RTT {mean / received if received else float('nan'):.2f} ms")
+    print(f"{UNREACHABLE} loss {summaries[UNREACHABLE]['loss']:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
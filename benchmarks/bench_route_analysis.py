@@ -0,0 +1,51 @@
+"""analyze_routes() on a large random routing table.
+
+    python -m benchmarks.bench_route_analysis [--routes 100000]
+
+Routes get random networks inside 10.0.0.0/8 with prefix lengths from /9 to /32 and one of three gateways,
+so nearly every route nests in another and gets flagged. Parsing is timed apart from the sweep.
+"""
+import argparse
+import gc
+import random
+import socket
+import struct
+import time
+from collections import Counter
+
+from core import analyze_routes, parse_route, prefix_length_to_mask
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--routes", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    generator = random.Random(args.seed)
+    rows = []
+    for _ in range(args.routes):
+        length = generator.randint(9, 32)
+        mask = (0xFFFFFFFF << (32 - length)) & 0xFFFFFFFF
+        address = (10 << 24 | generator.getrandbits(24)) & mask
+        rows.append([socket.inet_ntoa(struct.pack("!I", address)), prefix_length_to_mask(length),
+                     generator.choice(["10.0.0.1", "10.0.0.2", "On-link"]), "10.0.0.10",
+                     str(generator.randint(1, 500))])
+
+    started = time.perf_counter()
+    routes = [parse_route(row) for row in rows]
+    parsed = time.perf_counter() - started
+
+    collections = sum(stat['collections'] for stat in gc.get_stats())
+    started = time.perf_counter()
+    issues = analyze_routes(routes)
+    elapsed = time.perf_counter() - started
+    collections = sum(stat['collections'] for stat in gc.get_stats()) - collections
+
+    print(f"{args.routes} routes: parsing {parsed * 1000:.0f} ms, analysis {elapsed * 1000:.0f} ms, "
+          f"{collections} GC passes")
+    print(f"{len(issues)} findings: {dict(Counter(category for _, category, _ in issues))}")
+
+
+if __name__ == "__main__":
+    main()
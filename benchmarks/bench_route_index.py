@@ -0,0 +1,58 @@
+"""RouteIndex build and lookup times on a large random routing table.
+
+    python -m benchmarks.bench_route_index [--routes 100000] [--blocks 10000]
+
+Routes get random networks and prefix lengths from /8 to /32. Reports the build time (parsing apart from
+inserting), the mean time of single-address lookups and the time to look up --blocks random /24 blocks.
+"""
+import argparse
+import random
+import socket
+import struct
+import time
+
+from core import RouteIndex, parse_route, prefix_length_to_mask
+
+
+def dotted(address):
+    return socket.inet_ntoa(struct.pack("!I", address))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--routes", type=int, default=100000)
+    parser.add_argument("--blocks", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    generator = random.Random(args.seed)
+    rows = []
+    for _ in range(args.routes):
+        length = generator.randint(8, 32)
+        mask = (0xFFFFFFFF << (32 - length)) & 0xFFFFFFFF
+        rows.append([dotted(generator.getrandbits(32) & mask), prefix_length_to_mask(length), "192.168.0.1",
+                     "192.168.0.10", str(generator.randint(1, 500))])
+
+    started = time.perf_counter()
+    routes = [parse_route(row) for row in rows]
+    parsed = time.perf_counter() - started
+    index = RouteIndex()
+    for route in routes:
+        index.add(route)
+    built = time.perf_counter() - started
+    print(f"build {args.routes} routes: {built:.2f}s ({parsed:.2f}s parsing)")
+
+    addresses = [generator.getrandbits(32) for _ in range(100000)]
+    started = time.perf_counter()
+    for address in addresses:
+        index.lookup(address)
+    print(f"one lookup: {(time.perf_counter() - started) / len(addresses) * 1e6:.1f} us")
+
+    blocks = [f"{dotted(generator.getrandbits(24) << 8)}/24" for _ in range(args.blocks)]
+    started = time.perf_counter()
+    index.lookup_many(blocks)
+    print(f"{args.blocks} /24 blocks: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Routing tab refresh cost with a large table: RouteTableModel against rebuilding a QTableWidget, offscreen.
+
+    python -m benchmarks.bench_route_model [--routes 10000]
+
+The widget path is how the routing tab used to refresh: every cell set again and a Delete QPushButton per
+row. The model is loaded once, then refreshed with 100 routes added, 100 removed and 1% of the metrics
+changed, then refreshed again with no changes.
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtWidgets import QApplication, QPushButton, QTableView, QTableWidget, QTableWidgetItem
+
+from main import ROUTE_COLUMNS, ROUTE_DELETE_COLUMN, RouteDeleteDelegate, RouteTableModel
+
+
+def routes(count, offset=0):
+    return [[f"10.{number >> 8 & 255}.{number & 255}.0", "255.255.255.0", f"192.168.{number % 4}.1",
+             "192.168.0.10", str(25 + number % 7)] for number in range(offset, offset + count)]
+
+
+def time_widget(app, rows):
+    """Seconds for a load and one refresh of a QTableWidget rebuilt the old way."""
+    widget = QTableWidget()
+    widget.setColumnCount(len(ROUTE_COLUMNS))
+    widget.show()
+    started = time.perf_counter()
+    for _ in range(2):
+        widget.setRowCount(len(rows))
+        for row, route in enumerate(rows):
+            for column in range(ROUTE_DELETE_COLUMN):
+                widget.setItem(row, column, QTableWidgetItem(route[column]))
+            widget.setCellWidget(row, ROUTE_DELETE_COLUMN, QPushButton("Delete"))
+        widget.resizeColumnsToContents()
+        app.processEvents()
+    return time.perf_counter() - started
+
+
+def time_model(app, first, second):
+    """Seconds for the first load, a refresh to `second` and a refresh that changes nothing."""
+    model = RouteTableModel()
+    view = QTableView()
+    view.setModel(model)
+    view.setItemDelegateForColumn(ROUTE_DELETE_COLUMN, RouteDeleteDelegate(view))
+    view.horizontalHeader().setResizeContentsPrecision(50)
+    view.show()
+
+    timings = []
+    for rows in (first, second, second):
+        started = time.perf_counter()
+        counts = model.update(rows)
+        if not timings:
+            view.resizeColumnsToContents()
+        app.processEvents()
+        timings.append((time.perf_counter() - started, counts))
+    assert sorted(model.route(row) for row in range(model.rowCount())) == sorted(second)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--routes", type=int, default=10000)
+    args = parser.parse_args()
+
+    app = QApplication([])
+    first = routes(args.routes)
+    second = [list(route) for route in first[100:]] + routes(100, args.routes * 2)
+    for route in second[::100]:
+        route[4] = "99"
+
+    for label, (elapsed, counts) in zip(("first load", "refresh", "no-op refresh"), time_model(app, first, second)):
+        print(f"model {label:<14}{elapsed * 1000:>8.0f} ms  {counts}")
+    print(f"widget load + refresh{time_widget(app, first):>7.2f} s")
+
+
+if __name__ == "__main__":
+    main()
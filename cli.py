@@ -0,0 +1,220 @@
+"""Command line for NIC Manager: the same queries and changes as the GUI, printed as JSON.
+
+    python cli.py nics
+    python cli.py details "Ethernet 2"
+    python cli.py routes
+    python cli.py set-static Ethernet 10.0.0.5 255.255.255.0 --gateway 10.0.0.1 --dns 10.0.0.2 10.0.0.3
+    python cli.py set-dhcp Ethernet
+    python cli.py set-mtu Ethernet 1400
+    python cli.py discover-mtu 8.8.8.8 --min 1100 --max 1500
+    python cli.py fleet inventory --hosts-file hosts.txt --transport ssh --user admin
+    python cli.py snapshot before.json.gz
+    python cli.py diff before.json.gz
+    python cli.py restore before.json.gz --dry-run
+
+Nothing here imports Qt or asks for elevation; changes need an administrator prompt. Errors are printed
+as {"error": ...} with exit status 1.
+"""
+import argparse
+import json
+import os
+import sys
+
+from core import NetworkChangeSet, ROUTE_FILE_FIELDS, configure_logging, discover_path_mtu, log, \
+    select_backend, send_ping_with_mtu
+
+# fleet.py and snapshots.py are imported by the commands that use them, so the others start without them
+
+# Environment variable holding the password of the WinRM transport, so it stays off the command line
+WINRM_PASSWORD_ENV = "NIC_MANAGER_WINRM_PASSWORD"
+
+# fleet.FLEET_QUERIES, plus the changes fleet_operation() builds
+FLEET_OPERATIONS = ["details", "inventory", "mtus", "nics", "routes", "set-dhcp", "set-mtu"]
+
+
+def command_nics(args):
+    return select_backend().get_nic_names()
+
+
+def command_details(args):
+    backend = select_backend()
+    details, errors = backend.get_all_nic_details(args.nics or backend.get_nic_names())
+    return {'details': details, 'errors': errors}
+
+
+def command_routes(args):
+    return [dict(zip(ROUTE_FILE_FIELDS, row)) for row in select_backend().get_routing_table()]
+
+
+def command_set_static(args):
+    return NetworkChangeSet(select_backend()).set_static(args.nic, args.ip, args.netmask, args.gateway,
+                                                         args.dns).apply()
+
+
+def command_set_dhcp(args):
+    return NetworkChangeSet(select_backend()).set_dhcp(args.nic).apply()
+
+
+def command_set_mtu(args):
+    return NetworkChangeSet(select_backend()).set_mtu(args.nic, args.mtu).apply()
+
+
+def command_discover_mtu(args):
+    return discover_path_mtu(args.min, args.max, lambda size: send_ping_with_mtu(size, args.host, args.timeout))
+
+
+def command_snapshot(args):
+    from snapshots import capture_snapshot, save_snapshot
+    snapshot = capture_snapshot(select_backend())
+    size = save_snapshot(snapshot, args.path)
+    return {'path': args.path, 'nics': len(snapshot.nics), 'routes': len(snapshot.routes), 'errors': snapshot.errors,
+            'bytes': size, 'elapsed': snapshot.elapsed}
+
+
+def command_diff(args):
+    from snapshots import capture_snapshot, diff_count, diff_snapshots, load_snapshot
+    old = load_snapshot(args.old)
+    new = load_snapshot(args.new) if args.new else capture_snapshot(select_backend())
+    diff = diff_snapshots(old, new)
+    return {'differences': diff_count(diff), **diff}
+
+
+def command_restore(args):
+    from snapshots import load_snapshot, restore_snapshot
+    result = restore_snapshot(select_backend(), load_snapshot(args.path), dry_run=args.dry_run)
+    result['restored'] = not args.dry_run and result['error'] is None and not result['remaining']
+    return result
+
+
+def fleet_operation(args):
+    """Return the operation(backend) the fleet command runs on each host."""
+    from fleet import FLEET_QUERIES
+    if args.operation in FLEET_QUERIES:
+        return FLEET_QUERIES[args.operation]
+    if not args.nic:
+        raise Exception(f"fleet {args.operation} needs --nic")
+    if args.operation == "set-dhcp":
+        return lambda backend: NetworkChangeSet(backend).set_dhcp(args.nic).apply()
+    if args.mtu is None:
+        raise Exception("fleet set-mtu needs --mtu")
+    return lambda backend: NetworkChangeSet(backend).set_mtu(args.nic, args.mtu).apply()
+
+
+def command_fleet(args):
+    from fleet import FLEET_HOST_TIMEOUT, FLEET_WORKERS, FakeTransport, FleetExecutor, SshTransport, \
+        WinRmTransport, fleet_summary
+    timeout = args.timeout or FLEET_HOST_TIMEOUT
+    hosts = list(args.hosts)
+    if args.hosts_file:
+        with open(args.hosts_file, encoding="utf-8") as f:
+            hosts += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    if not hosts:
+        raise Exception("No hosts given")
+    operation = fleet_operation(args)
+
+    if args.transport == "fake":
+        transport = FakeTransport(hosts)
+    elif args.transport == "winrm":
+        transport = WinRmTransport(args.user, os.environ.get(WINRM_PASSWORD_ENV), port=args.port or 5985,
+                                   timeout=timeout)
+    else:
+        transport = SshTransport(args.user, args.port, args.identity, timeout=timeout)
+
+    executor = FleetExecutor(transport, args.workers or FLEET_WORKERS, timeout)
+    try:
+        results = executor.run(hosts, operation, on_result=lambda result: log.info(
+            "%s: %s in %.1fs", result.host, "ok" if result.ok else result.error, result.elapsed))
+    finally:
+        executor.close()
+    return {'summary': fleet_summary(results),
+            'results': {host: result.value if result.ok else {'error': result.error}
+                        for host, result in results.items()}}
+
+
+def build_parser():
+    """Return the argument parser, with each subcommand's function as its 'command' default."""
+    parser = argparse.ArgumentParser(prog="nic-manager", description="Query and change NICs and routes.")
+    commands = parser.add_subparsers(dest="name", required=True)
+
+    commands.add_parser("nics", help="names of the connected interfaces").set_defaults(command=command_nics)
+
+    details = commands.add_parser("details", help="address, DNS and MTU of interfaces (all if none given)")
+    details.add_argument("nics", nargs="*", metavar="NIC")
+    details.set_defaults(command=command_details)
+
+    commands.add_parser("routes", help="the IPv4 routing table").set_defaults(command=command_routes)
+
+    static = commands.add_parser("set-static", help="give an interface a static address")
+    static.add_argument("nic")
+    static.add_argument("ip")
+    static.add_argument("netmask")
+    static.add_argument("--gateway")
+    static.add_argument("--dns", nargs="*", help="DNS servers; leaves DNS alone if omitted, clears it if empty")
+    static.set_defaults(command=command_set_static)
+
+    dhcp = commands.add_parser("set-dhcp", help="switch an interface to DHCP with automatic DNS")
+    dhcp.add_argument("nic")
+    dhcp.set_defaults(command=command_set_dhcp)
+
+    mtu = commands.add_parser("set-mtu", help="set the persistent IPv4 MTU of an interface")
+    mtu.add_argument("nic")
+    mtu.add_argument("mtu", type=int)
+    mtu.set_defaults(command=command_set_mtu)
+
+    discover = commands.add_parser("discover-mtu", help="find the largest packet that reaches a host unfragmented")
+    discover.add_argument("host")
+    discover.add_argument("--min", type=int, default=1100)
+    discover.add_argument("--max", type=int, default=1500)
+    discover.add_argument("--timeout", type=int, default=2000, help="milliseconds per probe")
+    discover.set_defaults(command=command_discover_mtu)
+
+    snapshot = commands.add_parser("snapshot", help="save every NIC's settings and the routing table to a file")
+    snapshot.add_argument("path", help="snapshot file; gzipped if it ends in .gz")
+    snapshot.set_defaults(command=command_snapshot)
+
+    diff = commands.add_parser("diff", help="compare two snapshots, or a snapshot with the current settings")
+    diff.add_argument("old")
+    diff.add_argument("new", nargs="?")
+    diff.set_defaults(command=command_diff)
+
+    restore = commands.add_parser("restore", help="put the settings in a snapshot back with one netsh script")
+    restore.add_argument("path")
+    restore.add_argument("--dry-run", action="store_true", help="only print the netsh lines it would run")
+    restore.set_defaults(command=command_restore)
+
+    fleet = commands.add_parser("fleet", help="run a query or change on many hosts at once")
+    fleet.add_argument("operation", choices=FLEET_OPERATIONS)
+    fleet.add_argument("hosts", nargs="*", metavar="HOST")
+    fleet.add_argument("--hosts-file", help="file with one host per line")
+    fleet.add_argument("--transport", choices=["ssh", "winrm", "fake"], default="ssh",
+                       help=f"fake simulates the hosts; winrm reads its password from {WINRM_PASSWORD_ENV}")
+    fleet.add_argument("--user")
+    fleet.add_argument("--port", type=int)
+    fleet.add_argument("--identity", help="ssh private key file")
+    fleet.add_argument("--nic", help="interface the change applies to")
+    fleet.add_argument("--mtu", type=int)
+    fleet.add_argument("--workers", type=int, help="hosts worked on at once (default: fleet.FLEET_WORKERS)")
+    fleet.add_argument("--timeout", type=float, help="seconds per host (default: fleet.FLEET_HOST_TIMEOUT)")
+    fleet.set_defaults(command=command_fleet)
+    return parser
+
+
+def main(argv=None):
+    """Run one command and print its result as JSON; return the exit status."""
+    args = build_parser().parse_args(argv)
+    configure_logging()
+    try:
+        result = args.command(args)
+    except Exception as e:
+        log.debug("'%s' failed", args.name, exc_info=True)
+        json.dump({'error': str(e)}, sys.stdout)
+        print()
+        return 1
+
+    json.dump(result, sys.stdout, indent=2)
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
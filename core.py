@@ -0,0 +1,2764 @@
+"""The NIC Manager engine: NIC and route queries and changes, ping, MTU discovery and the route tools.
+
+Nothing here imports Qt or asks for elevation, so the GUI (main.py) and the command line (cli.py) share it.
+"""
+import threading
+import sys
+import subprocess
+import math
+import os
+import queue
+import re
+import ctypes
+import csv
+import atexit
+import errno
+import json
+import logging
+import socket
+import struct
+import tempfile
+import time
+from array import array
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from parsers import parse_configs, parse_interfaces, parse_route_print, parse_subinterfaces
+
+
+# Debug and error messages; configure_logging() sets the level from LOG_LEVEL_ENV
+log = logging.getLogger("nic_manager")
+
+# Environment variable with the log level (DEBUG, INFO, WARNING or ERROR); WARNING unless set
+LOG_LEVEL_ENV = "NIC_MANAGER_LOG_LEVEL"
+
+
+def configure_logging():
+    """Log to stderr at the level named by LOG_LEVEL_ENV."""
+    logging.basicConfig(format="[%(levelname)s] %(message)s")
+    log.setLevel(os.environ.get(LOG_LEVEL_ENV, "WARNING").upper())
+
+
+# How long (seconds) a netsh snapshot is served from memory before it is re-queried
+SNAPSHOT_TTL = 5.0
+
+# How long (seconds) one 'route print' is shared by everything that reads routes or interface indexes;
+# short, because routes change without going through NIC Manager
+ROUTE_PRINT_TTL = 1.0
+
+# Default number of netsh processes get_all_nic_details runs at the same time
+NIC_DETAILS_WORKERS = 8
+
+# Number of sizes the MTU search probes at the same time in each round
+MTU_PROBE_FANOUT = 4
+
+# Seconds between rounds of the multi-target monitor, and how long each round waits for replies
+MONITOR_INTERVAL = 1.0
+MONITOR_TIMEOUT_MS = 1000
+
+# Concurrent IcmpSendEcho2 calls per monitor round on Windows, where each call blocks its thread
+MONITOR_WINDOWS_WORKERS = 16
+
+# Command kind the single-interface config queries are timed under, whatever the interface
+NIC_CONFIG_KIND = "netsh interface ipv4 show config <interface>"
+
+
+def parse_nic_names(output):
+    """Parse 'netsh interface ipv4 show interfaces' output into connected NIC names and their indexes."""
+    interfaces = [record for record in parse_interfaces(output) if record.state == "connected"]
+    names = [record.name for record in interfaces]
+    log.debug("Found interfaces: %s", names)
+    return names, {record.name: record.index for record in interfaces}
+
+
+def parse_mtus(output):
+    """Parse 'netsh interface ipv4 show subinterface' output into a dict of interface name -> MTU."""
+    return {record.name: record.mtu for record in parse_subinterfaces(output)}
+
+
+def config_to_details(config):
+    """Turn an InterfaceConfig into the NIC details dict the NIC tab shows."""
+    nic_details = {}
+    if config.ip_addresses:
+        nic_details['IP Address'] = config.ip_addresses[0]
+    if config.subnet_mask is not None:
+        nic_details['Subnet Mask'] = config.subnet_mask
+    if config.default_gateway is not None:
+        nic_details['Default Gateway'] = config.default_gateway or "No gateway"
+    if config.dns_servers is not None:
+        nic_details['Primary DNS'] = config.dns_servers[0] if len(config.dns_servers) > 0 else "None"
+        nic_details['Backup DNS'] = config.dns_servers[1] if len(config.dns_servers) > 1 else "None"
+    if config.dhcp is not None:
+        nic_details['DHCP'] = config.dhcp
+    if config.interface_metric is not None:
+        nic_details['Interface Metric'] = config.interface_metric
+    return nic_details
+
+
+def parse_nic_config(output):
+    """Parse 'netsh interface ipv4 show config <interface>' output into NIC details."""
+    configs = parse_configs(output)
+    return config_to_details(next(iter(configs.values()))) if configs else {}
+
+
+def parse_nic_configs(output):
+    """Parse 'netsh interface ipv4 show config' output for all interfaces into a dict of name -> details."""
+    return {name: config_to_details(config) for name, config in parse_configs(output).items() if name is not None}
+
+
+class CommandTiming:
+    """Timings of one kind of external command: process spawn, runtime, output size and parse time."""
+
+    def __init__(self):
+        self.calls = 0
+        self.failures = 0
+        self.output_bytes = 0
+        self.max_output_bytes = 0
+        self.spawn = LogHistogram()
+        self.runtime = LogHistogram()
+        self.parse = LogHistogram()
+
+    def summary(self):
+        """Return a JSON-serializable dict of the counters and the p50/p95/max of each histogram."""
+        summary = {'calls': self.calls, 'failures': self.failures, 'output_bytes': self.output_bytes,
+                   'avg_output_bytes': self.output_bytes / self.calls if self.calls else None,
+                   'max_output_bytes': self.max_output_bytes}
+        for name, histogram in (('spawn_ms', self.spawn), ('runtime_ms', self.runtime), ('parse_ms', self.parse)):
+            summary[name] = {'count': histogram.count, 'p50': histogram.percentile(50),
+                             'p95': histogram.percentile(95), 'max': histogram.max}
+        return summary
+
+
+class CommandStats:
+    """Thread-safe CommandTiming per command kind, e.g. 'netsh interface ipv4 show config' or 'route print'.
+
+    Every kind keeps fixed-size histograms, so recording costs the same after a million calls as after one.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._kinds = {}
+
+    def _timing(self, kind):
+        timing = self._kinds.get(kind)
+        if timing is None:
+            timing = self._kinds[kind] = CommandTiming()
+        return timing
+
+    def record_run(self, kind, spawn_ms, runtime_ms, output_bytes, failed):
+        with self._lock:
+            timing = self._timing(kind)
+            timing.calls += 1
+            timing.failures += bool(failed)
+            timing.output_bytes += output_bytes
+            timing.max_output_bytes = max(timing.max_output_bytes, output_bytes)
+            timing.spawn.add(spawn_ms)
+            timing.runtime.add(runtime_ms)
+
+    def record_parse(self, kind, parse_ms):
+        with self._lock:
+            self._timing(kind).parse.add(parse_ms)
+
+    def reset(self):
+        with self._lock:
+            self._kinds.clear()
+
+    def snapshot(self):
+        """Return a dict of kind -> CommandTiming.summary(), sorted by kind."""
+        with self._lock:
+            return {kind: self._kinds[kind].summary() for kind in sorted(self._kinds)}
+
+
+# Fed by run_command and timed_parse, shown in the Diagnostics tab
+command_stats = CommandStats()
+
+
+def run_command(kind, command, shell=False):
+    """Run an external command like subprocess.run(capture_output=True, text=True), timing it under `kind`.
+
+    Spawn time is how long starting the process takes; runtime is from then until its output is read
+    and it has exited.
+    """
+    started = time.perf_counter()
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, shell=shell)
+    spawned = time.perf_counter()
+    stdout, stderr = process.communicate()
+    finished = time.perf_counter()
+
+    command_stats.record_run(kind, (spawned - started) * 1000, (finished - spawned) * 1000,
+                             len(stdout) + len(stderr), process.returncode != 0)
+    return subprocess.CompletedProcess(command, process.returncode, stdout, stderr)
+
+
+# How a long-lived command host is started, how it is told to print the end marker after each command, and
+# the prompt it writes before reading a line. The marker goes on a line of its own; the newline before it
+# belongs to the end command. netsh echoes an unknown command as "The following command was not found:
+# <marker>.", which carries no exit status; sh prints the marker with the last status, which makes it the
+# stand-in host on Linux
+HostDialect = namedtuple("HostDialect", "name argv end_command prompt")
+NETSH_DIALECT = HostDialect("netsh", ["netsh"], "{marker}", "netsh>")
+SHELL_DIALECT = HostDialect("sh", ["sh"], "printf '\\n{marker} %s\\n' \"$?\"", "")
+# cmd with AutoRun and echo off, as the remote shell of fleet connections; it reports each exit status
+CMD_DIALECT = HostDialect("cmd", ["cmd", "/d", "/q"], "echo.&echo {marker} %errorlevel%", "")
+
+# Seconds a hosted command may run before its host is killed and restarted
+COMMAND_HOST_TIMEOUT = 30.0
+
+# Environment variable that turns the shared netsh host on ('1') or off ('0'); it is on by default on Windows
+NETSH_HOST_ENV = "NIC_MANAGER_NETSH_HOST"
+
+# Everything a successful netsh command prints, once stripped
+NETSH_OK_OUTPUT = ("", "Ok.")
+
+
+class CommandHostError(Exception):
+    """The command host exited or stopped answering; the next command starts a new one."""
+
+
+class CommandHost:
+    """One long-lived interactive netsh (or shell) that runs command lines sent over its stdin.
+
+    Each command is followed by the dialect's end command, so the host prints a marker that no command
+    output contains; everything before the marker line is the command's output. Callers are served one at a
+    time. A host that exits or does not answer within the timeout is killed, the command raises
+    CommandHostError and the next command starts a fresh host.
+    """
+
+    def __init__(self, dialect, timeout=COMMAND_HOST_TIMEOUT):
+        self.dialect = dialect
+        self.timeout = timeout
+        self.starts = 0
+        self._lock = threading.Lock()
+        self._process = None
+        self._lines = None  # Filled with stdout lines by the reader thread, then None at EOF
+        self._marker = f"__nic_manager_{os.getpid()}_{id(self):x}_"
+        self._sequence = 0
+
+    def _start(self):
+        started = time.perf_counter()
+        self._process = subprocess.Popen(self.dialect.argv, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                         stderr=subprocess.STDOUT, text=True, bufsize=1)
+        command_stats.record_run(f"{self.dialect.name} host start", (time.perf_counter() - started) * 1000,
+                                 0.0, 0, False)
+        self.starts += 1
+        self._lines = queue.Queue()
+        threading.Thread(target=self._read, args=(self._process.stdout, self._lines), daemon=True).start()
+        log.debug("Started %s host (pid %s)", self.dialect.name, self._process.pid)
+
+    @staticmethod
+    def _read(stdout, lines):
+        for line in stdout:
+            lines.put(line)
+        lines.put(None)
+
+    def _kill(self):
+        if self._process is not None:
+            self._process.kill()
+            self._process.wait()
+            self._process = None
+
+    def close(self):
+        """Ask the host to exit, killing it if it does not."""
+        with self._lock:
+            if self._process is None:
+                return
+            try:
+                self._process.stdin.close()
+                self._process.wait(timeout=1)
+            except (OSError, subprocess.TimeoutExpired):
+                pass
+            self._kill()
+
+    def run(self, command, kind=None, timeout=None):
+        """Run one command line and return (status, output); status is None if the dialect cannot report it.
+
+        timeout overrides the host's own timeout for this command.
+        """
+        kind = kind or f"{self.dialect.name} host"
+        timeout = self.timeout if timeout is None else timeout
+        with self._lock:
+            if self._process is None or self._process.poll() is not None:
+                self._kill()
+                self._start()
+
+            self._sequence += 1
+            marker = f"{self._marker}{self._sequence}_"
+            started = time.perf_counter()
+            try:
+                self._process.stdin.write(f"{command}\n{self.dialect.end_command.format(marker=marker)}\n")
+                self._process.stdin.flush()
+            except OSError as e:
+                self._kill()
+                raise CommandHostError(f"{self.dialect.name} host exited: {e}") from e
+
+            output = []
+            deadline = started + timeout
+            while True:
+                try:
+                    line = self._lines.get(timeout=max(0.0, deadline - time.perf_counter()))
+                except queue.Empty:
+                    self._kill()
+                    command_stats.record_run(kind, 0.0, timeout * 1000, 0, True)
+                    raise CommandHostError(f"{self.dialect.name} host did not answer within {timeout:g}s")
+                if line is None:
+                    self._kill()
+                    command_stats.record_run(kind, 0.0, (time.perf_counter() - started) * 1000, 0, True)
+                    raise CommandHostError(f"{self.dialect.name} host exited: {''.join(output).strip()}")
+
+                # The prompt comes before whatever the host writes after reading a line
+                while self.dialect.prompt and line.startswith(self.dialect.prompt):
+                    line = line[len(self.dialect.prompt):]
+                position = line.find(marker)
+                if position < 0:
+                    output.append(line)
+                    continue
+
+                status = line[position + len(marker):].split()
+                status = int(status[0]) if status and status[0].lstrip("-").isdigit() else None
+                output = "".join(output)
+                if output.endswith("\n"):
+                    output = output[:-1]
+                command_stats.record_run(kind, 0.0, (time.perf_counter() - started) * 1000, len(output),
+                                         status not in (None, 0))
+                return status, output
+
+
+# Shared by every netsh query and script while netsh_host_enabled() is true
+netsh_host = CommandHost(NETSH_DIALECT)
+atexit.register(netsh_host.close)
+
+
+def netsh_host_enabled():
+    """Whether netsh commands go to the shared host rather than a process each (see NETSH_HOST_ENV)."""
+    setting = os.environ.get(NETSH_HOST_ENV, "")
+    return setting == "1" if setting else sys.platform == "win32"
+
+
+def run_netsh(kind, args):
+    """Return the output of 'netsh <args>', from the shared host when it is enabled.
+
+    Queries can safely be repeated, so if the host fails the command is run as a process of its own.
+    """
+    if netsh_host_enabled():
+        try:
+            return netsh_host.run(subprocess.list2cmdline(args), kind)[1]
+        except CommandHostError as e:
+            log.error("netsh host failed, running '%s' on its own: %s", kind, e)
+    return run_command(kind, ["netsh"] + args).stdout
+
+
+def timed_parse(kind, parser, output):
+    """Return parser(output), recording how long it took under `kind`."""
+    started = time.perf_counter()
+    value = parser(output)
+    command_stats.record_parse(kind, (time.perf_counter() - started) * 1000)
+    return value
+
+
+class NetshSnapshot:
+    """In-memory snapshot of the netsh interface queries.
+
+    Each netsh query runs at most once per TTL and is parsed for every interface at once, so clicking
+    through the NIC lists is served from memory. Anything that changes a NIC must call invalidate().
+    """
+
+    def __init__(self, ttl=SNAPSHOT_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._sections = {}  # section name -> (time taken, parsed value)
+
+    def invalidate(self):
+        """Drop everything so the next read re-runs netsh."""
+        log.debug("Invalidating netsh snapshot")
+        with self._lock:
+            self._sections.clear()
+
+    def _get(self, section, command, parser):
+        """Return the parsed section, running the netsh command if it is missing or expired."""
+        with self._lock:
+            cached = self._sections.get(section)
+            if cached is not None and time.monotonic() - cached[0] < self.ttl:
+                return cached[1]
+
+            kind = " ".join(command)
+            log.debug("Running '%s'", kind)
+            output = run_netsh(kind, command[1:])
+            log.debug("netsh output for %s:\n%s", section, output)
+            value = timed_parse(kind, parser, output)
+            self._sections[section] = (time.monotonic(), value)
+            return value
+
+    def interfaces(self):
+        """Return (connected NIC names, dict of name -> interface index)."""
+        return self._get("interfaces", ["netsh", "interface", "ipv4", "show", "interfaces"], parse_nic_names)
+
+    def mtus(self):
+        """Return a dict of interface name -> MTU."""
+        return self._get("subinterfaces", ["netsh", "interface", "ipv4", "show", "subinterface"], parse_mtus)
+
+    def configs(self):
+        """Return a dict of interface name -> parsed config for every interface."""
+        return self._get("configs", ["netsh", "interface", "ipv4", "show", "config"], parse_nic_configs)
+
+
+# Shared by every query function below
+netsh_snapshot = NetshSnapshot()
+
+
+class RoutePrintSnapshot:
+    """One parsed 'route print' shared by everything that reads routes within a refresh.
+
+    The Interface List, the IPv4 active routes and the persistent routes come from a single run, which is
+    reused for ROUTE_PRINT_TTL seconds. Anything that changes routes must call invalidate().
+    """
+
+    def __init__(self, ttl=ROUTE_PRINT_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._taken = None  # When the cached output was read
+        self._parsed = None
+
+    def invalidate(self):
+        """Drop the cached output so the next read re-runs 'route print'."""
+        with self._lock:
+            self._taken = None
+
+    def get(self):
+        """Return the RoutePrint, running 'route print' if it is missing or expired."""
+        with self._lock:
+            if self._taken is not None and time.monotonic() - self._taken < self.ttl:
+                return self._parsed
+
+            log.debug("Running 'route print'")
+            output = run_command("route print", ["route", "print"]).stdout
+            self._parsed = timed_parse("route print", parse_route_print, output)
+            self._taken = time.monotonic()
+            return self._parsed
+
+    def active_routes(self):
+        """Return the IPv4 active routes as RouteRow records."""
+        return self.get().active
+
+    def persistent_routes(self):
+        """Return the IPv4 persistent routes as PersistentRoute records."""
+        return self.get().persistent
+
+
+# Shared by get_routing_table() and everything else that reads 'route print'
+route_print_snapshot = RoutePrintSnapshot()
+
+
+def get_nic_names():
+    """Use netsh to get network interface names."""
+    try:
+        interface_names = list(netsh_snapshot.interfaces()[0])
+        log.debug("Interface names found: %s", interface_names)
+        return interface_names
+    except Exception as e:
+        log.error("Failed to retrieve NIC names: %s", e)
+        raise Exception(f"Failed to retrieve NIC names: {str(e)}") from e
+
+def get_mtu(interface):
+    """Use netsh to get the MTU for the specified interface."""
+    try:
+        mtu_value = netsh_snapshot.mtus().get(interface)
+        log.debug("Found MTU for %s: %s", interface, mtu_value)
+        return mtu_value if mtu_value else "Unknown"
+    except Exception as e:
+        log.error("Failed to retrieve MTU: %s", e)
+        return "Unknown"
+
+def get_nic_details(interface):
+    """Use netsh to get detailed information about the selected NIC, including DNS and MTU."""
+    try:
+        configs = netsh_snapshot.configs()
+        if interface in configs:
+            nic_details = dict(configs[interface])
+        else:
+            # Not in the snapshot (e.g. the adapter just appeared), query it on its own
+            log.debug("Running 'netsh interface ipv4 show config %s'", interface)
+            output = run_netsh(NIC_CONFIG_KIND, ["interface", "ipv4", "show", "config", interface])
+            log.debug("netsh output for %s config:\n%s", interface, output)
+            nic_details = timed_parse(NIC_CONFIG_KIND, parse_nic_config, output)
+
+        # Get MTU from the subinterface snapshot
+        mtu_value = get_mtu(interface)
+        nic_details['MTU'] = mtu_value
+
+        log.debug("NIC details for %s: %s", interface, nic_details)
+        return nic_details
+    except Exception as e:
+        log.error("Failed to retrieve NIC details: %s", e)
+        raise Exception(f"Failed to retrieve NIC details for {interface}: {str(e)}") from e
+
+def query_nic_config(interface):
+    """Run 'netsh interface ipv4 show config <interface>' on its own and parse it."""
+    log.debug("Running 'netsh interface ipv4 show config %s'", interface)
+    output = run_netsh(NIC_CONFIG_KIND, ["interface", "ipv4", "show", "config", interface])
+    nic_details = timed_parse(NIC_CONFIG_KIND, parse_nic_config, output)
+
+    if not nic_details:
+        raise Exception(output.strip() or "netsh returned no configuration")
+    return nic_details
+
+def get_all_nic_details(names, max_workers=NIC_DETAILS_WORKERS):
+    """Query the details of many interfaces at once on a bounded thread pool.
+
+    Returns (details, errors): interface name -> NIC details for the ones that worked and
+    interface name -> error message for the ones that failed. A failure never stops the others.
+    """
+    details = {}
+    errors = {}
+    if not names:
+        return details, errors
+
+    try:
+        mtus = netsh_snapshot.mtus()
+    except Exception as e:
+        log.error("Failed to retrieve MTUs: %s", e)
+        mtus = {}
+
+    workers = max(1, min(max_workers, len(names)))
+    log.debug("Querying %s interfaces with %s workers", len(names), workers)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(query_nic_config, name): name for name in names}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                nic_details = future.result()
+                nic_details['MTU'] = mtus.get(name, "Unknown")
+                details[name] = nic_details
+            except Exception as e:
+                log.error("Failed to retrieve NIC details for %s: %s", name, e)
+                errors[name] = str(e)
+
+    return details, errors
+
+def set_static_ip(interface, ip, subnet_mask, gateway, primary_dns, backup_dns):
+    """Set a new static IP, subnet mask, default gateway, and DNS using netsh."""
+    try:
+        log.debug("Running netsh to set static IP: %s, Subnet Mask: %s, Gateway: %s for %s",
+                  ip, subnet_mask, gateway, interface)
+        # If DNS fields are empty, the current DNS servers are left alone
+        dns = [primary_dns, backup_dns] if primary_dns or backup_dns else None
+        NetworkChangeSet().set_static(interface, ip, subnet_mask, gateway, dns).apply()
+        log.debug("Successfully set the new static IP configuration")
+    except Exception as e:
+        log.error("Failed to set static IP: %s", e)
+        raise Exception(f"Failed to set the new configuration: {str(e)}") from e
+
+def set_dhcp(interface):
+    """Set the interface to use DHCP and set DNS to automatic."""
+    try:
+        log.debug("Running netsh to set DHCP and automatic DNS for %s", interface)
+        NetworkChangeSet().set_dhcp(interface).apply()
+        log.debug("Successfully set DHCP and DNS to automatic")
+    except Exception as e:
+        log.error("Failed to set DHCP or DNS: %s", e)
+        raise Exception(f"Failed to set DHCP or DNS: {str(e)}") from e
+
+def set_mtu(interface, mtu_value):
+    """Set the MTU for the specified interface using netsh."""
+    try:
+        log.debug("Running netsh to set MTU: %s for %s", mtu_value, interface)
+        NetworkChangeSet().set_mtu(interface, mtu_value).apply()
+        log.debug("Successfully set MTU")
+    except Exception as e:
+        log.error("Failed to set MTU: %s", e)
+        raise Exception(f"Failed to set MTU: {str(e)}") from e
+
+def get_routing_table():
+    """Return the IPv4 active routes from the shared 'route print' snapshot as RouteRow records."""
+    try:
+        ipv4_table = route_print_snapshot.active_routes()
+        log.debug("Parsed %s IPv4 routes", len(ipv4_table))
+        return ipv4_table
+    except Exception as e:
+        log.error("Failed to retrieve routing table: %s", e)
+        raise Exception(f"Failed to retrieve routing table: {str(e)}") from e
+
+# Linux socket options the socket module does not export
+IP_MTU_DISCOVER = 10
+IP_PMTUDISC_DONT = 0
+IP_PMTUDISC_DO = 2
+IP_RECVTTL = 12
+IP_TTL = 2
+
+ICMP_ECHOREPLY = 0
+ICMP_DEST_UNREACH = 3
+ICMP_FRAG_NEEDED = 4
+ICMP_ECHO = 8
+
+# IcmpSendEcho2 status codes and option flags
+IP_SUCCESS = 0
+IP_PACKET_TOO_BIG = 11009
+IP_REQ_TIMED_OUT = 11010
+IP_FLAG_DF = 0x2
+
+
+class IP_OPTION_INFORMATION(ctypes.Structure):
+    _fields_ = [("Ttl", ctypes.c_ubyte), ("Tos", ctypes.c_ubyte), ("Flags", ctypes.c_ubyte),
+                ("OptionsSize", ctypes.c_ubyte), ("OptionsData", ctypes.c_void_p)]
+
+
+class ICMP_ECHO_REPLY(ctypes.Structure):
+    _fields_ = [("Address", ctypes.c_uint32), ("Status", ctypes.c_uint32), ("RoundTripTime", ctypes.c_uint32),
+                ("DataSize", ctypes.c_ushort), ("Reserved", ctypes.c_ushort), ("Data", ctypes.c_void_p),
+                ("Options", IP_OPTION_INFORMATION)]
+
+
+def icmp_checksum(data):
+    """Return the Internet checksum of data."""
+    if len(data) % 2:
+        data += b"\0"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+class IcmpProber:
+    """Sends ICMP echo requests from inside the process instead of starting ping.exe.
+
+    On Windows this uses IcmpSendEcho2 on one ICMP handle; elsewhere one ICMP socket (an unprivileged
+    datagram socket when the kernel allows it, otherwise a raw socket). The handle or socket is reused for
+    every probe. A prober is not meant to be shared between threads, use get_icmp_prober() instead.
+
+    probe() returns a dict with 'status' ("success", "fragmentation", "timeout", "unreachable" or "error"),
+    'rtt' in milliseconds, 'ttl' of the reply and the payload 'size'.
+    """
+
+    def __init__(self):
+        self._addresses = {}  # host -> resolved IPv4 address
+        self._sequence = 0
+        self._identifier = os.getpid() & 0xFFFF
+        if sys.platform == "win32":
+            self.icmp = ctypes.WinDLL("iphlpapi.dll", use_last_error=True)
+            self.icmp.IcmpCreateFile.restype = ctypes.c_void_p
+            self.icmp.IcmpCloseHandle.argtypes = [ctypes.c_void_p]
+            self.icmp.IcmpSendEcho2.argtypes = [
+                ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p, ctypes.c_uint32,
+                ctypes.c_void_p, ctypes.c_ushort, ctypes.POINTER(IP_OPTION_INFORMATION), ctypes.c_void_p,
+                ctypes.c_uint32, ctypes.c_uint32]
+            self.icmp.IcmpSendEcho2.restype = ctypes.c_uint32
+            self.handle = self.icmp.IcmpCreateFile()
+            if self.handle in (None, ctypes.c_void_p(-1).value):
+                raise ctypes.WinError(ctypes.get_last_error())
+            self.sock = None
+        else:
+            try:
+                self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+                self.raw = False
+                self.sock.setsockopt(socket.IPPROTO_IP, IP_RECVTTL, 1)
+            except PermissionError:
+                # Unprivileged ICMP sockets are off (net.ipv4.ping_group_range), raw needs root
+                self.sock = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP)
+                self.raw = True
+            self._df = None
+
+    def close(self):
+        """Release the ICMP handle or socket."""
+        if self.sock is not None:
+            self.sock.close()
+        elif self.handle:
+            self.icmp.IcmpCloseHandle(self.handle)
+            self.handle = None
+
+    def resolve(self, host):
+        """Return the IPv4 address of host, resolving each name only once."""
+        address = self._addresses.get(host)
+        if address is None:
+            address = self._addresses[host] = socket.gethostbyname(host)
+        return address
+
+    def probe(self, host, size, timeout_ms, df=True):
+        """Send one echo request with `size` bytes of payload and wait up to timeout_ms for the answer."""
+        result = {'status': "error", 'rtt': None, 'ttl': None, 'size': size}
+        try:
+            address = self.resolve(host)
+            if self.sock is None:
+                return self._probe_windows(address, size, timeout_ms, df, result)
+            return self._probe_socket(address, size, timeout_ms, df, result)
+        except OSError as e:
+            if e.errno == errno.EMSGSIZE:
+                # Larger than the MTU the kernel already knows for the route, with DF set
+                result['status'] = "fragmentation"
+            elif e.errno in (errno.EHOSTUNREACH, errno.ENETUNREACH):
+                result['status'] = "unreachable"
+            else:
+                log.error("ICMP probe to %s failed: %s", host, e)
+            return result
+
+    def _probe_windows(self, address, size, timeout_ms, df, result):
+        options = IP_OPTION_INFORMATION(Ttl=128, Flags=IP_FLAG_DF if df else 0)
+        payload = ctypes.create_string_buffer(b"\x61" * size, size)
+        reply_size = ctypes.sizeof(ICMP_ECHO_REPLY) + size + 8 + 64
+        reply = ctypes.create_string_buffer(reply_size)
+        destination = struct.unpack("<I", socket.inet_aton(address))[0]
+
+        started = time.perf_counter()
+        count = self.icmp.IcmpSendEcho2(self.handle, None, None, None, destination, payload, size,
+                                        ctypes.byref(options), reply, reply_size, int(timeout_ms))
+        elapsed = (time.perf_counter() - started) * 1000
+        status = ctypes.cast(reply, ctypes.POINTER(ICMP_ECHO_REPLY)).contents.Status if count else \
+            ctypes.get_last_error()
+
+        if status == IP_SUCCESS:
+            echo = ctypes.cast(reply, ctypes.POINTER(ICMP_ECHO_REPLY)).contents
+            result.update(status="success", rtt=elapsed, ttl=echo.Options.Ttl)
+        elif status == IP_PACKET_TOO_BIG:
+            result['status'] = "fragmentation"
+        elif status == IP_REQ_TIMED_OUT:
+            result['status'] = "timeout"
+        elif 11002 <= status <= 11005:  # Destination net, host, protocol or port unreachable
+            result['status'] = "unreachable"
+        return result
+
+    def _set_df(self, df):
+        if df != self._df:
+            self.sock.setsockopt(socket.IPPROTO_IP, IP_MTU_DISCOVER, IP_PMTUDISC_DO if df else IP_PMTUDISC_DONT)
+            self._df = df
+
+    def _send_echo(self, address, size):
+        """Send one echo request over the socket and return its sequence number."""
+        self._sequence = (self._sequence + 1) & 0xFFFF
+        sequence = self._sequence
+        header = struct.pack("!BBHHH", ICMP_ECHO, 0, 0, self._identifier, sequence)
+        payload = b"\x61" * size
+        checksum = icmp_checksum(header + payload)
+        packet = struct.pack("!BBHHH", ICMP_ECHO, 0, checksum, self._identifier, sequence) + payload
+        self.sock.sendto(packet, (address, 0))
+        return sequence
+
+    def _receive(self, timeout, size):
+        """Wait up to timeout seconds for one ICMP message that answers one of our requests.
+
+        Returns (address, sequence, status, ttl), where address is the probed address, or None on timeout.
+        Messages for other processes are skipped.
+        """
+        deadline = time.perf_counter() + timeout
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return None
+            self.sock.settimeout(remaining)
+            try:
+                data, ancillary, _, source = self.sock.recvmsg(size + 576, socket.CMSG_SPACE(4))
+            except socket.timeout:
+                return None
+
+            ttl = None
+            if self.raw:
+                header_length = (data[0] & 0x0F) * 4
+                ttl = data[8]
+                data = data[header_length:]
+            else:
+                for level, kind, value in ancillary:
+                    if level == socket.IPPROTO_IP and kind == IP_TTL:
+                        ttl = struct.unpack("i", value[:4])[0]
+            if len(data) < 8:
+                continue
+
+            kind, code, _, identifier, sequence = struct.unpack("!BBHHH", data[:8])
+            if kind == ICMP_ECHOREPLY and (identifier == self._identifier or not self.raw):
+                return source[0], sequence, "success", ttl
+            if kind == ICMP_DEST_UNREACH and len(data) >= 36:
+                # The error quotes our IP header and the first 8 bytes of our echo request
+                quoted_header_length = (data[8] & 0x0F) * 4
+                quoted = data[8 + quoted_header_length:]
+                if len(quoted) < 8 or (self.raw and struct.unpack("!H", quoted[4:6])[0] != self._identifier):
+                    continue
+                destination = socket.inet_ntoa(data[8 + 16:8 + 20])
+                status = "fragmentation" if code == ICMP_FRAG_NEEDED else "unreachable"
+                return destination, struct.unpack("!H", quoted[6:8])[0], status, None
+
+    def _probe_socket(self, address, size, timeout_ms, df, result):
+        self._set_df(df)
+        started = time.perf_counter()
+        deadline = started + timeout_ms / 1000
+        sequence = self._send_echo(address, size)
+
+        while True:
+            answer = self._receive(deadline - time.perf_counter(), size)
+            if answer is None:
+                result['status'] = "timeout"
+                return result
+            if answer[:2] == (address, sequence):
+                result.update(status=answer[2], ttl=answer[3])
+                if answer[2] == "success":
+                    result['rtt'] = (time.perf_counter() - started) * 1000
+                return result
+
+    def probe_many(self, hosts, size, timeout_ms, df=False):
+        """Probe every host once, all at the same time, and return host -> result dict.
+
+        With a socket every request goes out back to back and the replies are matched to their host by
+        address and sequence number, so any number of hosts costs one socket and one thread. IcmpSendEcho2
+        blocks, so on Windows the hosts are spread over a bounded pool of per-thread probers instead.
+        """
+        if self.sock is None:
+            with ThreadPoolExecutor(max_workers=min(MONITOR_WINDOWS_WORKERS, max(1, len(hosts)))) as pool:
+                probes = pool.map(lambda host: get_icmp_prober().probe(host, size, timeout_ms, df), hosts)
+                return dict(zip(hosts, probes))
+
+        self._set_df(df)
+        results = {}
+        waiting = {}  # (address, sequence) -> (host, time sent)
+        for host in hosts:
+            results[host] = {'status': "error", 'rtt': None, 'ttl': None, 'size': size}
+            try:
+                address = self.resolve(host)
+                waiting[(address, self._send_echo(address, size))] = (host, time.perf_counter())
+            except OSError as e:
+                if e.errno in (errno.EHOSTUNREACH, errno.ENETUNREACH):
+                    results[host]['status'] = "unreachable"
+
+        deadline = time.perf_counter() + timeout_ms / 1000
+        while waiting:
+            answer = self._receive(deadline - time.perf_counter(), size)
+            if answer is None:
+                break
+            sent = waiting.pop(answer[:2], None)
+            if sent is None:
+                continue
+            host, started = sent
+            results[host].update(status=answer[2], ttl=answer[3])
+            if answer[2] == "success":
+                results[host]['rtt'] = (time.perf_counter() - started) * 1000
+
+        for host, _ in waiting.values():
+            results[host]['status'] = "timeout"
+        return results
+
+
+# One prober per thread so concurrent MTU probes never share a socket
+_icmp_probers = threading.local()
+_icmp_available = True
+
+
+def get_icmp_prober():
+    """Return this thread's IcmpProber, or None if in-process ICMP is not possible here."""
+    global _icmp_available
+    if not _icmp_available:
+        return None
+    prober = getattr(_icmp_probers, 'prober', None)
+    if prober is None:
+        try:
+            prober = _icmp_probers.prober = IcmpProber()
+        except (OSError, AttributeError) as e:
+            log.debug("In-process ICMP not available (%s), falling back to the ping command", e)
+            _icmp_available = False
+            return None
+    return prober
+
+
+def send_ping_with_mtu(mtu_size, remote_host, timeout):
+    """Send a ping with the specified MTU and the DF (Don't Fragment) bit set."""
+    prober = get_icmp_prober()
+    if prober is None:
+        return send_ping_with_mtu_command(mtu_size, remote_host, timeout)
+
+    result = prober.probe(remote_host, int(mtu_size), int(timeout))
+    log.debug("Probe of %s with MTU %s: %s", remote_host, mtu_size, result)
+    # Unreachable answers say nothing about the size, so the MTU search treats them as errors
+    return result['status'] if result['status'] in ("success", "fragmentation", "timeout") else "error"
+
+def send_ping_with_mtu_command(mtu_size, remote_host, timeout):
+    """Send a ping with the DF bit set through the ping command, for when in-process ICMP is unavailable."""
+    try:
+        # The command sends a ping with the specified packet size, DF bit, and timeout
+        command = f'ping -f -l {mtu_size} -w {timeout} {remote_host}'
+        log.debug("Running command: %s", command)
+        result = run_command("ping -f -l", command.split())
+
+        output = result.stdout
+        log.debug("Ping result output:\n%s", output)
+
+        # Check for the fragmentation message
+        if "Packet needs to be fragmented" in output:
+            log.debug("Ping failed: MTU %s is too large, needs to fragment.", mtu_size)
+            return "fragmentation"
+
+        # Check for "Request timed out" message
+        if "Request timed out" in output:
+            log.debug("Ping failed: Request timed out.")
+            return "timeout"
+
+        # If neither condition is met, assume the ping was successful
+        log.debug("Ping successful with MTU %s.", mtu_size)
+        return "success"
+
+    except Exception as e:
+        log.error("Failed to send ping: %s", e)
+        return "error"
+
+def discover_path_mtu(min_mtu, max_mtu, probe, fanout=MTU_PROBE_FANOUT, should_stop=None, on_probe=None,
+                      on_progress=None):
+    """Find the largest size between min_mtu and max_mtu that gets through, probing several sizes at once.
+
+    probe(size) returns "success", "fragmentation", "timeout" or "error", like send_ping_with_mtu(). The first
+    round probes min_mtu, max_mtu and `fanout` sizes in between concurrently. Every later round probes `fanout`
+    sizes spread evenly across the remaining bracket, so the bracket shrinks by a factor of fanout + 1 per
+    round instead of 2. Timeouts count as too large; errors are inconclusive.
+
+    on_probe(size, result) and on_progress(percent) are called from the calling thread. Returns a dict with
+    the 'mtu' found (None if even min_mtu fails), the number of 'probes' and 'rounds', the wall time in
+    'elapsed' seconds, and 'stopped' if should_stop() ended the search early.
+    """
+    if max_mtu <= min_mtu:
+        raise ValueError("Maximum MTU should be greater than Minimum MTU.")
+
+    started = time.perf_counter()
+    good = min_mtu - 1  # Largest size known to get through
+    bad = max_mtu + 1  # Smallest size known not to
+    probes = 0
+    rounds = 0
+    stopped = False
+    initial_width = math.log(bad - good)
+
+    with ThreadPoolExecutor(max_workers=fanout + 2) as pool:
+        sizes = {min_mtu, max_mtu}
+        while bad - good > 1:
+            if should_stop is not None and should_stop():
+                stopped = True
+                break
+
+            # Spread the candidates evenly over the open bracket
+            count = min(fanout, bad - good - 1)
+            sizes.update(good + ((bad - good) * i) // (count + 1) for i in range(1, count + 1))
+            sizes = {size for size in sizes if good < size < bad}
+
+            futures = {pool.submit(probe, size): size for size in sorted(sizes)}
+            results = {}
+            for future in as_completed(futures):
+                size = futures[future]
+                try:
+                    results[size] = future.result()
+                except Exception as e:
+                    log.error("Probe of %s failed: %s", size, e)
+                    results[size] = "error"
+                if on_probe is not None:
+                    on_probe(size, results[size])
+            probes += len(futures)
+            rounds += 1
+
+            passed = [size for size, result in results.items() if result == "success"]
+            failed = [size for size, result in results.items() if result in ("fragmentation", "timeout")]
+            if not passed and not failed:
+                raise Exception("Every probe in the round failed, check the remote host.")
+            if passed:
+                good = max(good, max(passed))
+            # A lost probe can fail below a size that got through; only failures above good narrow the bracket
+            above = [size for size in failed if size > good]
+            if above:
+                bad = min(bad, min(above))
+
+            if good < min_mtu and min_mtu in failed:
+                break  # Even the minimum does not get through
+
+            if on_progress is not None:
+                on_progress(100 * (1 - math.log(max(bad - good, 1)) / initial_width))
+            sizes = set()
+
+    elapsed = time.perf_counter() - started
+    mtu = good if good >= min_mtu else None
+    log.debug("MTU search finished: %s after %s probes in %s rounds, %.2fs", mtu, probes, rounds, elapsed)
+    return {'mtu': mtu, 'probes': probes, 'rounds': rounds, 'elapsed': elapsed, 'stopped': stopped}
+
+
+class SimulatedPath:
+    """Stand-in for send_ping_with_mtu() on a path that passes sizes up to `mtu`.
+
+    Each probe sleeps for `latency` seconds; sizes above the MTU answer `oversize` ("fragmentation" or
+    "timeout"). Counts the probes it answers, so it can drive discover_path_mtu() without a network.
+    """
+
+    def __init__(self, mtu, latency=0.0, oversize="fragmentation"):
+        self.mtu = mtu
+        self.latency = latency
+        self.oversize = oversize
+        self.probes = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, size):
+        time.sleep(self.latency)
+        with self._lock:
+            self.probes += 1
+        return "success" if size <= self.mtu else self.oversize
+
+
+# RTT histogram used for ping percentiles: buckets grow 5% at a time from 0.01 ms to about 60 s
+RTT_HISTOGRAM_BASE = 0.01
+RTT_HISTOGRAM_GROWTH = 1.05
+RTT_HISTOGRAM_BUCKETS = 320
+
+# One parsed ping reply; status is "success", "timeout", "fragmentation", "unreachable" or "error"
+PingRecord = namedtuple("PingRecord", ["seq", "rtt", "ttl", "status"])
+
+PING_REPLY_PATTERN = re.compile(r"Reply from ([\d.]+): bytes=\d+ time[<=]([\d.]+)ms TTL=(\d+)")
+
+
+class LogHistogram:
+    """Counts values (milliseconds) in a fixed number of log-scale buckets, so percentiles cost constant memory.
+
+    Bucket i holds values up to base * growth ** (i + 1); anything past the last bucket is counted in it.
+    """
+
+    def __init__(self, base=RTT_HISTOGRAM_BASE, growth=RTT_HISTOGRAM_GROWTH, buckets=RTT_HISTOGRAM_BUCKETS):
+        self.base = base
+        self.growth = growth
+        self.count = 0
+        self.min = None
+        self.max = None
+        self._buckets = [0] * buckets
+
+    def add(self, value):
+        self.count += 1
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        bucket = 0 if value <= self.base else int(math.log(value / self.base, self.growth))
+        self._buckets[min(bucket, len(self._buckets) - 1)] += 1
+
+    def percentile(self, percent):
+        """Return the value below which `percent` of the values fall, or None when empty."""
+        if not self.count:
+            return None
+        wanted = math.ceil(self.count * percent / 100)
+        seen = 0
+        for bucket, count in enumerate(self._buckets):
+            seen += count
+            if seen >= wanted:
+                if bucket == len(self._buckets) - 1:
+                    return self.max  # The last bucket has no upper edge
+                # Report the bucket's upper edge, clamped to what was actually seen
+                return min(max(self.base * self.growth ** (bucket + 1), self.min), self.max)
+        return self.max
+
+
+class PingStats:
+    """Running ping statistics in constant memory.
+
+    Mean and standard deviation use Welford's online algorithm, jitter is the RFC 3550 smoothed estimate and
+    percentiles come from a fixed log-scale histogram (accurate to one 5% bucket).
+    """
+
+    def __init__(self):
+        self.sent = 0
+        self.received = 0
+        self.min = None
+        self.max = None
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.jitter = 0.0
+        self._last_rtt = None
+        self._histogram = LogHistogram()
+
+    def add(self, record):
+        """Fold one PingRecord into the statistics."""
+        self.sent += 1
+        if record.status != "success" or record.rtt is None:
+            return
+
+        rtt = record.rtt
+        self.received += 1
+        self.min = rtt if self.min is None else min(self.min, rtt)
+        self.max = rtt if self.max is None else max(self.max, rtt)
+
+        delta = rtt - self.mean
+        self.mean += delta / self.received
+        self._m2 += delta * (rtt - self.mean)
+
+        if self._last_rtt is not None:
+            self.jitter += (abs(rtt - self._last_rtt) - self.jitter) / 16
+        self._last_rtt = rtt
+        self._histogram.add(rtt)
+
+    @property
+    def loss(self):
+        """Percentage of probes without a reply."""
+        return 100.0 * (self.sent - self.received) / self.sent if self.sent else 0.0
+
+    @property
+    def stddev(self):
+        return math.sqrt(self._m2 / (self.received - 1)) if self.received > 1 else 0.0
+
+    def percentile(self, percent):
+        """Return the RTT below which `percent` of the replies fall, or None without replies."""
+        return self._histogram.percentile(percent)
+
+    def summary(self):
+        """Return the statistics as a plain dict."""
+        return {
+            'sent': self.sent, 'received': self.received, 'loss': self.loss,
+            'min': self.min, 'avg': self.mean if self.received else None, 'max': self.max,
+            'stddev': self.stddev, 'jitter': self.jitter,
+            'p50': self.percentile(50), 'p95': self.percentile(95), 'p99': self.percentile(99),
+        }
+
+
+class PingSession:
+    """Turns ping results, from the prober or from ping.exe output lines, into PingRecords and statistics."""
+
+    def __init__(self, host):
+        self.host = host
+        self.stats = PingStats()
+        self._seq = 0
+
+    def record(self, status, rtt=None, ttl=None):
+        """Add one result and return its PingRecord."""
+        self._seq += 1
+        record = PingRecord(self._seq, rtt, ttl, status)
+        self.stats.add(record)
+        return record
+
+    def parse_line(self, line):
+        """Add the result in one line of ping.exe output; returns None for lines that are not results."""
+        match = PING_REPLY_PATTERN.search(line)
+        if match:
+            return self.record("success", float(match.group(2)), int(match.group(3)))
+        if "Request timed out" in line:
+            return self.record("timeout")
+        if "Packet needs to be fragmented" in line:
+            return self.record("fragmentation")
+        if "unreachable" in line:
+            return self.record("unreachable")
+        if "General failure" in line or "transmit failed" in line:
+            return self.record("error")
+        return None
+
+
+def format_ping_stats(summary):
+    """Render a PingStats summary for the Ping tab."""
+    def ms(value):
+        return "-" if value is None else f"{value:.2f} ms"
+
+    return (f"Sent: {summary['sent']}\n"
+            f"Received: {summary['received']}\n"
+            f"Loss: {summary['loss']:.1f}%\n\n"
+            f"Min: {ms(summary['min'])}\n"
+            f"Avg: {ms(summary['avg'])}\n"
+            f"Max: {ms(summary['max'])}\n"
+            f"StdDev: {ms(summary['stddev'] if summary['received'] > 1 else None)}\n"
+            f"Jitter: {ms(summary['jitter'] if summary['received'] > 1 else None)}\n\n"
+            f"p50: {ms(summary['p50'])}\n"
+            f"p95: {ms(summary['p95'])}\n"
+            f"p99: {ms(summary['p99'])}")
+
+
+class PingMonitor:
+    """Pings many targets every `interval` seconds from one background thread.
+
+    Each round is one IcmpProber.probe_many() call, so targets share a single socket instead of each getting
+    a thread and a ping process. Results are folded into a PingStats per target; snapshot() returns a copy
+    that the GUI can poll at its own pace. on_record(target, record), if given, is called on the monitor's
+    thread for every result.
+    """
+
+    def __init__(self, targets, interval=MONITOR_INTERVAL, timeout_ms=MONITOR_TIMEOUT_MS, size=32, on_record=None):
+        self.targets = list(dict.fromkeys(targets))  # Drop duplicates, keep the order
+        self.interval = interval
+        # A reply later than the interval would overlap the next round
+        self.timeout_ms = min(timeout_ms, int(interval * 1000))
+        self.size = size
+        self.on_record = on_record
+        self.stats = {target: PingStats() for target in self.targets}
+        self.last = {target: None for target in self.targets}  # Latest PingRecord per target
+        self.rounds = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        prober = get_icmp_prober()
+        if prober is None:
+            log.error("The monitor needs in-process ICMP, which is not available here")
+            return
+        if prober.sock is not None:
+            # Room for a burst of replies from every target at once
+            prober.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1024 * 1024)
+
+        while not self._stop.is_set():
+            started = time.monotonic()
+            results = prober.probe_many(self.targets, self.size, self.timeout_ms)
+            with self._lock:
+                self.rounds += 1
+                for target, result in results.items():
+                    record = PingRecord(self.rounds, result['rtt'], result['ttl'], result['status'])
+                    self.stats[target].add(record)
+                    self.last[target] = record
+            if self.on_record is not None:
+                for target in results:
+                    self.on_record(target, self.last[target])
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def snapshot(self):
+        """Return [(target, latest PingRecord or None, stats summary)] for every target."""
+        with self._lock:
+            return [(target, self.last[target], self.stats[target].summary()) for target in self.targets]
+
+
+def run_route_command(command):
+    """Run a 'route' command and raise with its stderr if it fails."""
+    log.debug("Running command: %s", command)
+    # route.exe is started directly rather than through cmd.exe, and timed per verb ('route add', ...)
+    args = command.split()
+    result = run_command(" ".join(args[:2]), args)
+    route_print_snapshot.invalidate()
+
+    if result.returncode != 0:
+        raise Exception(result.stderr)
+
+def run_netsh_script(lines):
+    """Run the netsh lines in order, stopping at the first that fails.
+
+    They go to the shared netsh host when it is enabled; otherwise they are written to a temporary script
+    file and run with a single 'netsh -f' process.
+    """
+    script = "\n".join(lines) + "\n"
+    log.debug("Running netsh script:\n%s", script)
+
+    if netsh_host_enabled():
+        try:
+            for line in lines:
+                # Interactive netsh has no exit status, so anything but its success text is the error
+                status, output = netsh_host.run(line, "netsh " + " ".join(line.split()[:4]))
+                if status or output.strip() not in NETSH_OK_OUTPUT:
+                    raise Exception(f"netsh failed with error: {output.strip() or f'exit status {status}'}")
+        finally:
+            route_print_snapshot.invalidate()
+        return
+
+    fd, path = tempfile.mkstemp(suffix=".txt", prefix="nic_manager_")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(script)
+        result = run_command("netsh -f", ["netsh", "-f", path])
+    finally:
+        os.remove(path)
+        route_print_snapshot.invalidate()
+
+    log.debug("netsh script output:\n%s", result.stdout)
+    if result.returncode != 0:
+        raise Exception(f"netsh failed with error: {(result.stderr or result.stdout).strip()}")
+
+def route_add(destination, netmask, gateway, metric):
+    """Add a route to the Windows routing table using 'route add'."""
+    run_route_command(f'route add {destination} mask {netmask} {gateway} metric {metric}')
+    log.debug("Route successfully added")
+
+def route_delete(destination, netmask, gateway=""):
+    """Delete a route from the Windows routing table using 'route delete'."""
+    run_route_command(f'route delete {destination} mask {netmask} {gateway}')
+    log.debug("Route successfully deleted")
+
+# A parsed routing table row; network and prefix_length are the destination as an integer and a mask length
+Route = namedtuple("Route", "destination netmask gateway interface metric network prefix_length")
+
+
+def ipv4_to_int(address):
+    """Turn a dotted IPv4 address into a 32-bit integer, or raise ValueError."""
+    try:
+        return struct.unpack("!I", socket.inet_aton(address))[0]
+    except OSError as e:
+        raise ValueError(f"Invalid IPv4 address {address}") from e
+
+
+def parse_route(row):
+    """Turn a [destination, netmask, gateway, interface, metric] row into a Route, or raise ValueError."""
+    destination, netmask, gateway, interface, metric = row[:5]
+    mask = ipv4_to_int(netmask)
+    network = ipv4_to_int(destination)
+    prefix_length = bin(mask).count("1")
+    if mask != (0xFFFFFFFF << (32 - prefix_length)) & 0xFFFFFFFF:
+        raise ValueError(f"Netmask {netmask} is not contiguous")
+    return Route(destination, netmask, gateway, interface, int(metric) if metric.isdigit() else 0,
+                 network & mask, prefix_length)
+
+
+class _TrieNode:
+    __slots__ = ("network", "prefix_length", "children", "best")
+
+    def __init__(self, network, prefix_length):
+        self.network = network
+        self.prefix_length = prefix_length
+        self.children = [None, None]
+        self.best = None  # Lowest-metric route for exactly this prefix
+
+
+class RouteIndex:
+    """Longest-prefix-match index over a routing table, as a path-compressed binary (Patricia) trie.
+
+    Each node holds one prefix and only prefixes that branch or carry routes get a node, so a lookup follows at
+    most 32 edges. When several routes share a prefix the one with the lowest metric wins, as it does in Windows.
+    """
+
+    def __init__(self, rows=()):
+        self.root = _TrieNode(0, 0)
+        self.routes = []
+        self.skipped = []  # (row, reason) for rows that could not be parsed
+        for row in rows:
+            try:
+                self.add(parse_route(row))
+            except ValueError as e:
+                self.skipped.append((row, str(e)))
+
+    def add(self, route):
+        self.routes.append(route)
+        node = self.root
+        network, prefix_length = route.network, route.prefix_length
+        while True:
+            if node.prefix_length == prefix_length:
+                if node.best is None or route.metric < node.best.metric:
+                    node.best = route
+                return
+            bit = (network >> (31 - node.prefix_length)) & 1
+            child = node.children[bit]
+            if child is None:
+                leaf = node.children[bit] = _TrieNode(network, prefix_length)
+                leaf.best = route
+                return
+
+            # Bits shared by the new prefix and the child's prefix
+            common = min(prefix_length, child.prefix_length, 32 - (network ^ child.network).bit_length())
+            if common == child.prefix_length:
+                node = child
+                continue
+
+            # Split the edge with a node for the shared bits
+            middle = node.children[bit] = _TrieNode(network & (0xFFFFFFFF << (32 - common)) & 0xFFFFFFFF, common)
+            middle.children[(child.network >> (31 - common)) & 1] = child
+            if common == prefix_length:
+                middle.best = route
+            else:
+                leaf = middle.children[(network >> (31 - common)) & 1] = _TrieNode(network, prefix_length)
+                leaf.best = route
+            return
+
+    def lookup(self, address):
+        """Return the Route a packet to `address` (dotted string or integer) would take, or None."""
+        if isinstance(address, str):
+            address = ipv4_to_int(address)
+        node, best = self.root, self.root.best
+        while node is not None:
+            length = node.prefix_length
+            if length and (address ^ node.network) >> (32 - length):
+                break  # The path no longer covers the address
+            if node.best is not None:
+                best = node.best
+            if length == 32:
+                break
+            node = node.children[(address >> (31 - length)) & 1]
+        return best
+
+    def lookup_prefix(self, network, prefix_length):
+        """Return (the route covering the whole prefix, the more specific routes that carve pieces out of it)."""
+        covering, node = None, self.root
+        while node is not None and node.prefix_length <= prefix_length:
+            length = node.prefix_length
+            if length and (network ^ node.network) >> (32 - length):
+                return covering, []  # The trie branches away before reaching the prefix
+            if node.best is not None:
+                covering = node.best
+            if length == prefix_length:
+                subtrees = node.children
+                break
+            node = node.children[(network >> (31 - length)) & 1]
+        else:
+            # The path skipped past the prefix length; the node below is inside the prefix only if it matches
+            if node is None or (network ^ node.network) >> (32 - prefix_length):
+                return covering, []
+            subtrees = [node]
+
+        inside = []
+        stack = [child for child in subtrees if child is not None]
+        while stack:
+            current = stack.pop()
+            if current.best is not None:
+                inside.append(current.best)
+            stack.extend(child for child in current.children if child is not None)
+        return covering, sorted(inside, key=lambda route: (route.network, route.prefix_length))
+
+    def lookup_many(self, targets):
+        """Look up many addresses and CIDR blocks; return [(target, route, more specific routes)] in order."""
+        results = []
+        for target in targets:
+            if "/" in target:
+                network, _, length = target.partition("/")
+                prefix_length = int(length)
+                if not 0 <= prefix_length <= 32:
+                    raise ValueError(f"Invalid prefix length in {target}")
+                mask = (0xFFFFFFFF << (32 - prefix_length)) & 0xFFFFFFFF
+                results.append((target,) + self.lookup_prefix(ipv4_to_int(network) & mask, prefix_length))
+            else:
+                results.append((target, self.lookup(target), []))
+        return results
+
+
+def route_lookup(index, rows, targets):
+    """Build a RouteIndex from rows unless one is given, look up targets and return (index, results)."""
+    if index is None:
+        start = time.perf_counter()
+        index = RouteIndex(rows)
+        log.debug("Indexed %s routes in %.3fs", len(index.routes), time.perf_counter() - start)
+    return index, index.lookup_many(targets)
+
+
+def analyze_routes(routes):
+    """Find routing table problems in one sorted sweep over parsed Routes; return [(route, category, other)].
+
+    Sorting by (network, prefix length) puts every prefix right after the prefixes that contain it, so a stack
+    of open prefixes yields each prefix's nearest enclosing one (a containment forest) in O(n log n). `other`
+    is the route the finding is about, see describe_route_issue(). Categories:
+    - shadowed: more specific routes cover the whole prefix, so it never matches
+    - duplicate: another route has the same prefix and gateway with a lower metric, so it is never used
+    - redundant: it lies inside a wider route with the same gateway and interface, so it changes nothing
+    - overlap: it lies inside a wider route (other than the default route) through a different gateway
+    """
+    issues = []
+    # Network, prefix length and metric packed into one int; unlike tuples, ints are not tracked by the GC
+    ordered = sorted(routes, key=lambda route: route[5] << 38 | route[6] << 32 | min(route[4], 0xFFFFFFFF))
+
+    # One entry per distinct prefix in flat lists, which keeps allocations (and GC passes) down on big tables:
+    # its first and one-past-last index in `ordered`, its last address and how much of it is more specific
+    starts, stops, ends, covered = [], [], [], []
+    stack = []  # Indexes of the open prefixes, each containing the next
+    count = len(ordered)
+    i = 0
+    while i < count:
+        # All routes for one prefix, lowest metric first
+        first = ordered[i]
+        network, prefix_length = first[5], first[6]
+        j = i + 1
+        while j < count and ordered[j][5] == network and ordered[j][6] == prefix_length:
+            j += 1
+
+        paths = (first,)
+        if j > i + 1:
+            used = {}
+            for route in ordered[i:j]:
+                best = used.setdefault(route[2], route)
+                if best is not route:
+                    issues.append((route, "duplicate", best))
+            paths = used.values()
+
+        size = 1 << (32 - prefix_length)
+        while stack and ends[stack[-1]] < network:
+            stack.pop()
+        if stack:
+            parent = stack[-1]
+            covered[parent] += size
+            wider = ordered[starts[parent]]
+            if wider[6] > 0:
+                for route in paths:
+                    if route[2] == "On-link":
+                        continue  # Interface and host routes Windows keeps for its own addresses
+                    same_path = route[2] == wider[2] and route[3] == wider[3]
+                    issues.append((route, "redundant" if same_path else "overlap", wider))
+
+        stack.append(len(starts))
+        starts.append(i)
+        stops.append(j)
+        ends.append(network + size - 1)
+        covered.append(0)
+        i = j
+
+    for node in range(len(starts)):
+        if covered[node] == ends[node] - ordered[starts[node]][5] + 1:
+            for route in ordered[starts[node]:stops[node]]:
+                issues.append((route, "shadowed", None))
+    return issues
+
+
+def describe_route_issue(category, other):
+    """Explain one analyze_routes() finding."""
+    if category == "shadowed":
+        return "Shadowed: more specific routes cover the whole prefix, so it never matches"
+    if category == "duplicate":
+        return (f"Duplicate: the route with the same prefix and gateway on {other.interface} has a lower "
+                f"metric ({other.metric}), so this one is not used")
+    if category == "redundant":
+        return (f"Redundant: {other.destination}/{other.prefix_length} already goes through {other.gateway} "
+                f"on {other.interface}")
+    return f"Overlap: takes part of {other.destination}/{other.prefix_length} away from {other.gateway}"
+
+
+def analyze_route_rows(rows):
+    """Parse route rows and analyze them; return {route key: [(category, other)]}, keyed like the table rows."""
+    routes = []
+    for row in rows:
+        try:
+            routes.append(parse_route(row))
+        except ValueError:
+            pass
+    issues = {}
+    for route, category, other in analyze_routes(routes):
+        issues.setdefault(tuple(route[:4]), []).append((category, other))
+    return issues
+
+
+# Columns of the route files written by export_routes() and read by import_routes()
+ROUTE_FILE_FIELDS = ["destination", "netmask", "gateway", "interface", "metric"]
+
+# How long route_modify() waits for the table to show a change, and how often it looks
+ROUTE_CONVERGE_TIMEOUT = 5.0
+ROUTE_CONVERGE_POLL = 0.05
+
+# Route commands per netsh process when applying a batch; each process is one progress step
+ROUTE_BATCH_SIZE = 100
+
+
+def export_routes(rows, path):
+    """Write route rows to a .json file, or to CSV for any other extension."""
+    records = [dict(zip(ROUTE_FILE_FIELDS, row)) for row in rows]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".json"):
+            json.dump(records, f, indent=2)
+        else:
+            writer = csv.DictWriter(f, fieldnames=ROUTE_FILE_FIELDS)
+            writer.writeheader()
+            writer.writerows(records)
+
+
+def import_routes(path):
+    """Read route rows from a .json or CSV route file, or raise ValueError naming the bad entry.
+
+    The destination may be given in CIDR form with an empty netmask. The interface (by IP) and metric may be
+    left empty; the interface is then picked by which subnet the gateway is in. The metric is the one
+    'route print' shows and export_routes() writes, the route metric plus the interface metric.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".json"):
+            records = json.load(f)
+        else:
+            records = list(csv.DictReader(f))
+
+    rows = []
+    for number, record in enumerate(records, start=1):
+        row = [str(record.get(field) or "").strip() for field in ROUTE_FILE_FIELDS]
+        destination, _, length = row[0].partition("/")
+        if length and not row[1]:
+            if not length.isdigit() or int(length) > 32:
+                raise ValueError(f"Route {number}: invalid prefix length in {row[0]}")
+            row[0], row[1] = destination, prefix_length_to_mask(int(length))
+        row[2] = row[2] or "On-link"
+        if row[4] and not row[4].isdigit():
+            raise ValueError(f"Route {number}: invalid metric {row[4]}")
+        try:
+            parse_route(row)
+            if row[2] != "On-link":
+                ipv4_to_int(row[2])
+        except ValueError as e:
+            raise ValueError(f"Route {number}: {e}") from e
+        rows.append(row)
+    return rows
+
+
+def diff_routes(current, desired, replace=False):
+    """Return (adds, deletes) that turn the current route rows into the desired ones.
+
+    Routes match on destination, netmask, gateway and interface; metrics are only used for the routes that
+    get added. With replace, current routes through a gateway that are not desired are deleted too; on-link
+    routes belong to the interfaces and are never deleted.
+    """
+    current_keys = {tuple(row[:4]) for row in current}
+    desired_keys = set()
+    adds = []
+    for row in desired:
+        key = tuple(row[:4])
+        if key not in current_keys and key not in desired_keys:
+            adds.append(row)
+        desired_keys.add(key)
+
+    deletes = []
+    if replace:
+        deletes = [row for row in current if row[2] != "On-link" and tuple(row[:4]) not in desired_keys]
+    return adds, deletes
+
+
+def plan_route_import(backend, path):
+    """Read a route file and diff it against the current table; return a plan for apply_route_batch()."""
+    rows = import_routes(path)
+    interfaces = backend_route_interfaces(backend)
+
+    desired, unresolved = [], []
+    for row in rows:
+        try:
+            desired.append(resolve_route_interface(row, interfaces)[0])
+        except ValueError as e:
+            unresolved.append(("add", row, str(e)))
+
+    current = backend.get_routing_table()
+    # The deletes are only applied if the user chooses to replace the table's gateway routes
+    adds, deletes = diff_routes(current, desired, replace=True)
+    return {'interfaces': interfaces, 'adds': adds, 'deletes': deletes, 'unresolved': unresolved,
+            'unchanged': len(desired) - len(adds)}
+
+
+def route_interfaces(details):
+    """Map NIC details by name to ({interface IP: name}, [(network, mask, IP)], {name: interface metric}) for
+    resolving route interfaces and writing their metrics."""
+    by_ip = {}
+    subnets = []
+    metrics = {}
+    for name, nic_details in details.items():
+        ip_address = nic_details.get('IP Address')
+        if not ip_address:
+            continue
+        by_ip[ip_address] = name
+        metric = str(nic_details.get('Interface Metric', ''))
+        metrics[name] = int(metric) if metric.isdigit() else 0
+        try:
+            mask = ipv4_to_int(nic_details.get('Subnet Mask', ''))
+            subnets.append((ipv4_to_int(ip_address) & mask, mask, ip_address))
+        except ValueError:
+            pass
+    return by_ip, subnets, metrics
+
+
+def backend_route_interfaces(backend):
+    """Read the NICs from the backend and return them as route_interfaces() does."""
+    details, _ = backend.get_all_nic_details(backend.get_nic_names())
+    return route_interfaces(details)
+
+
+def resolve_route_interface(row, interfaces):
+    """Return (row with its interface IP filled in, interface name), or raise ValueError."""
+    by_ip, subnets, _ = interfaces
+    interface = row[3]
+    if not interface and row[2] != "On-link":
+        gateway = ipv4_to_int(row[2])
+        interface = next((ip for network, mask, ip in subnets if gateway & mask == network), "")
+    if interface not in by_ip:
+        raise ValueError(f"No interface with IP {interface}" if interface else
+                         f"No interface is on the same subnet as gateway {row[2]}")
+    return row[:3] + [interface] + row[4:], by_ip[interface]
+
+
+def route_metric(metric, interface_metric):
+    """Turn the metric a route row shows (route metric + interface metric) into the route metric netsh sets."""
+    return max(int(metric) - interface_metric, 0)
+
+
+def route_script_line(action, row, name, interface_metric=0):
+    """Return the 'netsh interface ipv4' script line that adds, deletes or sets (the metric of) the route.
+
+    The row's metric is the one 'route print' shows, so the interface's metric is taken off it for netsh.
+    """
+    destination, netmask, gateway, _, metric = row[:5]
+    prefix = f"{destination}/{parse_route(row).prefix_length}"
+    line = f'interface ipv4 {action} route prefix={prefix} interface="{name}"'
+    if gateway != "On-link":
+        line += f" nexthop={gateway}"
+    if action in ("add", "set") and metric:
+        line += f" metric={route_metric(metric, interface_metric)}"
+    return line + " store=active"  # Not persistent, like 'route add' without -p
+
+
+def apply_route_batch(backend, adds, deletes, interfaces, progress=None):
+    """Delete and add routes with one netsh script per ROUTE_BATCH_SIZE routes; return the failures.
+
+    Failures are (action, row, message). When a netsh script fails, the routes of its chunk that did not
+    take effect are retried one by one to find which ones fail and why. The table is read back from the
+    backend at the end, and any route that is still not as requested is reported as well.
+    """
+    failures = []
+    operations = []
+    interface_metrics = interfaces[2]
+    for action, rows in (("delete", deletes), ("add", adds)):
+        for row in rows:
+            try:
+                resolved, name = resolve_route_interface(row, interfaces)
+                line = route_script_line(action, resolved, name, interface_metrics[name])
+                operations.append((action, resolved, line))
+            except ValueError as e:
+                failures.append((action, row, str(e)))
+
+    def pending(ops):
+        backend.invalidate()
+        keys = {tuple(row[:4]) for row in backend.get_routing_table()}
+        return [op for op in ops if (tuple(op[1][:4]) in keys) != (op[0] == "add")]
+
+    total = len(operations)
+    for start in range(0, total, ROUTE_BATCH_SIZE):
+        chunk = operations[start:start + ROUTE_BATCH_SIZE]
+        try:
+            backend.run_netsh_script([line for _, _, line in chunk])
+        except Exception as e:
+            log.debug("Route batch failed (%s), retrying its routes one by one", e)
+            for action, row, line in pending(chunk):
+                try:
+                    backend.run_netsh_script([line])
+                except Exception as e:
+                    failures.append((action, row, str(e)))
+        if progress is not None:
+            progress(start + len(chunk), total)
+
+    reported = {(action, tuple(row[:4])) for action, row, _ in failures}
+    for action, row, _ in pending(operations):
+        if (action, tuple(row[:4])) not in reported:
+            failures.append((action, row, "Not as requested in the routing table afterwards"))
+    return failures
+
+
+def route_modify(backend, current, new):
+    """Change the route row `current` into `new` without a window in which neither exists.
+
+    A change of metric alone is made in place with 'netsh interface ipv4 set route'. Anything else adds the
+    new route before deleting the old one, both in one netsh script, so if the add fails the old route stays.
+    Metrics are the ones the routing table shows, route metric + interface metric; a change that would leave
+    the route as it is raises ValueError. Returns {'method', 'elapsed'}: the seconds from the start of the
+    change until the table read back from the backend shows it, or raises if it has not converged after
+    ROUTE_CONVERGE_TIMEOUT seconds.
+    """
+    interfaces = backend_route_interfaces(backend)
+    current, current_name = resolve_route_interface(list(current), interfaces)
+    new, new_name = resolve_route_interface(list(new), interfaces)
+    parse_route(new)
+    if new[4] and not new[4].isdigit():
+        raise ValueError(f"Invalid metric {new[4]}")
+
+    # The metric the table will show: netsh takes the route metric, which cannot go below 0
+    interface_metric = interfaces[2][new_name]
+    expected = str(route_metric(new[4], interface_metric) + interface_metric) if new[4] else None
+    in_place = new[:4] == current[:4]
+    if in_place and expected in (None, current[4]):
+        raise ValueError("The route is unchanged")
+
+    start = time.perf_counter()
+    if in_place:
+        method = "in place"
+        backend.run_netsh_script([route_script_line("set", new, new_name, interface_metric)])
+    else:
+        method = "make-before-break"
+        backend.run_netsh_script([route_script_line("add", new, new_name, interface_metric),
+                                  route_script_line("delete", current, current_name)])
+
+    # Converged once the new route is there with the metric asked for, and the old one gone
+    while True:
+        backend.invalidate()
+        table = {tuple(row[:4]): row[4] for row in backend.get_routing_table()}
+        metric = table.get(tuple(new[:4]))
+        done = metric is not None and expected in (None, metric)
+        if not in_place:
+            done = done and tuple(current[:4]) not in table
+        elapsed = time.perf_counter() - start
+        if done:
+            log.debug("Route modified %s, converged in %.0f ms", method, elapsed * 1000)
+            return {'method': method, 'elapsed': elapsed}
+        if elapsed > ROUTE_CONVERGE_TIMEOUT:
+            raise Exception(f"The routing table did not show the change after {ROUTE_CONVERGE_TIMEOUT:.0f}s")
+        time.sleep(ROUTE_CONVERGE_POLL)
+
+
+# Route change events: rtnetlink multicast group and message types (linux/rtnetlink.h)
+RTMGRP_IPV4_ROUTE = 0x40
+RTM_NEWROUTE = 24
+RTM_DELROUTE = 25
+
+# Seconds between route table reads when no change notifications are available
+ROUTE_POLL_INTERVAL = 2.0
+
+
+class NotifyRouteChangeSource:
+    """Route change events from NotifyRouteChange2 (Windows), delivered on a system thread."""
+
+    def __init__(self):
+        self.iphlpapi = ctypes.WinDLL("iphlpapi")
+        self.iphlpapi.NotifyRouteChange2.restype = ctypes.c_ulong
+        self.iphlpapi.CancelMibChangeNotify2.restype = ctypes.c_ulong
+        self._handle = ctypes.c_void_p()
+        self._callback = None
+
+    def start(self, callback):
+        # The ctypes thunk must stay referenced for as long as the notification is registered
+        prototype = ctypes.WINFUNCTYPE(None, ctypes.c_void_p, ctypes.c_void_p, ctypes.c_int)
+        self._callback = prototype(lambda context, row, notification_type: callback())
+        result = self.iphlpapi.NotifyRouteChange2(socket.AF_INET, self._callback, None, False,
+                                                  ctypes.byref(self._handle))
+        if result != 0:
+            self._callback = None
+            raise OSError(result, f"NotifyRouteChange2 failed with error {result}")
+
+    def stop(self):
+        if self._callback is not None:
+            self.iphlpapi.CancelMibChangeNotify2(self._handle)
+            self._callback = None
+
+
+class NetlinkRouteSource:
+    """Route change events from an rtnetlink socket (Linux), read on a background thread."""
+
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+        self.sock.bind((0, RTMGRP_IPV4_ROUTE))
+        self.sock.settimeout(0.5)  # How often the reader checks for stop()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, callback):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(callback,), daemon=True)
+        self._thread.start()
+
+    def _run(self, callback):
+        while not self._stop.is_set():
+            try:
+                data = self.sock.recv(65536)
+            except socket.timeout:
+                continue
+            except OSError as e:
+                if e.errno == errno.ENOBUFS:
+                    callback()  # Events were dropped, so something changed
+                    continue
+                log.error("Route netlink socket failed: %s", e)
+                return
+
+            # One datagram can hold several messages, each starting with a struct nlmsghdr
+            offset = 0
+            while offset + 16 <= len(data):
+                length, message_type = struct.unpack_from("=IH", data, offset)
+                if message_type in (RTM_NEWROUTE, RTM_DELROUTE):
+                    callback()
+                if length < 16:
+                    break
+                offset += (length + 3) & ~3
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+class PollingRouteSource:
+    """Route change events found by reading the routing table every `interval` seconds and comparing."""
+
+    def __init__(self, fetch, interval=ROUTE_POLL_INTERVAL):
+        self.fetch = fetch
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, callback):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(callback,), daemon=True)
+        self._thread.start()
+
+    def _run(self, callback):
+        last = None
+        while not self._stop.is_set():
+            try:
+                routes = self.fetch()
+                if last is not None and routes != last:
+                    callback()
+                last = routes
+            except Exception as e:
+                log.error("Failed to poll the routing table: %s", e)
+            self._stop.wait(self.interval)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+class FakeRouteSource:
+    """Route change events raised by hand with fire(), for exercising the watcher without a real table."""
+
+    def __init__(self):
+        self._callback = None
+
+    def start(self, callback):
+        self._callback = callback
+
+    def fire(self, count=1):
+        for _ in range(count):
+            if self._callback is not None:
+                self._callback()
+
+    def stop(self):
+        self._callback = None
+
+
+def select_route_source(fetch):
+    """Pick the best route change event source here, falling back to polling `fetch`."""
+    try:
+        if os.name == 'nt':
+            source = NotifyRouteChangeSource()
+        elif hasattr(socket, "AF_NETLINK"):
+            source = NetlinkRouteSource()
+        else:
+            source = None
+    except (OSError, AttributeError) as e:
+        log.debug("Route change notifications not available (%s), polling instead", e)
+        source = None
+    if source is None:
+        source = PollingRouteSource(fetch)
+    log.debug("Watching routes with %s", type(source).__name__)
+    return source
+
+
+# Environment variables that pick the read backend (see select_backend)
+BACKEND_ENV = "NIC_MANAGER_BACKEND"
+FIXTURE_ENV = "NIC_MANAGER_FIXTURE"
+
+
+class NetworkBackend:
+    """Read side of NIC Manager: NIC names, NIC details and the IPv4 routing table.
+
+    The GUI and the command line only read through a backend, so the data can come from netsh, from the
+    IP Helper API, from a recorded fixture or from a remote host (see fleet.py). Routes are lists of
+    [Network Destination, Netmask, Gateway, Interface, Metric] strings, the same columns 'route print' shows.
+    NetworkChangeSet writes through run_netsh_script(), so a change set lands where the backend reads.
+    """
+
+    name = "base"
+
+    def get_nic_names(self):
+        """Return the names of the connected interfaces."""
+        raise NotImplementedError
+
+    def get_nic_details(self, interface):
+        """Return the details dict of one interface."""
+        raise NotImplementedError
+
+    def get_all_nic_details(self, names):
+        """Return (details, errors) for many interfaces; see get_all_nic_details()."""
+        details = {}
+        errors = {}
+        for name in names:
+            try:
+                details[name] = self.get_nic_details(name)
+            except Exception as e:
+                errors[name] = str(e)
+        return details, errors
+
+    def get_routing_table(self):
+        """Return the IPv4 routing table as a list of route rows."""
+        raise NotImplementedError
+
+    def invalidate(self):
+        """Forget anything cached so the next read sees the current state."""
+
+    def run_netsh_script(self, lines):
+        """Run netsh script lines where this backend's interfaces live, raising if one fails."""
+        run_netsh_script(lines)
+
+
+class NetshBackend(NetworkBackend):
+    """Reads by running netsh and 'route print' and parsing their output."""
+
+    name = "netsh"
+
+    def get_nic_names(self):
+        return get_nic_names()
+
+    def get_nic_details(self, interface):
+        return get_nic_details(interface)
+
+    def get_all_nic_details(self, names):
+        return get_all_nic_details(names)
+
+    def get_routing_table(self):
+        return [list(row) for row in get_routing_table()]
+
+    def invalidate(self):
+        netsh_snapshot.invalidate()
+        route_print_snapshot.invalidate()
+
+
+AF_INET = 2
+ERROR_BUFFER_OVERFLOW = 111
+ERROR_NO_DATA = 232
+IF_OPER_STATUS_UP = 1
+IP_ADAPTER_DHCP_ENABLED = 0x04
+GAA_FLAG_SKIP_ANYCAST = 0x0002
+GAA_FLAG_SKIP_MULTICAST = 0x0004
+GAA_FLAG_INCLUDE_GATEWAYS = 0x0080
+
+
+class SOCKADDR_IN(ctypes.Structure):
+    _fields_ = [("sin_family", ctypes.c_ushort), ("sin_port", ctypes.c_ushort),
+                ("sin_addr", ctypes.c_ubyte * 4), ("sin_zero", ctypes.c_ubyte * 8)]
+
+
+class SOCKADDR_IN6(ctypes.Structure):
+    _fields_ = [("sin6_family", ctypes.c_ushort), ("sin6_port", ctypes.c_ushort),
+                ("sin6_flowinfo", ctypes.c_uint32), ("sin6_addr", ctypes.c_ubyte * 16),
+                ("sin6_scope_id", ctypes.c_uint32)]
+
+
+class SOCKADDR_INET(ctypes.Union):
+    _fields_ = [("Ipv4", SOCKADDR_IN), ("Ipv6", SOCKADDR_IN6), ("si_family", ctypes.c_ushort)]
+
+
+class SOCKET_ADDRESS(ctypes.Structure):
+    _fields_ = [("lpSockaddr", ctypes.POINTER(SOCKADDR_IN)), ("iSockaddrLength", ctypes.c_int)]
+
+
+class IP_ADAPTER_UNICAST_ADDRESS(ctypes.Structure):
+    pass
+
+
+IP_ADAPTER_UNICAST_ADDRESS._fields_ = [
+    ("Length", ctypes.c_uint32), ("Flags", ctypes.c_uint32),
+    ("Next", ctypes.POINTER(IP_ADAPTER_UNICAST_ADDRESS)),
+    ("Address", SOCKET_ADDRESS),
+    ("PrefixOrigin", ctypes.c_int), ("SuffixOrigin", ctypes.c_int), ("DadState", ctypes.c_int),
+    ("ValidLifetime", ctypes.c_uint32), ("PreferredLifetime", ctypes.c_uint32),
+    ("LeaseLifetime", ctypes.c_uint32), ("OnLinkPrefixLength", ctypes.c_ubyte)]
+
+
+class IP_ADAPTER_SERVER_ADDRESS(ctypes.Structure):
+    """Layout shared by IP_ADAPTER_DNS_SERVER_ADDRESS and IP_ADAPTER_GATEWAY_ADDRESS."""
+
+
+IP_ADAPTER_SERVER_ADDRESS._fields_ = [
+    ("Length", ctypes.c_uint32), ("Reserved", ctypes.c_uint32),
+    ("Next", ctypes.POINTER(IP_ADAPTER_SERVER_ADDRESS)),
+    ("Address", SOCKET_ADDRESS)]
+
+
+class IP_ADAPTER_ADDRESSES(ctypes.Structure):
+    """Leading part of IP_ADAPTER_ADDRESSES_LH; only read through pointers into the API's buffer."""
+
+
+IP_ADAPTER_ADDRESSES._fields_ = [
+    ("Length", ctypes.c_uint32), ("IfIndex", ctypes.c_uint32),
+    ("Next", ctypes.POINTER(IP_ADAPTER_ADDRESSES)),
+    ("AdapterName", ctypes.c_char_p),
+    ("FirstUnicastAddress", ctypes.POINTER(IP_ADAPTER_UNICAST_ADDRESS)),
+    ("FirstAnycastAddress", ctypes.c_void_p),
+    ("FirstMulticastAddress", ctypes.c_void_p),
+    ("FirstDnsServerAddress", ctypes.POINTER(IP_ADAPTER_SERVER_ADDRESS)),
+    ("DnsSuffix", ctypes.c_wchar_p), ("Description", ctypes.c_wchar_p), ("FriendlyName", ctypes.c_wchar_p),
+    ("PhysicalAddress", ctypes.c_ubyte * 8), ("PhysicalAddressLength", ctypes.c_uint32),
+    ("Flags", ctypes.c_uint32), ("Mtu", ctypes.c_uint32), ("IfType", ctypes.c_uint32),
+    ("OperStatus", ctypes.c_int), ("Ipv6IfIndex", ctypes.c_uint32), ("ZoneIndices", ctypes.c_uint32 * 16),
+    ("FirstPrefix", ctypes.c_void_p),
+    ("TransmitLinkSpeed", ctypes.c_uint64), ("ReceiveLinkSpeed", ctypes.c_uint64),
+    ("FirstWinsServerAddress", ctypes.c_void_p),
+    ("FirstGatewayAddress", ctypes.POINTER(IP_ADAPTER_SERVER_ADDRESS)),
+    ("Ipv4Metric", ctypes.c_uint32), ("Ipv6Metric", ctypes.c_uint32)]
+
+
+class MIB_IPINTERFACE_ROW(ctypes.Structure):
+    _fields_ = [
+        ("Family", ctypes.c_ushort), ("InterfaceLuid", ctypes.c_uint64), ("InterfaceIndex", ctypes.c_uint32),
+        ("MaxReassemblySize", ctypes.c_uint32), ("InterfaceIdentifier", ctypes.c_uint64),
+        ("MinRouterAdvertisementInterval", ctypes.c_uint32), ("MaxRouterAdvertisementInterval", ctypes.c_uint32),
+        ("AdvertisingEnabled", ctypes.c_ubyte), ("ForwardingEnabled", ctypes.c_ubyte),
+        ("WeakHostSend", ctypes.c_ubyte), ("WeakHostReceive", ctypes.c_ubyte),
+        ("UseAutomaticMetric", ctypes.c_ubyte), ("UseNeighborUnreachabilityDetection", ctypes.c_ubyte),
+        ("ManagedAddressConfigurationSupported", ctypes.c_ubyte),
+        ("OtherStatefulConfigurationSupported", ctypes.c_ubyte), ("AdvertiseDefaultRoute", ctypes.c_ubyte),
+        ("RouterDiscoveryBehavior", ctypes.c_int), ("DadTransmits", ctypes.c_uint32),
+        ("BaseReachableTime", ctypes.c_uint32), ("RetransmitTime", ctypes.c_uint32),
+        ("PathMtuDiscoveryTimeout", ctypes.c_uint32), ("LinkLocalAddressBehavior", ctypes.c_int),
+        ("LinkLocalAddressTimeout", ctypes.c_uint32), ("ZoneIndices", ctypes.c_uint32 * 16),
+        ("SitePrefixLength", ctypes.c_uint32), ("Metric", ctypes.c_uint32), ("NlMtu", ctypes.c_uint32),
+        ("Connected", ctypes.c_ubyte), ("SupportsWakeUpPatterns", ctypes.c_ubyte),
+        ("SupportsNeighborDiscovery", ctypes.c_ubyte), ("SupportsRouterDiscovery", ctypes.c_ubyte),
+        ("ReachableTime", ctypes.c_uint32), ("TransmitOffload", ctypes.c_ubyte),
+        ("ReceiveOffload", ctypes.c_ubyte), ("DisableDefaultRoutes", ctypes.c_ubyte)]
+
+
+class IP_ADDRESS_PREFIX(ctypes.Structure):
+    _fields_ = [("Prefix", SOCKADDR_INET), ("PrefixLength", ctypes.c_ubyte)]
+
+
+class MIB_IPFORWARD_ROW2(ctypes.Structure):
+    _fields_ = [
+        ("InterfaceLuid", ctypes.c_uint64), ("InterfaceIndex", ctypes.c_uint32),
+        ("DestinationPrefix", IP_ADDRESS_PREFIX), ("NextHop", SOCKADDR_INET),
+        ("SitePrefixLength", ctypes.c_ubyte), ("ValidLifetime", ctypes.c_uint32),
+        ("PreferredLifetime", ctypes.c_uint32), ("Metric", ctypes.c_uint32), ("Protocol", ctypes.c_int),
+        ("Loopback", ctypes.c_ubyte), ("AutoconfigureAddress", ctypes.c_ubyte), ("Publish", ctypes.c_ubyte),
+        ("Immortal", ctypes.c_ubyte), ("Age", ctypes.c_uint32), ("Origin", ctypes.c_int)]
+
+
+class MIB_IPFORWARD_TABLE2(ctypes.Structure):
+    _fields_ = [("NumEntries", ctypes.c_uint32), ("Table", MIB_IPFORWARD_ROW2 * 1)]
+
+
+def prefix_length_to_mask(prefix_length):
+    """Turn a prefix length such as 24 into a dotted netmask such as 255.255.255.0."""
+    return socket.inet_ntoa(((0xFFFFFFFF << (32 - prefix_length)) & 0xFFFFFFFF).to_bytes(4, "big"))
+
+
+class IpHelperBackend(NetworkBackend):
+    """Reads straight from the Windows IP Helper API through ctypes, without starting any process."""
+
+    name = "iphlpapi"
+
+    def __init__(self):
+        self.iphlpapi = ctypes.WinDLL("iphlpapi.dll")  # Raises off Windows, select_backend() falls back
+        self.iphlpapi.GetAdaptersAddresses.argtypes = [
+            ctypes.c_uint32, ctypes.c_uint32, ctypes.c_void_p, ctypes.c_void_p, ctypes.POINTER(ctypes.c_uint32)]
+        self.iphlpapi.GetAdaptersAddresses.restype = ctypes.c_uint32
+        self.iphlpapi.GetIpForwardTable2.argtypes = [
+            ctypes.c_ushort, ctypes.POINTER(ctypes.POINTER(MIB_IPFORWARD_TABLE2))]
+        self.iphlpapi.GetIpForwardTable2.restype = ctypes.c_uint32
+        self.iphlpapi.FreeMibTable.argtypes = [ctypes.c_void_p]
+        self.iphlpapi.FreeMibTable.restype = None
+        self.iphlpapi.InitializeIpInterfaceEntry.argtypes = [ctypes.POINTER(MIB_IPINTERFACE_ROW)]
+        self.iphlpapi.InitializeIpInterfaceEntry.restype = None
+        self.iphlpapi.GetIpInterfaceEntry.argtypes = [ctypes.POINTER(MIB_IPINTERFACE_ROW)]
+        self.iphlpapi.GetIpInterfaceEntry.restype = ctypes.c_uint32
+
+    @staticmethod
+    def _address(socket_address):
+        """Return the dotted IPv4 address in a SOCKET_ADDRESS, or None for anything else."""
+        sockaddr = socket_address.lpSockaddr
+        if not sockaddr or sockaddr.contents.sin_family != AF_INET:
+            return None
+        return socket.inet_ntoa(bytes(sockaddr.contents.sin_addr))
+
+    def _ip_interface(self, index):
+        """Return the IPv4 MIB_IPINTERFACE_ROW of an interface, or None if it has no IPv4 stack."""
+        row = MIB_IPINTERFACE_ROW()
+        self.iphlpapi.InitializeIpInterfaceEntry(ctypes.byref(row))
+        row.Family = AF_INET
+        row.InterfaceIndex = index
+        if self.iphlpapi.GetIpInterfaceEntry(ctypes.byref(row)) != 0:
+            return None
+        return row
+
+    def _adapters(self):
+        """Return one dict per adapter with its name, index, state and NIC details."""
+        flags = GAA_FLAG_SKIP_ANYCAST | GAA_FLAG_SKIP_MULTICAST | GAA_FLAG_INCLUDE_GATEWAYS
+        size = ctypes.c_uint32(16 * 1024)
+        while True:
+            buffer = ctypes.create_string_buffer(size.value)
+            ret = self.iphlpapi.GetAdaptersAddresses(AF_INET, flags, None, buffer, ctypes.byref(size))
+            if ret == ERROR_BUFFER_OVERFLOW:
+                continue  # size now holds what is needed
+            if ret == ERROR_NO_DATA:
+                return []
+            if ret != 0:
+                raise ctypes.WinError(ret)
+            break
+
+        adapters = []
+        pointer = ctypes.cast(buffer, ctypes.POINTER(IP_ADAPTER_ADDRESSES))
+        while pointer:
+            adapter = pointer.contents
+            nic_details = {'DHCP': "Yes" if adapter.Flags & IP_ADAPTER_DHCP_ENABLED else "No"}
+
+            unicast = adapter.FirstUnicastAddress
+            while unicast:
+                ip_address = self._address(unicast.contents.Address)
+                if ip_address:
+                    nic_details['IP Address'] = ip_address
+                    nic_details['Subnet Mask'] = prefix_length_to_mask(unicast.contents.OnLinkPrefixLength)
+                    break
+                unicast = unicast.contents.Next
+
+            gateway = adapter.FirstGatewayAddress
+            while gateway:
+                gateway_address = self._address(gateway.contents.Address)
+                if gateway_address:
+                    nic_details['Default Gateway'] = gateway_address
+                    break
+                gateway = gateway.contents.Next
+
+            dns_servers = []
+            dns = adapter.FirstDnsServerAddress
+            while dns:
+                dns_address = self._address(dns.contents.Address)
+                if dns_address:
+                    dns_servers.append(dns_address)
+                dns = dns.contents.Next
+            nic_details['Primary DNS'] = dns_servers[0] if len(dns_servers) > 0 else "None"
+            nic_details['Backup DNS'] = dns_servers[1] if len(dns_servers) > 1 else "None"
+
+            ip_interface = self._ip_interface(adapter.IfIndex)
+            nic_details['MTU'] = str(ip_interface.NlMtu) if ip_interface is not None else "Unknown"
+            nic_details['Interface Metric'] = str(adapter.Ipv4Metric)
+
+            adapters.append({
+                'name': adapter.FriendlyName,
+                'index': adapter.IfIndex,
+                'up': adapter.OperStatus == IF_OPER_STATUS_UP,
+                'metric': adapter.Ipv4Metric,
+                'details': nic_details,
+            })
+            pointer = adapter.Next
+        return adapters
+
+    def get_nic_names(self):
+        return [adapter['name'] for adapter in self._adapters() if adapter['up']]
+
+    def get_nic_details(self, interface):
+        for adapter in self._adapters():
+            if adapter['name'] == interface:
+                return adapter['details']
+        raise Exception(f"Interface not found: {interface}")
+
+    def get_all_nic_details(self, names):
+        by_name = {adapter['name']: adapter['details'] for adapter in self._adapters()}
+        details = {name: by_name[name] for name in names if name in by_name}
+        errors = {name: "Interface not found" for name in names if name not in by_name}
+        return details, errors
+
+    def get_routing_table(self):
+        # 'route print' shows the interface by its IP and the metric as route + interface metric
+        interfaces = {adapter['index']: adapter for adapter in self._adapters()}
+
+        table = ctypes.POINTER(MIB_IPFORWARD_TABLE2)()
+        ret = self.iphlpapi.GetIpForwardTable2(AF_INET, ctypes.byref(table))
+        if ret != 0:
+            raise ctypes.WinError(ret)
+
+        try:
+            count = table.contents.NumEntries
+            rows = ctypes.cast(ctypes.byref(table.contents.Table),
+                               ctypes.POINTER(MIB_IPFORWARD_ROW2 * count)).contents
+            routes = []
+            for row in rows:
+                interface = interfaces.get(row.InterfaceIndex)
+                destination = socket.inet_ntoa(bytes(row.DestinationPrefix.Prefix.Ipv4.sin_addr))
+                next_hop = socket.inet_ntoa(bytes(row.NextHop.Ipv4.sin_addr))
+                routes.append([
+                    destination,
+                    prefix_length_to_mask(row.DestinationPrefix.PrefixLength),
+                    "On-link" if next_hop == "0.0.0.0" else next_hop,
+                    interface['details'].get('IP Address', '') if interface else str(row.InterfaceIndex),
+                    str(row.Metric + (interface['metric'] if interface else 0)),
+                ])
+            return routes
+        finally:
+            self.iphlpapi.FreeMibTable(table)
+
+
+class FixtureBackend(NetworkBackend):
+    """Serves NIC names, details and routes recorded in a JSON file (see record_fixture()).
+
+    Lets the GUI run on machines without netsh or the IP Helper API, e.g. Linux.
+    """
+
+    name = "fixture"
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, encoding="utf-8") as f:
+            self.data = json.load(f)
+
+    def get_nic_names(self):
+        return list(self.data.get('nic_names', []))
+
+    def get_nic_details(self, interface):
+        try:
+            return dict(self.data['details'][interface])
+        except KeyError:
+            raise Exception(f"Interface not found in fixture: {interface}")
+
+    def get_routing_table(self):
+        return [list(route) for route in self.data.get('routes', [])]
+
+
+def inventory(backend):
+    """Return everything a backend reads (NIC names, their details and the routes) as a fixture-shaped dict."""
+    nic_names = backend.get_nic_names()
+    details, _ = backend.get_all_nic_details(nic_names)
+    return {'nic_names': nic_names, 'details': details, 'routes': backend.get_routing_table()}
+
+
+def record_fixture(backend, path):
+    """Save what a backend currently reads into a JSON fixture for FixtureBackend."""
+    data = inventory(backend)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    log.debug("Recorded %s fixture to %s", backend.name, path)
+
+
+def select_backend():
+    """Pick the read backend.
+
+    NIC_MANAGER_BACKEND can force 'netsh', 'iphlpapi' or 'fixture' (which reads the file named by
+    NIC_MANAGER_FIXTURE). Otherwise the IP Helper API is used when it loads, with netsh as the fallback.
+    """
+    choice = os.environ.get(BACKEND_ENV, "").lower()
+    if choice == "fixture":
+        return FixtureBackend(os.environ[FIXTURE_ENV])
+    if choice == "netsh":
+        return NetshBackend()
+
+    try:
+        backend = IpHelperBackend()
+    except (OSError, AttributeError) as e:
+        if choice == "iphlpapi":
+            raise
+        log.debug("IP Helper API not available (%s), falling back to netsh", e)
+        return NetshBackend()
+    log.debug("Using the IP Helper API backend")
+    return backend
+
+
+class NetworkChangeSet:
+    """Address, gateway, DNS and MTU changes for one or more interfaces, applied as a single netsh script.
+
+    apply() captures the prior state of every interface it touches, writes all the changes with one netsh
+    script (see run_netsh_script) and reads the interfaces back. If netsh fails or an interface does not end up as
+    requested, the captured state is written back the same way and read back again, and the error is raised
+    saying whether the rollback took.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend if backend is not None else NetshBackend()
+        self.changes = {}  # interface -> requested settings
+
+    def set_static(self, interface, ip, subnet_mask, gateway=None, dns=None):
+        """Give an interface a static address. dns=None leaves DNS alone, an empty list clears it."""
+        change = self.changes.setdefault(interface, {})
+        change.update(dhcp=False, ip=ip, subnet_mask=subnet_mask, gateway=gateway or None,
+                      dns=None if dns is None else [server for server in dns if server])
+        return self
+
+    def set_dhcp(self, interface):
+        """Switch an interface to DHCP with automatic DNS."""
+        change = self.changes.setdefault(interface, {})
+        for key in ('ip', 'subnet_mask', 'gateway', 'dns'):
+            change.pop(key, None)
+        change['dhcp'] = True
+        return self
+
+    def set_mtu(self, interface, mtu):
+        """Set the persistent IPv4 MTU of an interface."""
+        self.changes.setdefault(interface, {})['mtu'] = str(mtu)
+        return self
+
+    def script_lines(self):
+        """Return the netsh script (one command per line) that makes the changes."""
+        lines = []
+        for interface, change in self.changes.items():
+            if change.get('dhcp') is True:
+                lines.append(f'interface ipv4 set address name="{interface}" source=dhcp')
+                lines.append(f'interface ipv4 set dns name="{interface}" source=dhcp')
+            elif change.get('dhcp') is False:
+                lines.append(f'interface ipv4 set address name="{interface}" static {change["ip"]} '
+                             f'{change["subnet_mask"]} {change["gateway"] or "none"}')
+                dns = change['dns']
+                if dns is not None and not dns:
+                    lines.append(f'interface ipv4 set dns name="{interface}" static none')
+                elif dns:
+                    # validate=no skips the resolver round trip netsh otherwise does for each server
+                    lines.append(f'interface ipv4 set dns name="{interface}" static {dns[0]} primary validate=no')
+                    for index, server in enumerate(dns[1:], start=2):
+                        lines.append(f'interface ipv4 add dns name="{interface}" {server} index={index} validate=no')
+            if 'mtu' in change:
+                lines.append(f'interface ipv4 set subinterface "{interface}" mtu={change["mtu"]} store=persistent')
+        return lines
+
+    def run_script(self):
+        """Run the change set's script through the backend (run_netsh_script for the local machine)."""
+        self.backend.run_netsh_script(self.script_lines())
+
+    def mismatches(self, details):
+        """Return a list of the requested settings that the read-back details do not show."""
+        problems = []
+        for interface, change in self.changes.items():
+            nic_details = details.get(interface)
+            if nic_details is None:
+                problems.append(f"{interface}: could not be read back")
+                continue
+
+            expected = {}
+            if change.get('dhcp') is True:
+                expected['DHCP'] = "Yes"
+                if change.get('lease'):
+                    expected['IP Address'] = change['lease']
+            elif change.get('dhcp') is False:
+                expected.update({'DHCP': "No", 'IP Address': change['ip'], 'Subnet Mask': change['subnet_mask']})
+                if change['gateway']:
+                    expected['Default Gateway'] = change['gateway']
+                if change['dns']:
+                    expected['Primary DNS'] = change['dns'][0]
+            if 'mtu' in change:
+                expected['MTU'] = change['mtu']
+
+            for key, value in expected.items():
+                if nic_details.get(key) != value:
+                    problems.append(f"{interface}: {key} is {nic_details.get(key, 'unset')}, expected {value}")
+        return problems
+
+    def read_back(self):
+        """Re-read the touched interfaces, bypassing any cache."""
+        self.backend.invalidate()
+        details, _ = self.backend.get_all_nic_details(list(self.changes))
+        return details
+
+    @staticmethod
+    def from_details(backend, prior):
+        """Build the change set that puts interfaces back to previously captured details."""
+        restore = NetworkChangeSet(backend)
+        for interface, nic_details in prior.items():
+            if nic_details.get('DHCP') == "Yes":
+                # The lease is not set by the script, but a rollback checks the interface got it back
+                restore.set_dhcp(interface).changes[interface]['lease'] = nic_details.get('IP Address')
+            elif nic_details.get('IP Address') and nic_details.get('Subnet Mask'):
+                gateway = nic_details.get('Default Gateway')
+                dns = [nic_details.get('Primary DNS'), nic_details.get('Backup DNS')]
+                restore.set_static(interface, nic_details['IP Address'], nic_details['Subnet Mask'],
+                                   gateway if gateway != "No gateway" else None,
+                                   [server for server in dns if server and server != "None"])
+            if str(nic_details.get('MTU', '')).isdigit():
+                restore.set_mtu(interface, nic_details['MTU'])
+        return restore
+
+    def apply(self):
+        """Apply every change in one netsh script, rolling back on failure.
+
+        Returns the read-back details of the changed interfaces.
+        """
+        if not self.changes:
+            return {}
+
+        prior, errors = self.backend.get_all_nic_details(list(self.changes))
+        if errors:
+            raise Exception("Could not capture the current state of " + ", ".join(sorted(errors)))
+
+        try:
+            try:
+                self.run_script()
+                details = self.read_back()
+                problems = self.mismatches(details)
+                if problems:
+                    raise Exception("; ".join(problems))
+            except Exception as e:
+                log.error("Change set failed, rolling back: %s", e)
+                restore = NetworkChangeSet.from_details(self.backend, prior)
+                try:
+                    restore.run_script()
+                    problems = restore.mismatches(restore.read_back())
+                except Exception as rollback_error:
+                    raise Exception(f"{e} (rollback also failed: {rollback_error})") from e
+                if problems:
+                    raise Exception(f"{e} (rollback incomplete: {'; '.join(problems)})") from e
+                raise Exception(f"{e} (previous settings restored)") from e
+        finally:
+            netsh_snapshot.invalidate()
+
+        log.debug("Change set applied to %s", ', '.join(self.changes))
+        return details
+
+
+# Interface counters sampled for the Traffic tab: rates are per second, in this order
+COUNTER_FIELDS = ("bytes_in", "bytes_out", "packets_in", "packets_out", "errors_in", "errors_out",
+                  "discards_in", "discards_out")
+COUNTER_INTERVAL = 0.1
+COUNTER_HISTORY_SECONDS = 60.0
+
+PROC_NET_DEV = "/proc/net/dev"
+
+# MIB_IF_ROW2 values that mark interfaces without traffic of their own
+IF_TYPE_SOFTWARE_LOOPBACK = 24
+IF_OPER_STATUS_UP = 1
+IF_FLAG_FILTER_INTERFACE = 0x02
+
+
+class MIB_IF_ROW2(ctypes.Structure):
+    _fields_ = [
+        ("InterfaceLuid", ctypes.c_uint64), ("InterfaceIndex", ctypes.c_uint32),
+        ("InterfaceGuid", ctypes.c_uint32 * 4), ("Alias", ctypes.c_wchar * 257),
+        ("Description", ctypes.c_wchar * 257), ("PhysicalAddressLength", ctypes.c_uint32),
+        ("PhysicalAddress", ctypes.c_ubyte * 32), ("PermanentPhysicalAddress", ctypes.c_ubyte * 32),
+        ("Mtu", ctypes.c_uint32), ("Type", ctypes.c_uint32), ("TunnelType", ctypes.c_int),
+        ("MediaType", ctypes.c_int), ("PhysicalMediumType", ctypes.c_int), ("AccessType", ctypes.c_int),
+        ("DirectionType", ctypes.c_int), ("InterfaceAndOperStatusFlags", ctypes.c_ubyte),
+        ("OperStatus", ctypes.c_int), ("AdminStatus", ctypes.c_int), ("MediaConnectState", ctypes.c_int),
+        ("NetworkGuid", ctypes.c_uint32 * 4), ("ConnectionType", ctypes.c_int),
+        ("TransmitLinkSpeed", ctypes.c_uint64), ("ReceiveLinkSpeed", ctypes.c_uint64),
+        ("InOctets", ctypes.c_uint64), ("InUcastPkts", ctypes.c_uint64), ("InNUcastPkts", ctypes.c_uint64),
+        ("InDiscards", ctypes.c_uint64), ("InErrors", ctypes.c_uint64), ("InUnknownProtos", ctypes.c_uint64),
+        ("InUcastOctets", ctypes.c_uint64), ("InMulticastOctets", ctypes.c_uint64),
+        ("InBroadcastOctets", ctypes.c_uint64), ("OutOctets", ctypes.c_uint64),
+        ("OutUcastPkts", ctypes.c_uint64), ("OutNUcastPkts", ctypes.c_uint64), ("OutDiscards", ctypes.c_uint64),
+        ("OutErrors", ctypes.c_uint64), ("OutUcastOctets", ctypes.c_uint64),
+        ("OutMulticastOctets", ctypes.c_uint64), ("OutBroadcastOctets", ctypes.c_uint64),
+        ("OutQLen", ctypes.c_uint64)]
+
+
+class MIB_IF_TABLE2(ctypes.Structure):
+    _fields_ = [("NumEntries", ctypes.c_uint32), ("Table", MIB_IF_ROW2 * 1)]
+
+
+class IfTableCounterSource:
+    """Interface counters from GetIfTable2 (Windows): one call reads every interface, no process is started."""
+
+    def __init__(self):
+        self.iphlpapi = ctypes.WinDLL("iphlpapi.dll")
+        self.iphlpapi.GetIfTable2.argtypes = [ctypes.POINTER(ctypes.POINTER(MIB_IF_TABLE2))]
+        self.iphlpapi.GetIfTable2.restype = ctypes.c_uint32
+        self.iphlpapi.FreeMibTable.argtypes = [ctypes.c_void_p]
+        self.iphlpapi.FreeMibTable.restype = None
+
+    def read(self):
+        """Return {interface alias: counters in COUNTER_FIELDS order} for every interface that is up."""
+        table = ctypes.POINTER(MIB_IF_TABLE2)()
+        ret = self.iphlpapi.GetIfTable2(ctypes.byref(table))
+        if ret != 0:
+            raise ctypes.WinError(ret)
+
+        try:
+            count = table.contents.NumEntries
+            rows = ctypes.cast(ctypes.byref(table.contents.Table), ctypes.POINTER(MIB_IF_ROW2 * count)).contents
+            counters = {}
+            for row in rows:
+                # Filter drivers repeat the counters of the adapter they sit on
+                if row.OperStatus != IF_OPER_STATUS_UP or row.Type == IF_TYPE_SOFTWARE_LOOPBACK or \
+                        row.InterfaceAndOperStatusFlags & IF_FLAG_FILTER_INTERFACE:
+                    continue
+                counters[row.Alias] = (row.InOctets, row.OutOctets, row.InUcastPkts + row.InNUcastPkts,
+                                       row.OutUcastPkts + row.OutNUcastPkts, row.InErrors, row.OutErrors,
+                                       row.InDiscards, row.OutDiscards)
+            return counters
+        finally:
+            self.iphlpapi.FreeMibTable(table)
+
+    def close(self):
+        pass
+
+
+class ProcNetDevCounterSource:
+    """Interface counters from /proc/net/dev (Linux), re-read through one descriptor that stays open."""
+
+    def __init__(self):
+        self.fd = os.open(PROC_NET_DEV, os.O_RDONLY)
+
+    def read(self):
+        """Return {interface name: counters in COUNTER_FIELDS order}, leaving out the loopback."""
+        chunks = []
+        offset = 0
+        while True:
+            chunk = os.pread(self.fd, 65536, offset)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            offset += len(chunk)
+
+        counters = {}
+        # Two header lines, then "name: 8 receive counters 8 transmit counters"
+        for line in b"".join(chunks).decode("ascii", "replace").splitlines()[2:]:
+            name, _, values = line.partition(":")
+            name = name.strip()
+            values = values.split()
+            if name == "lo" or len(values) < 12:
+                continue
+            counters[name] = (int(values[0]), int(values[8]), int(values[1]), int(values[9]), int(values[2]),
+                              int(values[10]), int(values[3]), int(values[11]))
+        return counters
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class SimulatedCounterSource:
+    """Counters of made-up interfaces that grow at steady rates, for exercising the sampler anywhere."""
+
+    def __init__(self, rates=None):
+        # Bytes per second in and out of each interface
+        self.rates = rates or {"Ethernet": (2_000_000, 250_000), "Wi-Fi": (40_000, 12_000)}
+        self.started = time.monotonic()
+
+    def read(self):
+        elapsed = time.monotonic() - self.started
+        counters = {}
+        for name, (bytes_in, bytes_out) in self.rates.items():
+            received = int(bytes_in * elapsed)
+            sent = int(bytes_out * elapsed)
+            counters[name] = (received, sent, received // 1200, sent // 600, 0, 0, 0, 0)
+        return counters
+
+    def close(self):
+        pass
+
+
+def select_counter_source():
+    """Pick the interface counter source for this platform, or None if there is none."""
+    try:
+        if os.name == 'nt':
+            return IfTableCounterSource()
+        if os.path.exists(PROC_NET_DEV):
+            return ProcNetDevCounterSource()
+    except (OSError, AttributeError) as e:
+        log.debug("Interface counters not available (%s)", e)
+    return None
+
+
+class RateHistory:
+    """The last `capacity` rate samples of one interface, in preallocated array('d') ring buffers.
+
+    `rates` holds len(COUNTER_FIELDS) values per sample side by side, so adding a sample allocates nothing
+    and reading one field back is a strided slice.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.width = len(COUNTER_FIELDS)
+        self.times = array('d', bytes(8 * capacity))
+        self.rates = array('d', bytes(8 * capacity * self.width))
+        self.next = 0  # Slot the next sample goes into
+        self.count = 0
+
+    def append(self, when, rates):
+        self.times[self.next] = when
+        start = self.next * self.width
+        for offset, rate in enumerate(rates):
+            self.rates[start + offset] = rate
+        self.next = (self.next + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def _ordered(self, values):
+        """Return a ring's values oldest first."""
+        if self.count < self.capacity:
+            return values[:self.count]
+        return values[self.next:] + values[:self.next]
+
+    def series(self, field):
+        """Return (times, rates) arrays of one field, oldest first."""
+        column = COUNTER_FIELDS.index(field)
+        return self._ordered(self.times), self._ordered(self.rates[column::self.width])
+
+    def average(self, since):
+        """Return the mean rates of the samples taken at or after `since`, or None if there are none."""
+        totals = [0.0] * self.width
+        count = 0
+        slot = self.next
+        while count < self.count:
+            slot = (slot - 1) % self.capacity
+            if self.times[slot] < since:
+                break
+            start = slot * self.width
+            for offset in range(self.width):
+                totals[offset] += self.rates[start + offset]
+            count += 1
+        return tuple(total / count for total in totals) if count else None
+
+    def latest(self):
+        """Return the newest sample's rates, or None before the first sample."""
+        if not self.count:
+            return None
+        start = (self.next - 1) % self.capacity * self.width
+        return tuple(self.rates[start:start + self.width])
+
+
+class CounterSampler:
+    """Reads every interface's counters every `interval` seconds on one background thread and keeps rates.
+
+    Each round is one source.read() for all interfaces; the difference from the previous round, divided by
+    the time between them, goes into a RateHistory per interface. The GUI reads series() and snapshot() at
+    its own pace.
+    """
+
+    def __init__(self, source, interval=COUNTER_INTERVAL, history_seconds=COUNTER_HISTORY_SECONDS):
+        self.source = source
+        self.interval = interval
+        self.capacity = max(2, int(math.ceil(history_seconds / interval)))
+        self.histories = {}
+        self.rounds = 0
+        self.cpu_seconds = 0.0  # CPU time of the sampling thread, to check what sampling costs
+        self.started = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self.started = time.monotonic()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        previous = None
+        previous_time = None
+        cpu_started = time.thread_time()
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                counters = self.source.read()
+            except OSError as e:
+                log.error("Failed to read interface counters: %s", e)
+                return
+
+            if previous is not None:
+                elapsed = started - previous_time
+                with self._lock:
+                    for name, values in counters.items():
+                        before = previous.get(name)
+                        if before is None:
+                            continue
+                        history = self.histories.get(name)
+                        if history is None:
+                            history = self.histories[name] = RateHistory(self.capacity)
+                        # A counter that went down was reset, which counts as no traffic
+                        history.append(started, [max(0, now - then) / elapsed for now, then in zip(values, before)])
+                    self.rounds += 1
+            previous = counters
+            previous_time = started
+            self.cpu_seconds = time.thread_time() - cpu_started
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def interfaces(self):
+        with self._lock:
+            return sorted(self.histories)
+
+    def series(self, name, field):
+        """Return (times, rates) of one interface and field, oldest first, or two empty arrays."""
+        with self._lock:
+            history = self.histories.get(name)
+            if history is None:
+                return array('d'), array('d')
+            return history.series(field)
+
+    def snapshot(self):
+        """Return {interface: newest rates in COUNTER_FIELDS order} for every interface seen so far."""
+        with self._lock:
+            return {name: history.latest() for name, history in self.histories.items() if history.count}
+
+    def averages(self, seconds):
+        """Return {interface: mean rates in COUNTER_FIELDS order over the last `seconds`}."""
+        since = time.monotonic() - seconds
+        with self._lock:
+            averages = {name: history.average(since) for name, history in self.histories.items()}
+        return {name: rates for name, rates in averages.items() if rates is not None}
+
+    def cpu_percent(self):
+        """Return the sampling thread's CPU time as a percentage of one core since start()."""
+        if self.started is None:
+            return 0.0
+        return 100.0 * self.cpu_seconds / max(time.monotonic() - self.started, 1e-9)
+
+
+def format_bit_rate(bytes_per_second):
+    """Format a byte rate as bits per second with a unit, such as '12.5 Mbit/s'."""
+    value = bytes_per_second * 8
+    for unit in ("bit/s", "kbit/s", "Mbit/s", "Gbit/s"):
+        if value < 1000 or unit == "Gbit/s":
+            return f"{value:.1f} {unit}" if unit != "bit/s" else f"{value:.0f} {unit}"
+        value /= 1000
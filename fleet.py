@@ -0,0 +1,508 @@
+"""Fleet mode: the NIC and route queries and change sets of NIC Manager, run against many hosts at once.
+
+A transport opens connections to hosts. A connection runs command lines ('netsh ...', 'route print') on its
+host and returns their output, which RemoteBackend parses with the same functions the local netsh backend
+uses. FleetExecutor runs one operation per host on a bounded thread pool, reuses connections through a
+ConnectionPool and returns a FleetResult per host. Nothing here imports Qt.
+"""
+import ipaddress
+import shlex
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from core import CMD_DIALECT, NETSH_OK_OUTPUT, CommandHost, CommandHostError, NetworkBackend, command_stats, \
+    inventory, log, parse_mtus, parse_nic_configs, parse_nic_names
+from parsers import parse_route_print
+
+
+# Hosts worked on at once, and the seconds one host gets for a whole operation, connecting included
+FLEET_WORKERS = 32
+FLEET_HOST_TIMEOUT = 60.0
+
+# Seconds ssh may take to connect before the host counts as unreachable
+SSH_CONNECT_TIMEOUT = 10
+
+# Outcome of one host's operation: ok with its value, or not ok with the error message
+FleetResult = namedtuple("FleetResult", "host ok value error elapsed")
+
+
+class RemoteBackend(NetworkBackend):
+    """Reads and writes one host over a fleet connection, parsing with the local netsh backend's parsers.
+
+    Each command's output is kept until invalidate(), so an operation that reads the same thing twice runs
+    it once. Every command gets what is left of the operation's deadline as its timeout.
+    """
+
+    name = "remote"
+
+    def __init__(self, host, connection, deadline):
+        self.host = host
+        self.connection = connection
+        self.deadline = deadline
+        self._outputs = {}  # command line -> output
+
+    def run(self, command):
+        """Run a command line on the host and return (status, output)."""
+        remaining = self.deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"{self.host} ran out of time")
+        # Timed per command, not per host, so hundreds of hosts share a handful of Diagnostics rows
+        return self.connection.run(command, "fleet " + " ".join(command.split()[:5]), remaining)
+
+    def _read(self, command):
+        output = self._outputs.get(command)
+        if output is None:
+            status, output = self.run(command)
+            if status:
+                raise Exception(f"'{command}' failed on {self.host}: {output.strip()}")
+            self._outputs[command] = output
+        return output
+
+    def get_nic_names(self):
+        return parse_nic_names(self._read("netsh interface ipv4 show interfaces"))[0]
+
+    def get_mtus(self):
+        """Return a dict of interface name -> MTU."""
+        return parse_mtus(self._read("netsh interface ipv4 show subinterface"))
+
+    def get_nic_details(self, interface):
+        details, errors = self.get_all_nic_details([interface])
+        if errors:
+            raise Exception(errors[interface])
+        return details[interface]
+
+    def get_all_nic_details(self, names):
+        configs = parse_nic_configs(self._read("netsh interface ipv4 show config"))
+        mtus = self.get_mtus()
+        details = {}
+        errors = {}
+        for name in names:
+            if name in configs:
+                details[name] = dict(configs[name], MTU=mtus.get(name, "Unknown"))
+            else:
+                errors[name] = f"{name} not found on {self.host}"
+        return details, errors
+
+    def get_routing_table(self):
+        return [list(row) for row in parse_route_print(self._read("route print")).active]
+
+    def invalidate(self):
+        self._outputs.clear()
+
+    def run_netsh_script(self, lines):
+        try:
+            for line in lines:
+                status, output = self.run("netsh " + line)
+                # Hosts that report exit statuses are judged by them, others by netsh's success text
+                failed = status != 0 if status is not None else output.strip() not in NETSH_OK_OUTPUT
+                if failed:
+                    raise Exception(f"netsh failed on {self.host}: {output.strip() or f'exit status {status}'}")
+        finally:
+            self.invalidate()
+
+
+class SshTransport:
+    """Opens one 'ssh <host> cmd /q' session per connection with the OpenSSH client and keeps it running.
+
+    Keys or an agent must be set up: BatchMode makes ssh fail rather than ask for a password.
+    """
+
+    name = "ssh"
+
+    def __init__(self, user=None, port=None, identity=None, timeout=FLEET_HOST_TIMEOUT):
+        self.user = user
+        self.port = port
+        self.identity = identity
+        self.timeout = timeout
+
+    def argv(self, host):
+        """Return the ssh command line that starts the remote shell on host."""
+        argv = ["ssh", "-T", "-o", "BatchMode=yes", "-o", f"ConnectTimeout={SSH_CONNECT_TIMEOUT}"]
+        if self.port:
+            argv += ["-p", str(self.port)]
+        if self.identity:
+            argv += ["-i", self.identity]
+        argv.append(f"{self.user}@{host}" if self.user else host)
+        return argv + CMD_DIALECT.argv
+
+    def connect(self, host):
+        # The session starts with the first command, so connecting is part of that command's timeout
+        return CommandHost(CMD_DIALECT._replace(name="ssh", argv=self.argv(host)), self.timeout)
+
+
+class WinRmConnection:
+    """One remote cmd shell on a host, opened with the first command and reused for the rest."""
+
+    def __init__(self, protocol):
+        self.protocol = protocol
+        self.shell_id = None
+        self._lock = threading.Lock()
+
+    def run(self, command, kind=None, timeout=None):
+        """Run a command line in the shell and return (status, output).
+
+        WinRM applies the transport's operation timeout; the per-command timeout is not adjustable.
+        """
+        started = time.perf_counter()
+        with self._lock:
+            if self.shell_id is None:
+                self.shell_id = self.protocol.open_shell()
+            command_id = self.protocol.run_command(self.shell_id, command)
+            try:
+                stdout, stderr, status = self.protocol.get_command_output(self.shell_id, command_id)
+            finally:
+                self.protocol.cleanup_command(self.shell_id, command_id)
+
+        output = (stdout + stderr).decode(errors="replace")
+        command_stats.record_run(kind or "winrm", 0.0, (time.perf_counter() - started) * 1000, len(output),
+                                 status != 0)
+        return status, output
+
+    def close(self):
+        with self._lock:
+            if self.shell_id is not None:
+                self.protocol.close_shell(self.shell_id)
+                self.shell_id = None
+
+
+class WinRmTransport:
+    """Runs commands over WinRM with pywinrm, which is only needed for this transport."""
+
+    name = "winrm"
+
+    def __init__(self, user, password, port=5985, scheme="http", auth="ntlm", timeout=FLEET_HOST_TIMEOUT):
+        try:
+            from winrm.protocol import Protocol
+        except ImportError as e:
+            raise Exception("The WinRM transport needs the pywinrm package (pip install pywinrm)") from e
+        self._protocol = Protocol
+        self.user = user
+        self.password = password
+        self.port = port
+        self.scheme = scheme
+        self.auth = auth
+        self.timeout = timeout
+
+    def connect(self, host):
+        protocol = self._protocol(endpoint=f"{self.scheme}://{host}:{self.port}/wsman", transport=self.auth,
+                                  username=self.user, password=self.password,
+                                  operation_timeout_sec=int(self.timeout), read_timeout_sec=int(self.timeout) + 10)
+        return WinRmConnection(protocol)
+
+
+class FakeHost:
+    """A simulated Windows host answering netsh and 'route print'.
+
+    It has two NICs, plus `extra_nics` more static ones, the routes they imply and `static_routes` routes
+    through the first NIC's gateway that netsh can add, delete and set. Routes keep the route metric netsh
+    sets, and 'route print' shows it plus the interface's metric, as Windows does.
+    """
+
+    def __init__(self, number, extra_nics=0, static_routes=0):
+        subnet = f"10.{number // 250 % 250}.{number % 250}"
+        self.lock = threading.Lock()
+        self.nics = {
+            "Ethernet": {'index': 12, 'dhcp': False, 'ip': f"{subnet}.10", 'mask': "255.255.255.0",
+                         'gateway': f"{subnet}.1", 'dns': ["10.255.0.53", "10.255.1.53"], 'mtu': 1500, 'metric': 25},
+            "Ethernet 2": {'index': 14, 'dhcp': True, 'ip': f"172.16.{number % 250}.20", 'mask': "255.255.0.0",
+                           'gateway': None, 'dns': ["172.16.0.1"], 'mtu': 1500, 'metric': 35},
+        }
+        # What the DHCP server hands out when a NIC is switched to DHCP; None if no server answers
+        self.leases = {"Ethernet 2": (f"172.16.{number % 250}.20", "255.255.0.0", None)}
+        for extra in range(extra_nics):
+            self.nics[f"Ethernet {extra + 3}"] = {
+                'index': 20 + extra, 'dhcp': False, 'ip': f"192.168.{extra % 250}.10", 'mask': "255.255.255.0",
+                'gateway': None, 'dns': [], 'mtu': 1500, 'metric': 50}
+        # (destination, netmask, gateway, interface IP) -> route metric
+        self.routes = {(f"10.{200 + route // 62500}.{route // 250 % 250}.{route % 250}", "255.255.255.255",
+                        f"{subnet}.1", f"{subnet}.10"): 10 for route in range(static_routes)}
+
+    def show_interfaces(self):
+        lines = ["", "Idx     Met         MTU          State                Name",
+                 "---  ----------  ----------  ------------  ---------------------------"]
+        lines += [f"{nic['index']:>3}  {nic['metric']:>10}  {nic['mtu']:>10}  {'connected':<12}  {name}"
+                  for name, nic in self.nics.items()]
+        return "\n".join(lines) + "\n"
+
+    def show_subinterface(self):
+        lines = ["", "   MTU  MediaSenseState   Bytes In  Bytes Out  Interface",
+                 "------  ---------------  ---------  ---------  -------------"]
+        lines += [f"{nic['mtu']:>6}  {1:>15}  {0:>9}  {0:>9}  {name}" for name, nic in self.nics.items()]
+        return "\n".join(lines) + "\n"
+
+    def show_config(self, names):
+        lines = []
+        for name in names:
+            nic = self.nics[name]
+            network = ipaddress.ip_interface(f"{nic['ip']}/{nic['mask']}").network
+            lines += [f'Configuration for interface "{name}"',
+                      f"    DHCP enabled:                         {'Yes' if nic['dhcp'] else 'No'}",
+                      f"    IP Address:                           {nic['ip']}",
+                      f"    Subnet Prefix:                        {network} (mask {nic['mask']})"]
+            if nic['gateway']:
+                lines.append(f"    Default Gateway:                      {nic['gateway']}")
+            lines.append(f"    InterfaceMetric:                      {nic['metric']}")
+            if nic['dhcp']:
+                label = "DNS servers configured through DHCP:  "
+            else:
+                label = "Statically Configured DNS Servers:    "
+            dns = nic['dns'] or ["None"]
+            lines.append(f"    {label}{dns[0]}")
+            lines += [f"{'':42}{server}" for server in dns[1:]]
+            lines.append("")
+        return "\n".join(lines) + "\n"
+
+    def route_print(self):
+        rows = []
+        interface_metrics = {}
+        for nic in self.nics.values():
+            network = ipaddress.ip_interface(f"{nic['ip']}/{nic['mask']}").network
+            if nic['gateway']:
+                rows.append(("0.0.0.0", "0.0.0.0", nic['gateway'], nic['ip'], nic['metric']))
+            rows.append((str(network.network_address), nic['mask'], "On-link", nic['ip'], 256 + nic['metric']))
+            rows.append((nic['ip'], "255.255.255.255", "On-link", nic['ip'], 256 + nic['metric']))
+            interface_metrics[nic['ip']] = nic['metric']
+        rows += [key + (metric + interface_metrics.get(key[3], 0),) for key, metric in self.routes.items()]
+        lines = ["=" * 75, "Interface List"]
+        lines += [f"{nic['index']:>3}...00 15 5d 00 00 {nic['index']:02x} ......{name}"
+                  for name, nic in self.nics.items()]
+        lines += ["=" * 75, "", "IPv4 Route Table", "=" * 75, "Active Routes:",
+                  "Network Destination        Netmask          Gateway       Interface  Metric"]
+        lines += [f"{destination:>17}  {netmask:>15}  {gateway:>15}  {interface:>15}  {metric:>5}"
+                  for destination, netmask, gateway, interface, metric in rows]
+        lines += ["=" * 75, "Persistent Routes:", "  None", "", "IPv6 Route Table", "=" * 75]
+        return "\n".join(lines) + "\n"
+
+    def run(self, command):
+        """Return (status, output) for a command line, changing the host's state like netsh would."""
+        words = shlex.split(command)
+        if words == ["route", "print"]:
+            return 0, self.route_print()
+        if words[:4] == ["netsh", "interface", "ipv4", "show"] and len(words) > 4:
+            if words[4] == "interfaces":
+                return 0, self.show_interfaces()
+            if words[4] == "subinterface":
+                return 0, self.show_subinterface()
+            if words[4] == "config":
+                names = words[5:] or list(self.nics)
+                if any(name not in self.nics for name in names):
+                    return 1, "The filename, directory name, or volume label syntax is incorrect.\n"
+                return 0, self.show_config(names)
+        if words[:3] == ["netsh", "interface", "ipv4"] and len(words) > 5:
+            return self.change(words[3], words[4], words[5:])
+        return 1, f"The following command was not found: {command}.\n"
+
+    def change(self, verb, noun, args):
+        if noun == "route":
+            return self.change_route(verb, dict(arg.split("=", 1) for arg in args if "=" in arg))
+        name = args[0].split("=", 1)[-1]
+        nic = self.nics.get(name)
+        if nic is None:
+            return 1, "The filename, directory name, or volume label syntax is incorrect.\n"
+        options = dict(arg.split("=", 1) for arg in args[1:] if "=" in arg)
+        values = [arg for arg in args[1:] if "=" not in arg]
+
+        if (verb, noun) == ("set", "address") and options.get('source') == "dhcp":
+            # Without a lease Windows falls back to an automatic private address
+            ip, mask, gateway = self.leases.get(name) or (f"169.254.{nic['index']}.1", "255.255.0.0", None)
+            nic.update(dhcp=True, ip=ip, mask=mask, gateway=gateway)
+        elif (verb, noun) == ("set", "address") and values[:1] == ["static"] and len(values) >= 3:
+            try:
+                ipaddress.ip_interface(f"{values[1]}/{values[2]}")
+            except ValueError:
+                return 1, "The parameter is incorrect.\n"
+            gateway = values[3] if len(values) > 3 and values[3] != "none" else None
+            nic.update(dhcp=False, ip=values[1], mask=values[2], gateway=gateway)
+        elif (verb, noun) == ("set", "dns") and options.get('source') == "dhcp":
+            nic['dns'] = nic['dns'][:1]
+        elif (verb, noun) == ("set", "dns") and values[:1] == ["static"]:
+            nic['dns'] = [] if values[1:2] == ["none"] else values[1:2]
+        elif (verb, noun) == ("add", "dns") and values:
+            nic['dns'].append(values[0])
+        elif (verb, noun) == ("set", "subinterface") and options.get('mtu', "").isdigit():
+            if not 576 <= int(options['mtu']) <= 9000:
+                return 1, "The parameter is incorrect.\n"
+            nic['mtu'] = int(options['mtu'])
+        else:
+            return 1, "The syntax supplied for this command is not valid.\n"
+        return 0, ""
+
+    def change_route(self, verb, options):
+        nic = self.nics.get(options.get('interface'))
+        if nic is None or 'prefix' not in options:
+            return 1, "The filename, directory name, or volume label syntax is incorrect.\n"
+        network = ipaddress.ip_network(options['prefix'], strict=False)
+        key = (str(network.network_address), str(network.netmask), options.get('nexthop', "On-link"), nic['ip'])
+        if verb == "add":
+            if key in self.routes:
+                return 1, "The object already exists.\n"
+            self.routes[key] = int(options.get('metric', 256))
+        elif key not in self.routes:
+            return 1, "Element not found.\n"
+        elif verb == "delete":
+            del self.routes[key]
+        elif verb == "set":
+            self.routes[key] = int(options.get('metric', self.routes[key]))
+        else:
+            return 1, "The syntax supplied for this command is not valid.\n"
+        return 0, ""
+
+
+class FakeConnection:
+    """A connection to a FakeHost that sleeps for the host's latency before every answer."""
+
+    def __init__(self, host, latency):
+        self.host = host
+        self.latency = latency
+
+    def run(self, command, kind=None, timeout=None):
+        if timeout is not None and self.latency > timeout:
+            time.sleep(timeout)
+            raise CommandHostError(f"fake host did not answer within {timeout:g}s")
+        time.sleep(self.latency)
+        with self.host.lock:
+            return self.host.run(command)
+
+    def close(self):
+        pass
+
+
+class FakeTransport:
+    """Simulated hosts for trying fleet mode without a network.
+
+    Every named host is a FakeHost. Connecting takes connect_latency seconds and each command `latency`
+    seconds, or host_latency[host] for the hosts listed there (math.inf never answers). Hosts in `down`
+    refuse connections. extra_nics and static_routes are passed on to every FakeHost.
+    """
+
+    name = "fake"
+
+    def __init__(self, hosts, latency=0.02, connect_latency=0.1, host_latency=None, down=(), extra_nics=0,
+                 static_routes=0):
+        self.hosts = {host: FakeHost(number, extra_nics, static_routes) for number, host in enumerate(hosts)}
+        self.latency = latency
+        self.connect_latency = connect_latency
+        self.host_latency = dict(host_latency or {})
+        self.down = set(down)
+        self.connections_opened = 0
+        self._lock = threading.Lock()
+
+    def connect(self, host):
+        time.sleep(self.connect_latency)
+        if host in self.down or host not in self.hosts:
+            raise ConnectionError(f"Connection to {host} refused")
+        with self._lock:
+            self.connections_opened += 1
+        return FakeConnection(self.hosts[host], self.host_latency.get(host, self.latency))
+
+
+class ConnectionPool:
+    """Idle connections kept per host, so later operations on a host reuse them instead of reconnecting."""
+
+    def __init__(self, transport):
+        self.transport = transport
+        self._lock = threading.Lock()
+        self._idle = {}  # host -> [connection]
+
+    def acquire(self, host):
+        """Return an idle connection to host, or open a new one."""
+        with self._lock:
+            idle = self._idle.get(host)
+            if idle:
+                return idle.pop()
+        return self.transport.connect(host)
+
+    def release(self, host, connection):
+        """Keep a connection that finished cleanly for the next operation on host."""
+        with self._lock:
+            self._idle.setdefault(host, []).append(connection)
+
+    def discard(self, connection):
+        """Close a connection that may be broken instead of reusing it."""
+        try:
+            connection.close()
+        except Exception as e:
+            log.debug("Closing a fleet connection failed: %s", e)
+
+    def close(self):
+        """Close every idle connection."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection in connections:
+                self.discard(connection)
+
+
+class FleetExecutor:
+    """Runs one operation against many hosts, at most max_workers at a time.
+
+    operation(backend) gets the host's RemoteBackend and returns anything JSON-serializable. Each host has
+    `timeout` seconds for the whole operation, connecting included. A host that fails or times out only
+    fails its own FleetResult. Connections go back to the pool after a clean run and are closed after
+    a failure, since they may be left mid-command.
+    """
+
+    def __init__(self, transport, max_workers=FLEET_WORKERS, timeout=FLEET_HOST_TIMEOUT):
+        self.pool = ConnectionPool(transport)
+        self.max_workers = max_workers
+        self.timeout = timeout
+
+    def _run_host(self, host, operation):
+        started = time.monotonic()
+        connection = None
+        try:
+            connection = self.pool.acquire(host)
+            value = operation(RemoteBackend(host, connection, started + self.timeout))
+        except Exception as e:
+            log.debug("Fleet operation on %s failed: %s", host, e)
+            if connection is not None:
+                self.pool.discard(connection)
+            return FleetResult(host, False, None, str(e), time.monotonic() - started)
+        self.pool.release(host, connection)
+        return FleetResult(host, True, value, None, time.monotonic() - started)
+
+    def run(self, hosts, operation, on_result=None):
+        """Run operation on every host and return {host: FleetResult} in the order the hosts were given.
+
+        on_result(result) is called from the calling thread as each host finishes.
+        """
+        hosts = list(dict.fromkeys(hosts))
+        results = {}
+        if not hosts:
+            return results
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(hosts))) as pool:
+            futures = [pool.submit(self._run_host, host, operation) for host in hosts]
+            for future in as_completed(futures):
+                result = future.result()
+                results[result.host] = result
+                if on_result is not None:
+                    on_result(result)
+        return {host: results[host] for host in hosts}
+
+    def close(self):
+        self.pool.close()
+
+
+def fleet_summary(results):
+    """Aggregate {host: FleetResult} into host counts, the errors by host and the spread of elapsed times."""
+    elapsed = sorted(result.elapsed for result in results.values())
+    return {
+        'hosts': len(results),
+        'ok': sum(result.ok for result in results.values()),
+        'failed': {host: result.error for host, result in results.items() if not result.ok},
+        'elapsed_p50': elapsed[len(elapsed) // 2] if elapsed else None,
+        'elapsed_max': elapsed[-1] if elapsed else None,
+    }
+
+
+# Read-only operations the command line can run across a fleet, by name
+FLEET_QUERIES = {
+    'nics': lambda backend: backend.get_nic_names(),
+    'details': lambda backend: backend.get_all_nic_details(backend.get_nic_names())[0],
+    'mtus': lambda backend: backend.get_mtus(),
+    'routes': lambda backend: backend.get_routing_table(),
+    'inventory': inventory,
+}
@@ -0,0 +1,368 @@
+"""On-disk history of ping samples, MTU discovery runs and interface traffic rates.
+
+Everything goes into one SQLite database in WAL mode. Callers only queue records; a single writer thread
+owns the write connection and commits them in batches, so the GUI never waits on the disk. Queries open
+their own connection per thread, which WAL lets run alongside the writer. Raw samples are rolled up into
+per-minute rows once they pass the raw retention and dropped entirely after the rollup retention.
+"""
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+
+from core import COUNTER_FIELDS, log
+
+# Environment variable naming the database file, instead of the per-user default
+HISTORY_PATH_ENV = "NIC_MANAGER_HISTORY"
+
+# The writer commits once this many records are queued, or once the oldest has waited this many seconds
+HISTORY_BATCH_SIZE = 2000
+HISTORY_FLUSH_INTERVAL = 1.0
+
+# Records waiting for the writer; past this, new records are dropped (and counted) rather than blocking
+HISTORY_QUEUE_SIZE = 200_000
+
+# Days raw samples are kept before they are rolled up, days the rollups are kept, and the rollup bucket
+HISTORY_RAW_DAYS = 7
+HISTORY_ROLLUP_DAYS = 90
+HISTORY_ROLLUP_SECONDS = 60
+
+# Seconds between retention passes of the writer
+HISTORY_MAINTENANCE_INTERVAL = 3600.0
+
+# Seconds between traffic rate records, each the average over that time
+HISTORY_COUNTER_INTERVAL = 1.0
+
+# Ping statuses are stored as their index here
+PING_STATUSES = ("success", "timeout", "unreachable", "fragmentation", "error")
+
+SCHEMA_VERSION = 1
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS names (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS ping_samples (
+    host_id INTEGER NOT NULL, time REAL NOT NULL, rtt REAL, ttl INTEGER, status INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS ping_samples_host_time ON ping_samples (host_id, time);
+CREATE TABLE IF NOT EXISTS ping_rollups (
+    host_id INTEGER NOT NULL, time REAL NOT NULL, sent INTEGER NOT NULL, received INTEGER NOT NULL,
+    rtt_min REAL, rtt_sum REAL, rtt_max REAL, PRIMARY KEY (host_id, time)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS mtu_runs (
+    host_id INTEGER NOT NULL, time REAL NOT NULL, min_mtu INTEGER, max_mtu INTEGER, mtu INTEGER,
+    probes INTEGER, rounds INTEGER, elapsed REAL);
+CREATE INDEX IF NOT EXISTS mtu_runs_host_time ON mtu_runs (host_id, time);
+CREATE TABLE IF NOT EXISTS counter_samples (
+    interface_id INTEGER NOT NULL, time REAL NOT NULL, bytes_in REAL, bytes_out REAL, packets_in REAL,
+    packets_out REAL, errors REAL, discards REAL);
+CREATE INDEX IF NOT EXISTS counter_samples_interface_time ON counter_samples (interface_id, time);
+CREATE TABLE IF NOT EXISTS counter_rollups (
+    interface_id INTEGER NOT NULL, time REAL NOT NULL, samples INTEGER NOT NULL, bytes_in REAL, bytes_out REAL,
+    packets_in REAL, packets_out REAL, errors REAL, discards REAL, bytes_in_max REAL, bytes_out_max REAL,
+    PRIMARY KEY (interface_id, time)) WITHOUT ROWID;
+"""
+
+# Queued record kinds and the statements that write them; the name is replaced by its id in names
+INSERTS = {
+    'ping': "INSERT INTO ping_samples VALUES (?, ?, ?, ?, ?)",
+    'mtu': "INSERT INTO mtu_runs VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+    'counters': "INSERT INTO counter_samples VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+}
+
+# Retention: raw rows older than the cutoff are folded into their minute's rollup, then deleted
+PING_ROLLUP = """
+INSERT INTO ping_rollups
+SELECT host_id, CAST(time / :bucket AS INTEGER) * :bucket AS minute, count(*), sum(status = 0), min(rtt),
+       sum(rtt), max(rtt)
+FROM ping_samples WHERE time < :cutoff GROUP BY host_id, minute
+ON CONFLICT (host_id, time) DO UPDATE SET
+    sent = sent + excluded.sent, received = received + excluded.received,
+    rtt_min = min(coalesce(rtt_min, excluded.rtt_min), coalesce(excluded.rtt_min, rtt_min)),
+    rtt_sum = coalesce(rtt_sum, 0) + coalesce(excluded.rtt_sum, 0),
+    rtt_max = max(coalesce(rtt_max, excluded.rtt_max), coalesce(excluded.rtt_max, rtt_max))
+"""
+COUNTER_ROLLUP = """
+INSERT INTO counter_rollups
+SELECT interface_id, CAST(time / :bucket AS INTEGER) * :bucket AS minute, count(*), sum(bytes_in),
+       sum(bytes_out), sum(packets_in), sum(packets_out), sum(errors), sum(discards), max(bytes_in),
+       max(bytes_out)
+FROM counter_samples WHERE time < :cutoff GROUP BY interface_id, minute
+ON CONFLICT (interface_id, time) DO UPDATE SET
+    samples = samples + excluded.samples, bytes_in = bytes_in + excluded.bytes_in,
+    bytes_out = bytes_out + excluded.bytes_out, packets_in = packets_in + excluded.packets_in,
+    packets_out = packets_out + excluded.packets_out, errors = errors + excluded.errors,
+    discards = discards + excluded.discards, bytes_in_max = max(bytes_in_max, excluded.bytes_in_max),
+    bytes_out_max = max(bytes_out_max, excluded.bytes_out_max)
+"""
+
+
+def default_history_path():
+    """Return the database path: NIC_MANAGER_HISTORY, or history.sqlite3 in the per-user data folder."""
+    path = os.environ.get(HISTORY_PATH_ENV)
+    if path:
+        return path
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+    return os.path.join(base, "NIC Manager", "history.sqlite3")
+
+
+def sum_pair(a, b):
+    return a + b
+
+
+def combine(function, a, b):
+    """Apply min, max or sum_pair to two values either of which may be None (no replies)."""
+    return b if a is None else a if b is None else function(a, b)
+
+
+class HistoryStore:
+    """Append-only history database with a batching writer thread.
+
+    add_ping(), add_mtu_run() and add_counters() only put a record on a queue and may be called from any
+    thread. The query methods read through a connection of the calling thread.
+    """
+
+    def __init__(self, path=None, batch_size=HISTORY_BATCH_SIZE, flush_interval=HISTORY_FLUSH_INTERVAL,
+                 raw_days=HISTORY_RAW_DAYS, rollup_days=HISTORY_ROLLUP_DAYS):
+        self.path = path or default_history_path()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.raw_days = raw_days
+        self.rollup_days = rollup_days
+        self.written = 0
+        self.dropped = 0
+        self._queue = queue.Queue(HISTORY_QUEUE_SIZE)
+        self._local = threading.local()
+        self._thread = None
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        connection = self._connect()
+        with connection:
+            connection.executescript(SCHEMA)
+            connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        connection.close()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute("PRAGMA journal_mode = WAL")
+        # WAL keeps the database consistent with NORMAL; a crash can only lose the last batches
+        connection.execute("PRAGMA synchronous = NORMAL")
+        return connection
+
+    def _reader(self):
+        """Return this thread's read connection."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+        return connection
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        """Write whatever is queued and stop the writer."""
+        if self._thread is not None:
+            self._queue.put(('stop', None, None))
+            self._thread.join()
+            self._thread = None
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def _put(self, kind, name, values):
+        try:
+            self._queue.put_nowait((kind, name, values))
+        except queue.Full:
+            if not self.dropped:
+                log.warning("History writer is behind, dropping records")
+            self.dropped += 1
+
+    def add_ping(self, host, record, when=None):
+        """Queue one PingRecord of `host`."""
+        status = PING_STATUSES.index(record.status) if record.status in PING_STATUSES else len(PING_STATUSES) - 1
+        # Like PingStats, only replies count towards RTT
+        rtt = record.rtt if record.status == "success" else None
+        self._put('ping', host, (time.time() if when is None else when, rtt, record.ttl, status))
+
+    def add_mtu_run(self, host, min_mtu, max_mtu, result, when=None):
+        """Queue one discover_path_mtu() result for `host`."""
+        self._put('mtu', host, (time.time() if when is None else when, min_mtu, max_mtu, result['mtu'],
+                                result['probes'], result['rounds'], result['elapsed']))
+
+    def add_counters(self, rates, when=None):
+        """Queue {interface: rates in COUNTER_FIELDS order}, as CounterSampler.averages() returns."""
+        when = time.time() if when is None else when
+        for name, values in rates.items():
+            rate = dict(zip(COUNTER_FIELDS, values))
+            self._put('counters', name, (when, rate['bytes_in'], rate['bytes_out'], rate['packets_in'],
+                                         rate['packets_out'], rate['errors_in'] + rate['errors_out'],
+                                         rate['discards_in'] + rate['discards_out']))
+
+    def flush(self, timeout=None):
+        """Wait until everything queued so far is committed; returns False on timeout."""
+        if self._thread is None:
+            return False
+        done = threading.Event()
+        self._queue.put(('flush', None, done))
+        return done.wait(timeout)
+
+    def _run(self):
+        connection = self._connect()
+        ids = {}
+        batch = []
+        first = None  # When the oldest record of the batch was queued
+        next_maintenance = time.monotonic()
+        while True:
+            wait = self.flush_interval if first is None else max(0.0, first + self.flush_interval - time.monotonic())
+            try:
+                kind, name, values = self._queue.get(timeout=wait)
+            except queue.Empty:
+                kind = None
+
+            if kind in INSERTS:
+                batch.append((kind, name, values))
+                if first is None:
+                    first = time.monotonic()
+                if len(batch) < self.batch_size:
+                    continue
+            if batch:
+                try:
+                    self._write(connection, ids, batch)
+                except sqlite3.Error as e:
+                    log.error("Failed to write %s history records: %s", len(batch), e)
+                batch = []
+                first = None
+
+            if kind == 'flush':
+                values.set()
+            elif kind == 'stop':
+                break
+            if time.monotonic() >= next_maintenance:
+                try:
+                    self.maintain(connection)
+                except sqlite3.Error as e:
+                    log.error("History retention failed: %s", e)
+                next_maintenance = time.monotonic() + HISTORY_MAINTENANCE_INTERVAL
+        connection.close()
+
+    def _write(self, connection, ids, batch):
+        """Insert a batch of queued records in one transaction."""
+        started = time.perf_counter()
+        rows = {kind: [] for kind in INSERTS}
+        with connection:
+            for kind, name, values in batch:
+                name_id = ids.get(name)
+                if name_id is None:
+                    connection.execute("INSERT OR IGNORE INTO names (name) VALUES (?)", (name,))
+                    name_id = ids[name] = connection.execute(
+                        "SELECT id FROM names WHERE name = ?", (name,)).fetchone()[0]
+                rows[kind].append((name_id, *values))
+            for kind, kind_rows in rows.items():
+                if kind_rows:
+                    connection.executemany(INSERTS[kind], kind_rows)
+        self.written += len(batch)
+        log.debug("Wrote %s history records in %.1f ms", len(batch), (time.perf_counter() - started) * 1000)
+
+    def maintain(self, connection=None, now=None):
+        """Roll raw samples past the raw retention into per-minute rows and drop rows past the rollup retention."""
+        connection = connection or self._reader()
+        now = time.time() if now is None else now
+        # Whole buckets only, so a later pass never splits a minute that was already rolled up
+        cutoff = (now - self.raw_days * 86400) // HISTORY_ROLLUP_SECONDS * HISTORY_ROLLUP_SECONDS
+        expired = now - self.rollup_days * 86400
+        started = time.perf_counter()
+        with connection:
+            parameters = {'bucket': HISTORY_ROLLUP_SECONDS, 'cutoff': cutoff}
+            connection.execute(PING_ROLLUP, parameters)
+            rolled = connection.execute("DELETE FROM ping_samples WHERE time < ?", (cutoff,)).rowcount
+            connection.execute(COUNTER_ROLLUP, parameters)
+            rolled += connection.execute("DELETE FROM counter_samples WHERE time < ?", (cutoff,)).rowcount
+            for table in ("ping_rollups", "counter_rollups", "mtu_runs"):
+                connection.execute(f"DELETE FROM {table} WHERE time < ?", (expired,))
+        if rolled:
+            log.debug("Rolled up %s history samples in %.1f ms", rolled, (time.perf_counter() - started) * 1000)
+
+    def names(self, kind):
+        """Return the hosts ('ping', 'mtu') or interfaces ('counters') that have history, sorted."""
+        tables = {'ping': ("ping_samples", "ping_rollups"), 'mtu': ("mtu_runs",),
+                  'counters': ("counter_samples", "counter_rollups")}[kind]
+        column = "interface_id" if kind == 'counters' else "host_id"
+        exists = " OR ".join(f"EXISTS (SELECT 1 FROM {table} WHERE {column} = names.id)" for table in tables)
+        return [row[0] for row in self._reader().execute(f"SELECT name FROM names WHERE {exists} ORDER BY name")]
+
+    def ping_samples(self, host, start, end, limit=None):
+        """Return [(time, rtt, ttl, status)] of `host` between start and end, oldest first."""
+        rows = self._reader().execute(
+            "SELECT time, rtt, ttl, status FROM ping_samples JOIN names ON names.id = host_id "
+            "WHERE name = ? AND time >= ? AND time < ? ORDER BY time LIMIT ?",
+            (host, start, end, -1 if limit is None else limit))
+        return [(when, rtt, ttl, PING_STATUSES[status]) for when, rtt, ttl, status in rows]
+
+    def ping_summary(self, host, start, end, bucket):
+        """Return [(bucket start, sent, received, min, avg, max RTT)] of `host`, from raw rows and rollups."""
+        parameters = {'name': host, 'start': start, 'end': end, 'bucket': bucket}
+        totals = {}
+        for query in (
+                "SELECT CAST(time / :bucket AS INTEGER) * :bucket AS slot, count(*), sum(status = 0), min(rtt), "
+                "sum(rtt), max(rtt) FROM ping_samples JOIN names ON names.id = host_id "
+                "WHERE name = :name AND time >= :start AND time < :end GROUP BY slot",
+                "SELECT CAST(time / :bucket AS INTEGER) * :bucket AS slot, sum(sent), sum(received), min(rtt_min), "
+                "sum(rtt_sum), max(rtt_max) FROM ping_rollups JOIN names ON names.id = host_id "
+                "WHERE name = :name AND time >= :start AND time < :end GROUP BY slot"):
+            for slot, sent, received, low, total, high in self._reader().execute(query, parameters):
+                merged = totals.get(slot)
+                if merged is not None:
+                    sent += merged[0]
+                    received += merged[1]
+                    low = combine(min, low, merged[2])
+                    total = combine(sum_pair, total, merged[3])
+                    high = combine(max, high, merged[4])
+                totals[slot] = (sent, received, low, total, high)
+        return [(slot, sent, received, low, total / received if received and total is not None else None, high)
+                for slot, (sent, received, low, total, high) in sorted(totals.items())]
+
+    def mtu_runs(self, host, start, end):
+        """Return [(time, min_mtu, max_mtu, mtu, probes, rounds, elapsed)] of `host`, oldest first."""
+        return self._reader().execute(
+            "SELECT time, min_mtu, max_mtu, mtu, probes, rounds, elapsed FROM mtu_runs "
+            "JOIN names ON names.id = host_id WHERE name = ? AND time >= ? AND time < ? ORDER BY time",
+            (host, start, end)).fetchall()
+
+    def counter_summary(self, interface, start, end, bucket):
+        """Return [(bucket start, samples, bytes in/s, bytes out/s, peak in, peak out, packets in/s,
+        packets out/s, errors/s, discards/s)] of `interface`, averaged per bucket from raw rows and rollups."""
+        parameters = {'name': interface, 'start': start, 'end': end, 'bucket': bucket}
+        totals = {}
+        for query in (
+                "SELECT CAST(time / :bucket AS INTEGER) * :bucket AS slot, count(*), sum(bytes_in), sum(bytes_out), "
+                "max(bytes_in), max(bytes_out), sum(packets_in), sum(packets_out), sum(errors), sum(discards) "
+                "FROM counter_samples JOIN names ON names.id = interface_id "
+                "WHERE name = :name AND time >= :start AND time < :end GROUP BY slot",
+                "SELECT CAST(time / :bucket AS INTEGER) * :bucket AS slot, sum(samples), sum(bytes_in), "
+                "sum(bytes_out), max(bytes_in_max), max(bytes_out_max), sum(packets_in), sum(packets_out), "
+                "sum(errors), sum(discards) FROM counter_rollups JOIN names ON names.id = interface_id "
+                "WHERE name = :name AND time >= :start AND time < :end GROUP BY slot"):
+            for slot, samples, *values in self._reader().execute(query, parameters):
+                merged = totals.get(slot)
+                if merged is not None:
+                    samples += merged[0]
+                    values = [a + b if index not in (2, 3) else max(a, b)
+                              for index, (a, b) in enumerate(zip(values, merged[1]))]
+                totals[slot] = (samples, values)
+        return [(slot, samples, values[0] / samples, values[1] / samples, values[2], values[3],
+                 *(value / samples for value in values[4:]))
+                for slot, (samples, values) in sorted(totals.items())]
+
+
+def open_history(path=None):
+    """Open and start the history store, or return None (and log why) if the database cannot be opened."""
+    try:
+        return HistoryStore(path).start()
+    except (OSError, sqlite3.Error) as e:
+        log.error("History is off, the database could not be opened: %s", e)
+        return None
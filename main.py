@@ -2,260 +2,564 @@ from elevate import elevate
 import threading
 import sys
 import subprocess
-import math
 import os
-from PyQt5.QtCore import pyqtSlot, QMetaObject, Qt, Q_ARG # Add this at the top of your file
+import re
+import json
+import logging
+import tempfile
+import time
+from collections import deque
+from PyQt5.QtCore import pyqtSlot, pyqtSignal, QAbstractTableModel, QEvent, QMetaObject, QModelIndex, QObject, \
+    QPointF, QRunnable, QSize, QThreadPool, QTimer, Qt, Q_ARG
 from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QLabel, QListWidget, QTextEdit, QLineEdit, QPushButton, \
     QFormLayout, QMessageBox, QRadioButton, QButtonGroup, QHBoxLayout, QTabWidget, QTableWidget, QTableWidgetItem, \
-    QCheckBox
+    QCheckBox, QPlainTextEdit, QFileDialog, QTableView, QStyledItemDelegate, QStyleOptionButton, QStyle, QComboBox
 from PyQt5.QtWidgets import QProgressBar
-from PyQt5.QtWidgets import QApplication
-from PyQt5.QtGui import QTextCursor
-
-
-# Automatically request elevated privileges
-elevate()
-
-
-def get_nic_names():
-    """Use netsh to get network interface names."""
-    try:
-        print("[DEBUG] Running 'netsh interface ipv4 show interfaces'")  # DEBUG
-        output = subprocess.run(["netsh", "interface", "ipv4", "show", "interfaces"], capture_output=True,
-                                text=True).stdout
-        print(f"[DEBUG] netsh output for interfaces:\n{output}")  # DEBUG
-
-        lines = output.splitlines()
-        interface_names = []
-
-        for line in lines:
-            if "connected" in line.lower():  # Only include connected interfaces
-                parts = line.split()
-                print(f"[DEBUG] Parsing line for interface: {line}")  # DEBUG
-                if len(parts) > 4:  # Ensure there's enough parts to extract name
-                    interface_name = " ".join(parts[4:])  # Join parts after index to get full name
-                    interface_names.append(interface_name)
-                    print(f"[DEBUG] Found interface: {interface_name}")  # DEBUG
-
-        print(f"[DEBUG] Interface names found: {interface_names}")  # DEBUG
-        return interface_names
-    except Exception as e:
-        print(f"[ERROR] Failed to retrieve NIC names: {e}")
-        QMessageBox.critical(None, "Error", f"Failed to retrieve NIC names: {str(e)}")
-        return []
-
-def get_mtu(interface):
-    """Use netsh to get the MTU for the specified interface."""
-    try:
-        print(f"[DEBUG] Running 'netsh interface ipv4 show subinterface'")  # DEBUG
-        output = subprocess.run(["netsh", "interface", "ipv4", "show", "subinterface"], capture_output=True,
-                                text=True).stdout
-        print(f"[DEBUG] netsh output for subinterfaces:\n{output}")  # DEBUG
-
-        lines = output.splitlines()
-        mtu_value = None
-
-        for line in lines:
-            if interface in line:
-                parts = line.split()
-                if len(parts) > 2:
-                    mtu_value = parts[0]  # MTU is the first item in the line
-                    print(f"[DEBUG] Found MTU for {interface}: {mtu_value}")
-                    break
-
-        return mtu_value if mtu_value else "Unknown"
-    except Exception as e:
-        print(f"[ERROR] Failed to retrieve MTU: {e}")
-        return "Unknown"
-
-def get_nic_details(interface):
-    """Use netsh to get detailed information about the selected NIC, including DNS and MTU."""
-    try:
-        print(f"[DEBUG] Running 'netsh interface ipv4 show config {interface}'")  # DEBUG
-        output = subprocess.run(["netsh", "interface", "ipv4", "show", "config", interface], capture_output=True,
-                                text=True).stdout
-        print(f"[DEBUG] netsh output for {interface} config:\n{output}")  # DEBUG
-
-        nic_details = {}
-
-        # Parse netsh output
-        lines = output.splitlines()
-        ip_address = None
-        primary_dns = None
-        backup_dns = None
-        for line in lines:
-            if "IP Address" in line:
-                ip_address = line.split(":")[-1].strip()
-                nic_details['IP Address'] = ip_address
-                print(f"[DEBUG] Found IP Address: {ip_address}")  # DEBUG
-            elif "Subnet Prefix" in line:
-                # Split to get the subnet mask portion
-                subnet_prefix = line.split(":")[-1].strip()
-                subnet_mask = subnet_prefix.split(" ")[-1]
-                subnet_mask = subnet_mask[:-1]
-                nic_details['Subnet Mask'] = subnet_mask
-                print(f"[DEBUG] Found Subnet Mask: {nic_details['Subnet Mask']}")  # DEBUG
-            elif "Default Gateway" in line:
-                nic_details['Default Gateway'] = line.split(":")[-1].strip() or "No gateway"
-                print(f"[DEBUG] Found Default Gateway: {nic_details['Default Gateway']}")  # DEBUG
-            elif "Statically Configured DNS Servers" in line or "DNS servers configured through DHCP" in line:
-                # Extract DNS servers
-                dns_servers = line.split(":")[-1].strip().split()
-                nic_details['Primary DNS'] = dns_servers[0] if len(dns_servers) > 0 else "None"
-                nic_details['Backup DNS'] = dns_servers[1] if len(dns_servers) > 1 else "None"
-                print(f"[DEBUG] Found DNS Servers: {nic_details['Primary DNS']}, {nic_details['Backup DNS']}")  # DEBUG
-            elif "DHCP enabled" in line:
-                nic_details['DHCP'] = line.split(":")[-1].strip()
-                print(f"[DEBUG] Found DHCP status: {nic_details['DHCP']}")  # DEBUG
-
-        # Get MTU from the subinterface command
-        mtu_value = get_mtu(interface)
-        nic_details['MTU'] = mtu_value
-
-        print(f"[DEBUG] NIC details for {interface}: {nic_details}")  # DEBUG
-        return nic_details
-    except Exception as e:
-        print(f"[ERROR] Failed to retrieve NIC details: {e}")
-        QMessageBox.critical(None, "Error", f"Failed to retrieve NIC details for {interface}: {str(e)}")
-        return {}
-
-def set_static_ip(interface, ip, subnet_mask, gateway, primary_dns, backup_dns):
-    """Set a new static IP, subnet mask, default gateway, and DNS using netsh."""
-    try:
-        print(f"[DEBUG] Running netsh to set static IP: {ip}, Subnet Mask: {subnet_mask}, Gateway: {gateway} for {interface}")
-        command = f'netsh interface ipv4 set address name="{interface}" static {ip} {subnet_mask} {gateway}' if gateway else f'netsh interface ipv4 set address name="{interface}" static {ip} {subnet_mask} none'
-
-        result = subprocess.run(command, capture_output=True, text=True, shell=True)
-
-        if result.returncode != 0:
-            error_message = result.stderr.strip()
-            raise Exception(f"Failed with error: {error_message}")
-
-        # If DNS fields are not empty, apply them
-        if primary_dns or backup_dns:
-            dns_command = f'netsh interface ipv4 set dns name="{interface}" static {primary_dns} primary'
-            subprocess.run(dns_command, capture_output=True, text=True, shell=True)
-            if backup_dns:
-                backup_dns_command = f'netsh interface ipv4 add dns name="{interface}" {backup_dns} index=2'
-                subprocess.run(backup_dns_command, capture_output=True, text=True, shell=True)
-
-        print("[DEBUG] Successfully set the new static IP configuration")
-        QMessageBox.information(None, "Success", "IP address, Subnet Mask, Default Gateway, and DNS successfully changed.")
-    except Exception as e:
-        print(f"[ERROR] Failed to set static IP: {e}")
-        QMessageBox.critical(None, "Error", f"Failed to set the new configuration: {str(e)}")
-
-def set_dhcp(interface):
-    """Set the interface to use DHCP and set DNS to automatic."""
-    try:
-        print(f"[DEBUG] Running netsh to set DHCP for {interface}")
-        command = f'netsh interface ipv4 set address name="{interface}" source=dhcp'
-        result = subprocess.run(command, capture_output=True, text=True, shell=True)
-
-        if result.returncode != 0:
-            raise Exception(result.stderr)
-
-        # Set DNS to be obtained automatically as well
-        print(f"[DEBUG] Running netsh to set DNS to automatic for {interface}")
-        dns_command = f'netsh interface ipv4 set dns name="{interface}" source=dhcp'
-        dns_result = subprocess.run(dns_command, capture_output=True, text=True, shell=True)
-
-        if dns_result.returncode != 0:
-            raise Exception(dns_result.stderr)
-
-        print("[DEBUG] Successfully set DHCP and DNS to automatic")
-        QMessageBox.information(None, "Success", "Successfully changed to DHCP and automatic DNS.")
-    except Exception as e:
-        print(f"[ERROR] Failed to set DHCP or DNS: {e}")
-        QMessageBox.critical(None, "Error", f"Failed to set DHCP or DNS: {str(e)}")
-
-def set_mtu(interface, mtu_value):
-    """Set the MTU for the specified interface using netsh."""
-    try:
-        print(f"[DEBUG] Running netsh to set MTU: {mtu_value} for {interface}")
-        mtu_command = f'netsh interface ipv4 set subinterface "{interface}" mtu={mtu_value} store=persistent'
-        result = subprocess.run(mtu_command, capture_output=True, text=True, shell=True)
-
-        if result.returncode != 0:
-            error_message = result.stderr.strip()
-            raise Exception(f"Failed with error: {error_message}")
-
-        print("[DEBUG] Successfully set MTU")
-        QMessageBox.information(None, "Success", f"MTU successfully set to {mtu_value}.")
-    except Exception as e:
-        print(f"[ERROR] Failed to set MTU: {e}")
-        QMessageBox.critical(None, "Error", f"Failed to set MTU: {str(e)}")
-
-def get_routing_table():
-    """Run 'route print', extract the IPv4 Route Table, and return the output."""
-    try:
-        print(f"[DEBUG] Running 'route print' to get the routing table")  # DEBUG
-        output = subprocess.run(["route", "print"], capture_output=True, text=True).stdout
-        print(f"[DEBUG] Full routing table:\n{output}")  # DEBUG
-
-        # Extract the IPv4 Route Table section
-        ipv4_table = []
-        inside_ipv4_table = False
-        inside_active_routes = False
-
-        for line in output.splitlines():
-            # Start parsing once we encounter "Active Routes:"
-            if "Active Routes:" in line:
-                inside_active_routes = True
-                continue  # Skip the "Active Routes:" line itself
-
-            # Stop parsing at the end of the route table section
-            if "===" in line and inside_active_routes:
-                break  # End of IPv4 route table
-
-            if inside_active_routes:
-                # Skip the header line with "Network Destination", "Netmask", etc.
-                if "Network Destination" in line:
-                    continue
-                if line.strip():  # Skip empty lines
-                    ipv4_table.append(line)
-
-        print(f"[DEBUG] Extracted IPv4 routing table:\n{ipv4_table}")  # DEBUG
-        return ipv4_table
-    except Exception as e:
-        print(f"[ERROR] Failed to retrieve routing table: {e}")
-        QMessageBox.critical(None, "Error", f"Failed to retrieve routing table: {str(e)}")
-        return []
-
-def send_ping_with_mtu(mtu_size, remote_host, timeout):
-    """Send a ping with the specified MTU and the DF (Don't Fragment) bit set."""
-    try:
-        # The command sends a ping with the specified packet size, DF bit, and timeout
-        command = f'ping -f -l {mtu_size} -w {timeout} {remote_host}'
-        print(f"[DEBUG] Running command: {command}")
-        result = subprocess.run(command, capture_output=True, text=True, shell=True)
-
-        output = result.stdout
-        print(f"[DEBUG] Ping result output:\n{output}")
-
-        # Check for the fragmentation message
-        if "Packet needs to be fragmented" in output:
-            print(f"[DEBUG] Ping failed: MTU {mtu_size} is too large, needs to fragment.")
-            return "fragmentation"
-
-        # Check for "Request timed out" message
-        if "Request timed out" in output:
-            print(f"[DEBUG] Ping failed: Request timed out.")
-            return "timeout"
-
-        # If neither condition is met, assume the ping was successful
-        print(f"[DEBUG] Ping successful with MTU {mtu_size}.")
-        return "success"
-
-    except Exception as e:
-        print(f"[ERROR] Failed to send ping: {e}")
-        return "error"
+from PyQt5.QtGui import QColor, QPainter, QPen, QPolygonF
+from core import COUNTER_FIELDS, COUNTER_HISTORY_SECONDS, COUNTER_INTERVAL, MONITOR_INTERVAL, MTU_PROBE_FANOUT, \
+    CounterSampler, NetworkChangeSet, PingMonitor, PingSession, PingStats, analyze_route_rows, apply_route_batch, \
+    command_stats, configure_logging, describe_route_issue, discover_path_mtu, export_routes, format_bit_rate, \
+    format_ping_stats, get_icmp_prober, log, plan_route_import, route_add, route_delete, route_lookup, \
+    route_modify, select_backend, select_counter_source, select_route_source, \
+    send_ping_with_mtu
+from history import HISTORY_COUNTER_INTERVAL, open_history
+
+
+# Columns of the routing tab; the last one holds the Delete buttons
+ROUTE_COLUMNS = ['Network Destination', 'Netmask', 'Gateway', 'Interface', 'Metric', 'Delete']
+ROUTE_DELETE_COLUMN = 5
+
+# Row colors for the findings of the route analysis, in order of severity
+ROUTE_ISSUE_COLORS = {"shadowed": "#f7c5c5", "duplicate": "#f7e3c5", "redundant": "#fff5c0", "overlap": "#d6e4f7"}
+
+# Quiet period before a burst of route changes refreshes the routing tab, and the longest a burst can defer it
+ROUTE_WATCH_DEBOUNCE_MS = 250
+ROUTE_WATCH_MAX_DELAY_MS = 2000
+
+# Milliseconds between redraws of the Monitor grid, its columns and the colors of the Status cell
+MONITOR_REFRESH_MS = 500
+MONITOR_COLUMNS = ["Target", "Status", "Last RTT", "Avg", "Loss", "p95", "Sent"]
+MONITOR_STATUS_COLORS = {"success": "#c8f7c5", "timeout": "#f7c5c5", "unreachable": "#f7c5c5", "error": "#f7e3c5"}
+
+# Diagnostics tab: one row per command kind, redrawn while the tab is showing
+DIAGNOSTICS_COLUMNS = ["Command", "Calls", "Failed", "Spawn p50", "Run p50", "Run p95", "Run max", "Avg output",
+                       "Parse p50", "Parse p95"]
+DIAGNOSTICS_REFRESH_MS = 1000
+
+# Traffic tab: redrawn while the tab is showing; one table row per interface with its newest rates
+TRAFFIC_REFRESH_MS = 200
+TRAFFIC_COLUMNS = ["Interface", "In", "Out", "Packets in/s", "Packets out/s", "Errors/s", "Discards/s"]
+TRAFFIC_LINE_COLORS = {"bytes_in": "#2e7d32", "bytes_out": "#1565c0"}
+
+# History tab: what each range shows and the bucket its rows are summarized into, in seconds
+HISTORY_RANGES = {"Last hour": (3600, 60), "Last day": (86400, 600), "Last week": (7 * 86400, 3600),
+                  "Last 90 days": (90 * 86400, 86400)}
+HISTORY_COLUMNS = {
+    "Ping": ["Time", "Sent", "Lost", "Min", "Avg", "Max"],
+    "MTU runs": ["Time", "Range", "MTU", "Probes", "Rounds", "Seconds"],
+    "Traffic": ["Time", "Avg in", "Avg out", "Peak in", "Peak out", "Packets in/s", "Packets out/s", "Errors/s",
+                "Discards/s"],
+}
+HISTORY_KINDS = {"Ping": "ping", "MTU runs": "mtu", "Traffic": "counters"}
+
+# Levels the Diagnostics tab can switch the log to
+LOG_LEVELS = ["DEBUG", "INFO", "WARNING", "ERROR"]
+
+# Lines kept in the Ping and MTU output views, and how many times a second new lines are drawn
+LOG_VIEW_MAX_LINES = 5000
+LOG_VIEW_FPS = 30
+
+# Most lines queued for the next frame; when more arrive the oldest go straight to the spill file
+LOG_VIEW_QUEUE_LINES = 200
+
+# Size at which the file that takes lines trimmed from the output views is rotated, and how many old files to keep
+LOG_SPILL_MAX_BYTES = 10 * 1024 * 1024
+LOG_SPILL_BACKUPS = 3
+
+# File dialog filter for route imports and exports
+ROUTE_FILE_FILTER = "Route files (*.csv *.json);;All files (*)"
+
+# Shown in the status line while an operation of that name is running
+OPERATION_LABELS = {
+    "nic_list": "refreshing NIC list",
+    "nic_details": "reading NIC details",
+    "apply_network": "applying network settings",
+    "apply_mtu": "applying MTU",
+    "routing_table": "reading routing table",
+    "route_change": "changing routes",
+    "route_lookup": "looking up routes",
+    "route_import": "importing routes",
+    "route_analysis": "analyzing routes",
+    "mtu_nic_list": "refreshing MTU NIC list",
+    "mtu_details": "reading MTU details",
+    "history": "reading history",
+    "history_names": "listing history",
+}
+
+
+class CommandTask(QRunnable):
+    """A single queued call to a blocking function, run on the executor's thread pool."""
+
+    def __init__(self, executor, operation, generation, fn, args):
+        super().__init__()
+        self.setAutoDelete(False)  # The executor owns the task so it can still be taken off the queue
+        self.executor = executor
+        self.operation = operation
+        self.generation = generation
+        self.fn = fn
+        self.args = args
+
+    def run(self):
+        try:
+            value = self.fn(*self.args)
+            ok = True
+        except Exception as e:
+            value = str(e)
+            ok = False
+        # Emitted from the pool thread, delivered on the GUI thread through a queued connection
+        self.executor.task_done.emit(self.operation, self.generation, ok, value)
+
+
+class CommandExecutor(QObject):
+    """Runs netsh/route/ping work off the GUI thread and hands the results back to the widgets.
+
+    Work is submitted under an operation name. Submitting again under the same name supersedes the
+    previous request: it is taken off the queue if it has not started yet, and its result is dropped
+    if it has.
+    """
+
+    task_done = pyqtSignal(str, int, bool, object)
+    busy_changed = pyqtSignal(str, bool)
+
+    def __init__(self, parent=None, max_threads=4):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+        self._generation = {}  # operation -> generation of the latest request
+        self._pending = {}  # (operation, generation) -> (task, on_result, on_error)
+        self.task_done.connect(self._on_task_done)
+
+    def submit(self, operation, fn, *args, on_result=None, on_error=None):
+        """Run fn(*args) on the pool and call on_result(value) or on_error(message) on the GUI thread."""
+        self.cancel(operation)
+        generation = self._generation.get(operation, 0) + 1
+        self._generation[operation] = generation
+
+        task = CommandTask(self, operation, generation, fn, args)
+        self._pending[(operation, generation)] = (task, on_result, on_error)
+        log.debug("Submitting '%s' #%s", operation, generation)
+        self.busy_changed.emit(operation, True)
+        self.pool.start(task)
+
+    def cancel(self, operation):
+        """Supersede any outstanding request for the operation."""
+        generation = self._generation.get(operation)
+        if generation is None:
+            return
+        self._generation[operation] = generation + 1
+        pending = self._pending.get((operation, generation))
+        if pending is not None and self.pool.tryTake(pending[0]):
+            log.debug("Dropped queued '%s' #%s before it started", operation, generation)
+            del self._pending[(operation, generation)]
+            self.busy_changed.emit(operation, self.is_busy(operation))
+
+    def is_busy(self, operation):
+        """Return True if a request for the operation has not come back yet."""
+        return any(key[0] == operation for key in self._pending)
+
+    @pyqtSlot(str, int, bool, object)
+    def _on_task_done(self, operation, generation, ok, value):
+        _, on_result, on_error = self._pending.pop((operation, generation), (None, None, None))
+        self.busy_changed.emit(operation, self.is_busy(operation))
+
+        if generation != self._generation.get(operation):
+            # A newer request replaced this one while it was running
+            log.debug("Discarding stale result for '%s' #%s", operation, generation)
+            return
 
+        if ok and on_result is not None:
+            on_result(value)
+        elif not ok:
+            log.error("'%s' failed: %s", operation, value)
+            if on_error is not None:
+                on_error(value)
+
+
+
+class LogSink(QObject):
+    """Feeds a read-only QPlainTextEdit from any thread with bounded memory and a bounded repaint rate.
+
+    append() is thread-safe and only queues the line in a fixed-size ring buffer. A timer on the GUI thread
+    drains the buffer LOG_VIEW_FPS times a second with a single appendPlainText, and the view keeps at most
+    max_lines blocks. Lines pushed out of the view, or out of the ring buffer before they were ever shown,
+    are written to a rotating file in the temp directory instead of being lost.
+    """
+
+    def __init__(self, view, name, max_lines=LOG_VIEW_MAX_LINES, parent=None):
+        super().__init__(parent)
+        self.view = view
+        self.view.setMaximumBlockCount(max_lines)
+        self.max_lines = max_lines
+        self.spill_path = os.path.join(tempfile.gettempdir(), f"nic_manager_{name}.log")
+        self._spill_file = None
+        self._lock = threading.Lock()
+        self._pending = deque(maxlen=LOG_VIEW_QUEUE_LINES)  # Queued lines not shown yet
+        self._dropped = []  # Lines that fell out of the ring buffer before they were shown
+        self._shown = deque(maxlen=max_lines)  # Mirror of the view, to know which lines it trims
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(1000 // LOG_VIEW_FPS)
+        self.timer.timeout.connect(self.flush)
+        self.timer.start()
+
+    def append(self, line):
+        """Queue a line for the view; safe to call from any thread."""
+        with self._lock:
+            if len(self._pending) == self._pending.maxlen:
+                self._dropped.append(self._pending[0])
+            self._pending.append(line)
+
+    def clear(self):
+        """Empty the view and anything still queued."""
+        with self._lock:
+            self._pending.clear()
+            self._dropped.clear()
+        self._shown.clear()
+        self.view.clear()
+
+    def flush(self):
+        """Show the queued lines with one repaint and spill whatever no longer fits."""
+        with self._lock:
+            if not self._pending and not self._dropped:
+                return
+            lines = list(self._pending)
+            self._pending.clear()
+            dropped = self._dropped
+            self._dropped = []
+
+        # Lines the view is about to trim from the top, which can include the first of these lines too,
+        # spilled in the order they came: shown, dropped from the queue, then queued
+        overflow = max(len(self._shown) + len(lines) - self.max_lines, 0)
+        trimmed = min(overflow, len(self._shown))
+        spilled = list(self._shown)[:trimmed] + dropped + lines[:overflow - trimmed]
+        self._shown.extend(lines)
+
+        if spilled:
+            self._spill(spilled)
+        self.view.appendPlainText("\n".join(lines))
+
+    def _spill(self, lines):
+        """Append lines to the spill file, rotating it once it passes LOG_SPILL_MAX_BYTES."""
+        try:
+            if self._spill_file is None:
+                self._spill_file = open(self.spill_path, "a", encoding="utf-8")
+            self._spill_file.write("\n".join(lines) + "\n")
+            self._spill_file.flush()
+
+            if self._spill_file.tell() > LOG_SPILL_MAX_BYTES:
+                self._spill_file.close()
+                self._spill_file = None
+                for index in range(LOG_SPILL_BACKUPS - 1, 0, -1):
+                    if os.path.exists(f"{self.spill_path}.{index}"):
+                        os.replace(f"{self.spill_path}.{index}", f"{self.spill_path}.{index + 1}")
+                os.replace(self.spill_path, f"{self.spill_path}.1")
+        except OSError as e:
+            log.error("Failed to write %s: %s", self.spill_path, e)
+
+
+class RouteTableModel(QAbstractTableModel):
+    """Routes for the routing tab view, updated in place by diffing each new snapshot against the last one.
+
+    Rows are keyed by (destination, netmask, gateway, interface). A refresh removes the keys that went away,
+    appends the new ones and signals a change only for the metric cells that differ, so a view over thousands
+    of routes repaints just the rows that changed. Cell edits are kept apart from the loaded route until it is
+    updated, so the route as the system has it and the edited route are both available.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.routes = []  # [destination, netmask, gateway, interface, metric] as loaded
+        self.rows = {}  # Route key -> row
+        self.edits = {}  # Route key -> edited copy of the route
+        self.issues = {}  # Route key -> [(category, other)] from analyze_routes()
+
+    @staticmethod
+    def route_key(route):
+        return tuple(route[:4])
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.routes)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(ROUTE_COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return ROUTE_COLUMNS[section]
+        return None
+
+    def flags(self, index):
+        flags = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        if index.column() < ROUTE_DELETE_COLUMN:
+            flags |= Qt.ItemIsEditable
+        return flags
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.column() == ROUTE_DELETE_COLUMN:
+            return None
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            return self.edited_route(index.row())[index.column()]
+        if role in (Qt.BackgroundRole, Qt.ToolTipRole):
+            issues = self.issues.get(self.route_key(self.routes[index.row()]))
+            if issues:
+                if role == Qt.ToolTipRole:
+                    return "\n".join(describe_route_issue(category, other) for category, other in issues)
+                return QColor(ROUTE_ISSUE_COLORS[issues[0][0]])
+        return None
+
+    def set_issues(self, issues):
+        """Highlight the routes with analysis findings, replacing any earlier ones."""
+        self.issues = issues
+        if self.routes:
+            self.dataChanged.emit(self.index(0, 0), self.index(len(self.routes) - 1, ROUTE_DELETE_COLUMN - 1),
+                                  [Qt.BackgroundRole, Qt.ToolTipRole])
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.EditRole or not index.isValid() or index.column() == ROUTE_DELETE_COLUMN:
+            return False
+        route = self.routes[index.row()]
+        edited = self.edits.setdefault(self.route_key(route), list(route))
+        edited[index.column()] = str(value).strip()
+        if edited == route:
+            del self.edits[self.route_key(route)]
+        self.dataChanged.emit(index, index)
+        return True
+
+    def route(self, row):
+        """Return the route in `row` as it was loaded from the system."""
+        return list(self.routes[row])
+
+    def edited_route(self, row):
+        """Return the route in `row` with any unsaved cell edits applied."""
+        route = self.routes[row]
+        return self.edits.get(self.route_key(route), route)
+
+    def update(self, routes):
+        """Bring the model in line with `routes`, emitting only the row and cell changes; return the counts."""
+        new_routes = {}
+        for route in routes:
+            new_routes.setdefault(self.route_key(route), list(route))  # The first of any duplicate key wins
+
+        # Remove vanished rows from the bottom up, one signal per contiguous run
+        removed = sorted((row for key, row in self.rows.items() if key not in new_routes), reverse=True)
+        i = 0
+        while i < len(removed):
+            last = first = removed[i]
+            while i + 1 < len(removed) and removed[i + 1] == first - 1:
+                i += 1
+                first = removed[i]
+            self.beginRemoveRows(QModelIndex(), first, last)
+            for route in self.routes[first:last + 1]:
+                self.edits.pop(self.route_key(route), None)
+            del self.routes[first:last + 1]
+            self.endRemoveRows()
+            i += 1
+        if removed:
+            self.rows = {self.route_key(route): row for row, route in enumerate(self.routes)}
+
+        # Metric changes on the rows that stayed
+        changed = 0
+        for row, route in enumerate(self.routes):
+            metric = new_routes[self.route_key(route)][4]
+            if route[4] != metric:
+                route[4] = metric
+                if self.edits.get(self.route_key(route)) == route:
+                    del self.edits[self.route_key(route)]  # The edit has been applied
+                index = self.index(row, 4)
+                self.dataChanged.emit(index, index)
+                changed += 1
+
+        # New routes go to the end in one insert
+        added = [route for key, route in new_routes.items() if key not in self.rows]
+        if added:
+            first = len(self.routes)
+            self.beginInsertRows(QModelIndex(), first, first + len(added) - 1)
+            for row, route in enumerate(added, start=first):
+                self.routes.append(route)
+                self.rows[self.route_key(route)] = row
+            self.endInsertRows()
+
+        return {'added': len(added), 'removed': len(removed), 'changed': changed}
+
+
+class RouteDeleteDelegate(QStyledItemDelegate):
+    """Draws a Delete button in every cell of its column and reports the row that was clicked."""
+
+    delete_requested = pyqtSignal(int)
+
+    def paint(self, painter, option, index):
+        button = QStyleOptionButton()
+        button.rect = option.rect.adjusted(2, 2, -2, -2)
+        button.text = "Delete"
+        button.state = QStyle.State_Enabled
+        QApplication.style().drawControl(QStyle.CE_PushButton, button, painter)
+
+    def sizeHint(self, option, index):
+        return QSize(70, 24)
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton \
+                and option.rect.contains(event.pos()):
+            self.delete_requested.emit(index.row())
+            return True
+        return False
+
+
+class ThroughputGraph(QWidget):
+    """Line graph of one interface's inbound and outbound rate over the last `window` seconds."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.window = COUNTER_HISTORY_SECONDS
+        self.now = 0.0
+        self.series = {}  # field -> (times, bytes per second), oldest first
+        self.setMinimumHeight(160)
+
+    def set_series(self, now, window, series):
+        self.now = now
+        self.window = window
+        self.series = series
+        self.update()
+
+    def scale_top(self):
+        """Return the rate at the top of the graph: the peak rounded up to 1, 2 or 5 times a power of ten."""
+        peak = max((max(rates) for _, rates in self.series.values() if len(rates)), default=0.0)
+        top = 1.0
+        while top < peak:
+            for step in (2, 5, 10):
+                if top / 10 * step >= peak:
+                    return top / 10 * step
+            top *= 10
+        return top
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.fillRect(self.rect(), Qt.white)
+        plot = self.rect().adjusted(8, 20, -8, -8)
+        top = self.scale_top()
+
+        painter.setPen(QPen(QColor("#e0e0e0"), 1))
+        for line in range(5):
+            y = plot.top() + plot.height() * line / 4
+            painter.drawLine(QPointF(plot.left(), y), QPointF(plot.right(), y))
+
+        painter.setPen(Qt.black)
+        painter.drawText(plot.left(), 14, format_bit_rate(top))
+        legend_x = plot.right() - 90
+        for field, label in (("bytes_in", "In"), ("bytes_out", "Out")):
+            painter.setPen(QColor(TRAFFIC_LINE_COLORS[field]))
+            painter.drawText(legend_x, 14, label)
+            legend_x += 45
+
+        # The right edge is now and the left edge `window` seconds ago
+        for field, (times, rates) in self.series.items():
+            if len(times) < 2:
+                continue
+            points = QPolygonF([
+                QPointF(plot.right() - (self.now - when) / self.window * plot.width(),
+                        plot.bottom() - rate / top * plot.height())
+                for when, rate in zip(times, rates)])
+            painter.setPen(QPen(QColor(TRAFFIC_LINE_COLORS[field]), 1.5))
+            painter.drawPolyline(points)
+        painter.end()
+
+
+class RouteWatcher(QObject):
+    """Turns route change events from any thread into debounced routes_changed signals on the GUI thread.
+
+    A burst of events is coalesced into one signal, sent once no event has arrived for
+    ROUTE_WATCH_DEBOUNCE_MS, or at the latest ROUTE_WATCH_MAX_DELAY_MS after the burst began, so a
+    flapping route still shows up without redrawing the table for every event.
+    """
+
+    routes_changed = pyqtSignal(int)  # Number of events coalesced into this change
+    _event = pyqtSignal()
+
+    def __init__(self, source, parent=None):
+        super().__init__(parent)
+        self.source = source
+        self.running = False
+        self._lock = threading.Lock()
+        self._count = 0  # Events since the last routes_changed
+        self._seen = 0  # Events counted when the debounce timer was last armed
+        self._burst_start = 0.0
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(ROUTE_WATCH_DEBOUNCE_MS)
+        self.timer.timeout.connect(self._on_timeout)
+        self._event.connect(self._on_event, Qt.QueuedConnection)
+
+    def start(self):
+        if not self.running:
+            self.source.start(self.notify)
+            self.running = True
+
+    def stop(self):
+        if self.running:
+            self.source.stop()
+            self.running = False
+            self.timer.stop()
+            with self._lock:
+                self._count = 0
+
+    def notify(self):
+        """Record one route change event; safe to call from any thread."""
+        with self._lock:
+            self._count += 1
+            first = self._count == 1
+        if first:
+            self._event.emit()  # Only the first event of a burst crosses to the GUI thread
+
+    def _on_event(self):
+        with self._lock:
+            self._seen = self._count
+        self._burst_start = time.monotonic()
+        # The interval is given again, since the end of a long burst arms the timer for less
+        self.timer.start(ROUTE_WATCH_DEBOUNCE_MS)
+
+    def _on_timeout(self):
+        with self._lock:
+            count = self._count
+            waited = (time.monotonic() - self._burst_start) * 1000
+            if count != self._seen and waited < ROUTE_WATCH_MAX_DELAY_MS:
+                self._seen = count  # Still changing; wait for it to settle
+                self.timer.start(int(min(ROUTE_WATCH_DEBOUNCE_MS, ROUTE_WATCH_MAX_DELAY_MS - waited)) or 1)
+                return
+            self._count = 0
+        if count:
+            self.routes_changed.emit(count)
 
 
 class NICViewer(QWidget):
+    # Running statistics of the current ping session, emitted after every result
+    ping_stats_changed = pyqtSignal(object)
+    # Route changes applied so far and in total, emitted from the worker applying a route import
+    route_import_progress = pyqtSignal(int, int)
+
     def __init__(self):
         super().__init__()
+        # All netsh/route work goes through the executor so the event loop never blocks
+        self.executor = CommandExecutor(self)
+        self.executor.busy_changed.connect(self.on_busy_changed)
+        self.busy_operations = set()
+        self.ping_stats_changed.connect(self.show_ping_stats)
+        self.route_import_progress.connect(self.show_route_import_progress)
+        # Every read goes through the backend (IP Helper API, netsh or a recorded fixture)
+        self.backend = select_backend()
+        # Ping, MTU and traffic results are also written to disk; None if the database cannot be opened
+        self.history = open_history()
         self.initUI()
 
     def initUI(self):
@@ -289,8 +593,72 @@ class NICViewer(QWidget):
         self.init_ping_tab()
         self.tabs.addTab(self.ping_tab, "Ping")
 
+        # Tab 5: Monitor
+        self.monitor_tab = QWidget()
+        self.init_monitor_tab()
+        self.tabs.addTab(self.monitor_tab, "Monitor")
+
+        # Tab 6: Diagnostics
+        self.diagnostics_tab = QWidget()
+        self.init_diagnostics_tab()
+        self.tabs.addTab(self.diagnostics_tab, "Diagnostics")
+
+        # Tab 7: Traffic
+        self.traffic_tab = QWidget()
+        self.init_traffic_tab()
+        self.tabs.addTab(self.traffic_tab, "Traffic")
+
+        # Tab 8: History
+        self.history_tab = QWidget()
+        self.init_history_tab()
+        self.tabs.addTab(self.history_tab, "History")
+        self.tabs.currentChanged.connect(self.on_tab_changed)
+
+        # Shows which background operations are still running
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+
         self.setLayout(layout)
 
+        # Widgets that are disabled while an operation of that name is in flight
+        self.busy_widgets = {
+            "nic_list": [self.refresh_button],
+            "apply_network": [self.submit_button],
+            "apply_mtu": [self.mtu_button],
+            "routing_table": [self.route_refresh_button],
+            "route_change": [self.add_button, self.delete_button, self.update_route_button],
+            "route_lookup": [self.route_lookup_button],
+            "route_import": [self.import_routes_button, self.add_button, self.delete_button,
+                             self.update_route_button],
+            "history": [self.history_refresh_button],
+        }
+
+        # Fill the lists once every tab exists
+        self.populate_nic_list()
+        self.populate_routing_table()
+        self.populate_mtu_nic_list()
+        self.set_route_watching(self.route_live_check.isChecked())
+
+    def on_busy_changed(self, operation, busy):
+        """Disable the widgets tied to an operation while it runs and list running operations."""
+        if busy:
+            self.busy_operations.add(operation)
+        else:
+            self.busy_operations.discard(operation)
+
+        for widget in self.busy_widgets.get(operation, []):
+            widget.setEnabled(not busy)
+
+        if self.busy_operations:
+            running = ", ".join(OPERATION_LABELS.get(op, op) for op in sorted(self.busy_operations))
+            self.status_label.setText(f"Working: {running}...")
+        else:
+            self.status_label.setText("")
+
+    def show_error(self, message):
+        """Show an error from a background operation."""
+        QMessageBox.critical(self, "Error", message)
+
     def init_nic_tab(self):
         """Initialize the NIC tab components."""
         nic_layout = QVBoxLayout()
@@ -359,23 +727,25 @@ class NICViewer(QWidget):
 
         self.nic_tab.setLayout(nic_layout)
 
-        # Populate NIC names
-        self.populate_nic_list()  # Moved into a separate function for refresh functionality
-
         self.current_nic = None
+        self.current_nic_details = {}
 
     def populate_nic_list(self):
         """Populate NIC names in the list."""
-        print("[DEBUG] Retrieving NIC names")  # DEBUG
+        log.debug("Retrieving NIC names")
+        self.executor.submit("nic_list", self.backend.get_nic_names, on_result=self.on_nic_names, on_error=self.show_error)
+
+    def on_nic_names(self, nic_names):
+        """Fill the NIC list once the names come back."""
         self.nic_list.clear()  # Clear the NIC list before repopulating
-        nic_names = get_nic_names()
         for nic in nic_names:
-            print(f"[DEBUG] Adding NIC to list: {nic}")  # DEBUG
+            log.debug("Adding NIC to list: %s", nic)
             self.nic_list.addItem(nic)
 
     def refresh_nic_info(self):
         """Refresh the NIC info by clearing and repopulating the NIC list and details."""
-        print("[DEBUG] Refreshing NIC info")  # DEBUG
+        log.debug("Refreshing NIC info")
+        self.backend.invalidate()  # An explicit refresh always re-reads
         self.nic_details.clear()  # Clear the NIC details display
         self.populate_nic_list()  # Repopulate NIC list
 
@@ -386,15 +756,22 @@ class NICViewer(QWidget):
         label = QLabel('Windows Routing Table:')
         routing_layout.addWidget(label)
 
-        # Create a table widget to display the routing table
-        self.routing_table_widget = QTableWidget()
-        self.routing_table_widget.setColumnCount(6)  # One extra column for the delete button
-        self.routing_table_widget.setHorizontalHeaderLabels(
-            ['Network Destination', 'Netmask', 'Gateway', 'Interface', 'Metric', 'Delete'])
-        routing_layout.addWidget(self.routing_table_widget)
+        # The view draws from a model that is diffed on refresh instead of rebuilt
+        self.route_model = RouteTableModel(self)
+        self.routing_table_view = QTableView()
+        self.routing_table_view.setModel(self.route_model)
+        self.routing_table_view.setSelectionBehavior(QTableView.SelectRows)
+        self.routing_table_view.setSelectionMode(QTableView.SingleSelection)
+        self.routing_table_view.verticalHeader().setVisible(False)
+        routing_layout.addWidget(self.routing_table_view)
+
+        # One delegate paints the Delete button in every row
+        self.route_delete_delegate = RouteDeleteDelegate(self.routing_table_view)
+        self.route_delete_delegate.delete_requested.connect(self.delete_route_by_row)
+        self.routing_table_view.setItemDelegateForColumn(ROUTE_DELETE_COLUMN, self.route_delete_delegate)
 
         # Enable table cells for editing
-        self.routing_table_widget.setEditTriggers(QTableWidget.DoubleClicked)
+        self.routing_table_view.setEditTriggers(QTableView.DoubleClicked)
 
         # Create entry boxes for adding/deleting routes
         self.destination_input = QLineEdit(self)
@@ -430,152 +807,280 @@ class NICViewer(QWidget):
         button_layout.addWidget(self.update_route_button)
         routing_layout.addLayout(button_layout)
 
-        self.routing_tab.setLayout(routing_layout)
+        # Bulk import and export of routes as CSV or JSON
+        self.import_routes_button = QPushButton("Import Routes...", self)
+        self.export_routes_button = QPushButton("Export Routes...", self)
+        self.import_routes_button.clicked.connect(self.import_routes_from_file)
+        self.export_routes_button.clicked.connect(self.export_routes_to_file)
+        self.route_import_progress_bar = QProgressBar(self)
+        self.route_import_progress_bar.setVisible(False)
+        file_layout = QHBoxLayout()
+        file_layout.addWidget(self.import_routes_button)
+        file_layout.addWidget(self.export_routes_button)
+        file_layout.addWidget(self.route_import_progress_bar, 1)
+        routing_layout.addLayout(file_layout)
+
+        # Analysis of shadowed, duplicate, redundant and overlapping routes, shown as row colors
+        self.analyze_routes_button = QPushButton("Analyze", self)
+        self.analyze_routes_button.setCheckable(True)
+        self.analyze_routes_button.toggled.connect(self.set_route_analysis)
+        self.route_analysis_label = QLabel("", self)
+        analysis_layout = QHBoxLayout()
+        analysis_layout.addWidget(self.analyze_routes_button)
+        analysis_layout.addWidget(self.route_analysis_label, 1)
+        routing_layout.addLayout(analysis_layout)
+
+        # Refresh on route change events instead of waiting for the Refresh button
+        self.route_watcher = RouteWatcher(select_route_source(self.backend.get_routing_table), self)
+        self.route_watcher.routes_changed.connect(self.on_routes_changed)
+        self.route_live_check = QCheckBox("Live updates", self)
+        self.route_live_check.setChecked(True)
+        self.route_live_check.toggled.connect(self.set_route_watching)
+        routing_layout.addWidget(self.route_live_check)
+
+        # Longest-prefix-match lookup of addresses and CIDR blocks against the table
+        self.route_index = None  # Built on the first lookup after the table changes
+        self.route_table_version = 0
+        self.route_lookup_input = QLineEdit(self)
+        self.route_lookup_input.setPlaceholderText("Addresses or CIDR blocks, separated by commas or spaces")
+        self.route_lookup_button = QPushButton("Find Route", self)
+        self.route_lookup_button.clicked.connect(self.find_routes)
+        self.route_lookup_input.returnPressed.connect(self.find_routes)
+        lookup_layout = QHBoxLayout()
+        lookup_layout.addWidget(QLabel("Lookup:"))
+        lookup_layout.addWidget(self.route_lookup_input, 1)
+        lookup_layout.addWidget(self.route_lookup_button)
+        routing_layout.addLayout(lookup_layout)
+        self.route_lookup_result = QLabel("", self)
+        self.route_lookup_result.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        self.route_lookup_result.setWordWrap(True)
+        routing_layout.addWidget(self.route_lookup_result)
 
-        # Populate the routing table when the tab is displayed
-        self.populate_routing_table()
+        self.routing_tab.setLayout(routing_layout)
 
     def update_route_from_table(self):
         """Update a route from the table based on user-edited data."""
         try:
             # Get the currently selected row in the table
-            current_row = self.routing_table_widget.currentRow()
+            current_row = self.routing_table_view.currentIndex().row()
             if current_row == -1:
                 raise ValueError("No route selected for updating.")
 
-            # Extract the current (before update) route details from the table
-            current_destination = self.routing_table_widget.item(current_row, 0).text()
-            current_netmask = self.routing_table_widget.item(current_row, 1).text()
-            current_gateway = self.routing_table_widget.item(current_row, 2).text()
-            current_metric = self.routing_table_widget.item(current_row, 4).text()
-
-            # Delete the route using the current details (before any update)
-            delete_command = f'route delete {current_destination} mask {current_netmask} {current_gateway}'
-            print(f"[DEBUG] Running command: {delete_command}")
-            result = subprocess.run(delete_command, capture_output=True, text=True, shell=True)
-
-            if result.returncode != 0:
-                raise Exception(f"Failed to delete route: {result.stderr}")
-
-            # Now, add the new route with updated values (user-modified)
-            new_destination = self.routing_table_widget.item(current_row, 0).text()
-            new_netmask = self.routing_table_widget.item(current_row, 1).text()
-            new_gateway = self.routing_table_widget.item(current_row, 2).text()
-            new_metric = self.routing_table_widget.item(current_row, 4).text()
+            # The route as the system has it, and the same route with the user's cell edits
+            current = self.route_model.route(current_row)
+            new = list(self.route_model.edited_route(current_row))
+            if new == current:
+                raise ValueError("The selected route has not been edited.")
 
-            # Add the updated route
-            add_command = f'route add {new_destination} mask {new_netmask} {new_gateway} metric {new_metric}'
-            print(f"[DEBUG] Running command: {add_command}")
-            result = subprocess.run(add_command, capture_output=True, text=True, shell=True)
-
-            if result.returncode != 0:
-                raise Exception(f"Failed to add new route: {result.stderr}")
-
-            print("[DEBUG] Route successfully updated")
-            QMessageBox.information(self, "Success", "Route successfully updated.")
-
-            # Refresh the routing table after updating the route
-            self.populate_routing_table()
+            self.executor.submit(
+                "route_change", route_modify, self.backend, current, new,
+                on_result=lambda result: self.on_route_changed(
+                    f"Route successfully updated ({result['method']}), converged in "
+                    f"{result['elapsed'] * 1000:.0f} ms."),
+                on_error=lambda message: self.show_error(f"Failed to update route: {message}"))
 
         except Exception as e:
-            print(f"[ERROR] Failed to update route: {e}")
+            log.error("Failed to update route: %s", e)
             QMessageBox.critical(self, "Error", f"Failed to update route: {str(e)}")
 
-    def get_interface_id_from_ip(self, ip_address):
-        """Retrieve the interface ID based on the provided IP address."""
+    def set_route_watching(self, enabled):
+        """Start or stop refreshing the routing table on route change events."""
         try:
-            print(f"[DEBUG] Retrieving interface ID for IP: {ip_address}")
-            output = subprocess.run(["route", "print"], capture_output=True, text=True).stdout
-            lines = output.splitlines()
-
-            # Look for the interface list
-            for i, line in enumerate(lines):
-                if "Interface List" in line:
-                    interface_list_start = i + 2  # Start after the header
-                    break
-
-            # Search for the IP address in the interface list and extract the interface ID
-            for line in lines[interface_list_start:]:
-                if ip_address in line:
-                    # Extract the interface ID (it's the first field in the line)
-                    parts = line.split()
-                    if len(parts) > 0:
-                        interface_id = parts[0]
-                        print(f"[DEBUG] Found interface ID: {interface_id} for IP: {ip_address}")
-                        return interface_id
-
-            print(f"[DEBUG] No interface ID found for IP: {ip_address}")
-            return None
-
+            if enabled:
+                self.route_watcher.start()
+            else:
+                self.route_watcher.stop()
         except Exception as e:
-            print(f"[ERROR] Failed to retrieve interface ID: {e}")
-            return None
+            log.error("Failed to watch the routing table: %s", e)
+            self.route_live_check.setChecked(False)
+
+    def on_routes_changed(self, count):
+        """Refresh the routing table after a burst of route change events."""
+        log.debug("%s route change event(s), refreshing the routing table", count)
+        self.populate_routing_table()
+
+    def on_route_changed(self, message):
+        """Report a successful route change and refresh the routing table."""
+        QMessageBox.information(self, "Success", message)
+        self.populate_routing_table()
 
     def populate_routing_table(self):
         """Populate the routing table in the routing tab."""
+        self.executor.submit(
+            "routing_table", self.backend.get_routing_table, on_result=self.on_routing_table,
+            on_error=lambda message: self.show_error(f"Failed to populate routing table: {message}"))
+
+    def on_routing_table(self, ipv4_table):
+        """Bring the routing table model in line with the routes the backend returned."""
+        first_load = self.route_model.rowCount() == 0
+        counts = self.route_model.update(ipv4_table or [])
+        if any(counts.values()):
+            self.route_index = None
+            self.route_table_version += 1
+            if self.analyze_routes_button.isChecked():
+                self.analyze_route_table()  # Keep the highlights in step with the table
+        log.debug("Routing table: %s added, %s removed, %s metrics changed",
+                  counts['added'], counts['removed'], counts['changed'])
+
+        # Size the columns from the first screenful of rows, once, rather than measuring every row
+        if first_load and self.route_model.rowCount():
+            self.routing_table_view.horizontalHeader().setResizeContentsPrecision(50)
+            self.routing_table_view.resizeColumnsToContents()
+
+    def export_routes_to_file(self):
+        """Save the routing table as it is shown to a CSV or JSON file."""
+        path, _ = QFileDialog.getSaveFileName(self, "Export Routes", "routes.csv", ROUTE_FILE_FILTER)
+        if not path:
+            return
         try:
-            ipv4_table = get_routing_table()
-
-            if ipv4_table:
-                self.routing_table_widget.setRowCount(len(ipv4_table))  # Set row count based on valid rows
-                row_index = 0
-                for line in ipv4_table:
-                    # Split the line, handling multiple spaces as field delimiters
-                    parts = line.split()
-
-                    # Ensure we have at least 5 fields for each line, add empty placeholders if necessary
-                    while len(parts) < 5:
-                        parts.append('')
-
-                    # Populate the table with Network Destination, Netmask, Gateway, Interface, Metric
-                    self.routing_table_widget.setItem(row_index, 0, QTableWidgetItem(parts[0]))  # Network Destination
-                    self.routing_table_widget.setItem(row_index, 1, QTableWidgetItem(parts[1]))  # Netmask
-                    self.routing_table_widget.setItem(row_index, 2, QTableWidgetItem(parts[2]))  # Gateway
-                    self.routing_table_widget.setItem(row_index, 3, QTableWidgetItem(parts[3]))  # Interface
-                    self.routing_table_widget.setItem(row_index, 4, QTableWidgetItem(parts[4]))  # Metric
+            export_routes(self.route_model.routes, path)
+            log.debug("Exported %s routes to %s", self.route_model.rowCount(), path)
+        except OSError as e:
+            log.error("Failed to export routes: %s", e)
+            QMessageBox.critical(self, "Error", f"Failed to export routes: {str(e)}")
+
+    def import_routes_from_file(self):
+        """Read a CSV or JSON route file and diff it against the current routing table."""
+        path, _ = QFileDialog.getOpenFileName(self, "Import Routes", "", ROUTE_FILE_FILTER)
+        if not path:
+            return
+        self.executor.submit(
+            "route_import", plan_route_import, self.backend, path, on_result=self.on_route_import_plan,
+            on_error=lambda message: self.show_error(f"Failed to import routes: {message}"))
+
+    def on_route_import_plan(self, plan):
+        """Ask how to apply the differences between the route file and the table, then apply them in one batch."""
+        adds, deletes = plan['adds'], plan['deletes']
+        if not adds and not deletes:
+            self.on_route_import_done(len(plan['unresolved']), plan['unresolved'])
+            return
 
-                    # Create a delete button for each row
-                    delete_button = QPushButton("Delete", self)
-                    delete_button.clicked.connect(lambda _, row=row_index: self.delete_route_by_row(row))
-                    self.routing_table_widget.setCellWidget(row_index, 5,
-                                                            delete_button)  # Add delete button to the last column
+        box = QMessageBox(QMessageBox.Question, "Import Routes",
+                          f"{len(adds)} route(s) to add, {plan['unchanged']} already in the table.", parent=self)
+        add_only = box.addButton("Add Only", QMessageBox.AcceptRole) if adds else None
+        replace = None
+        if deletes:
+            box.setInformativeText(f"The table also has {len(deletes)} route(s) through a gateway that are not "
+                                   f"in the file. Replace deletes them.")
+            box.setDetailedText("\n".join(" ".join(row[:3]) for row in deletes))
+            replace = box.addButton("Replace", QMessageBox.DestructiveRole)
+        box.addButton(QMessageBox.Cancel)
+        box.exec_()
+        if box.clickedButton() is add_only:
+            deletes = []
+        elif box.clickedButton() is not replace:
+            return
 
-                    row_index += 1
+        count = len(adds) + len(deletes) + len(plan['unresolved'])
+        self.route_import_progress_bar.setRange(0, len(adds) + len(deletes))
+        self.route_import_progress_bar.setValue(0)
+        self.route_import_progress_bar.setVisible(True)
+        self.executor.submit(
+            "route_import", apply_route_batch, self.backend, adds, deletes, plan['interfaces'],
+            self.route_import_progress.emit,
+            on_result=lambda failures: self.on_route_import_done(count, plan['unresolved'] + failures),
+            on_error=lambda message: self.on_route_import_done(count, plan['unresolved'] + [("apply", [], message)]))
+
+    def show_route_import_progress(self, done, total):
+        """Advance the import progress bar."""
+        self.route_import_progress_bar.setRange(0, total)
+        self.route_import_progress_bar.setValue(done)
+
+    def on_route_import_done(self, count, failures):
+        """Report a route import with one dialog listing every route that failed."""
+        self.route_import_progress_bar.setVisible(False)
+        self.populate_routing_table()
+        if not failures:
+            QMessageBox.information(self, "Success", f"Applied {count} route change(s)." if count else
+                                    "The routing table already has every route in the file.")
+            return
 
-                # Automatically resize columns to fit the contents
-                self.routing_table_widget.resizeColumnsToContents()
+        box = QMessageBox(QMessageBox.Warning, "Import Routes",
+                          f"{len(failures)} of {count} route change(s) failed.", parent=self)
+        box.setDetailedText("\n".join(f"{action} {' '.join(row[:3])}: {message}"
+                                      for action, row, message in failures))
+        box.exec_()
 
-        except Exception as e:
-            print(f"[ERROR] Failed to populate routing table: {e}")
-            QMessageBox.critical(self, "Error", f"Failed to populate routing table: {str(e)}")
+    def set_route_analysis(self, enabled):
+        """Turn the route analysis highlights on or off."""
+        if enabled:
+            self.analyze_route_table()
+        else:
+            self.executor.cancel("route_analysis")
+            self.route_model.set_issues({})
+            self.route_analysis_label.setText("")
+
+    def analyze_route_table(self):
+        """Analyze the routing table as shown in the background."""
+        rows = [list(route) for route in self.route_model.routes]
+        self.executor.submit(
+            "route_analysis", analyze_route_rows, rows, on_result=self.on_route_analysis,
+            on_error=lambda message: self.show_error(f"Failed to analyze routes: {message}"))
+
+    def on_route_analysis(self, issues):
+        """Highlight the routes with findings and count them per category."""
+        if not self.analyze_routes_button.isChecked():
+            return
+        self.route_model.set_issues(issues)
+        counts = {category: 0 for category in ROUTE_ISSUE_COLORS}
+        for found in issues.values():
+            for category in {category for category, _ in found}:
+                counts[category] += 1
+        self.route_analysis_label.setText(", ".join(f"{count} {category}" for category, count in counts.items())
+                                          + " (hover a colored row for details)")
+
+    def find_routes(self):
+        """Look up which route each address or CIDR block in the lookup box would take."""
+        targets = [t for t in re.split(r"[,\s]+", self.route_lookup_input.text()) if t]
+        if not targets:
+            QMessageBox.warning(self, "No Targets", "Enter an address or CIDR block to look up.")
+            return
+        rows = [list(route) for route in self.route_model.routes] if self.route_index is None else None
+        version = self.route_table_version
+        self.executor.submit(
+            "route_lookup", route_lookup, self.route_index, rows, targets,
+            on_result=lambda result: self.on_route_lookup(version, *result),
+            on_error=lambda message: self.show_error(f"Failed to look up routes: {message}"))
+
+    def on_route_lookup(self, version, index, results):
+        """Show the lookup results and select the route the first target takes."""
+        if version == self.route_table_version:
+            self.route_index = index  # Reuse it until the table changes
+
+        lines = []
+        for target, route, inside in results:
+            if route is None:
+                line = f"{target}: no route"
+            else:
+                line = (f"{target}: {route.destination}/{route.prefix_length} via {route.gateway} "
+                        f"on {route.interface}, metric {route.metric}")
+            if inside:
+                line += f" ({len(inside)} more specific route(s) inside)"
+            lines.append(line)
+        self.route_lookup_result.setText("\n".join(lines))
+
+        route = results[0][1]
+        row = self.route_model.rows.get(route[:4]) if route is not None else None
+        if row is not None:
+            self.routing_table_view.selectRow(row)
+            self.routing_table_view.scrollTo(self.route_model.index(row, 0))
 
     def delete_route_by_row(self, row):
         """Delete the route in the specified row."""
         try:
             # Get the details from the specified row
-            destination = self.routing_table_widget.item(row, 0).text()
-            netmask = self.routing_table_widget.item(row, 1).text()
-            gateway = self.routing_table_widget.item(row, 2).text()
+            destination, netmask, gateway = self.route_model.route(row)[:3]
 
             if not destination or not netmask or not gateway:
                 raise ValueError("Network Destination, Netmask, and Gateway are required to delete a route.")
 
-            # Delete the route using the details from the row
-            delete_command = f'route delete {destination} mask {netmask} {gateway}'
-            print(f"[DEBUG] Running command: {delete_command}")
-            result = subprocess.run(delete_command, capture_output=True, text=True, shell=True)
-
-            if result.returncode != 0:
-                raise Exception(f"Failed to delete route: {result.stderr}")
-
-            print("[DEBUG] Route successfully deleted")
-            QMessageBox.information(self, "Success", "Route successfully deleted.")
-
-            # Refresh the routing table after deletion
-            self.populate_routing_table()
+            self.executor.submit(
+                "route_change", route_delete, destination, netmask, gateway,
+                on_result=lambda _: self.on_route_changed("Route successfully deleted."),
+                on_error=lambda message: self.show_error(f"Failed to delete route: {message}"))
 
         except Exception as e:
-            print(f"[ERROR] Failed to delete route: {e}")
+            log.error("Failed to delete route: %s", e)
             QMessageBox.critical(self, "Error", f"Failed to delete route: {str(e)}")
 
     def add_route(self):
@@ -589,21 +1094,13 @@ class NICViewer(QWidget):
             if not destination or not netmask or not routegateway:
                 raise ValueError("Network Destination, Netmask, and Gateway are required.")
 
-            command = f'route add {destination} mask {netmask} {routegateway} metric {metric}'
-            print(f"[DEBUG] Running command: {command}")  # DEBUG
-            result = subprocess.run(command, capture_output=True, text=True, shell=True)
-
-            if result.returncode != 0:
-                raise Exception(result.stderr)
-
-            print("[DEBUG] Route successfully added")
-            QMessageBox.information(self, "Success", "Route successfully added.")
-
-            # Refresh the routing table after adding the route
-            self.populate_routing_table()
+            self.executor.submit(
+                "route_change", route_add, destination, netmask, routegateway, metric,
+                on_result=lambda _: self.on_route_changed("Route successfully added."),
+                on_error=lambda message: self.show_error(f"Failed to add route: {message}"))
 
         except Exception as e:
-            print(f"[ERROR] Failed to add route: {e}")
+            log.error("Failed to add route: %s", e)
             QMessageBox.critical(self, "Error", f"Failed to add route: {str(e)}")
 
     def delete_route(self):
@@ -616,21 +1113,13 @@ class NICViewer(QWidget):
             if not destination or not netmask:
                 raise ValueError("Network Destination and Netmask are required for deletion.")
 
-            command = f'route delete {destination} mask {netmask} {routegateway}'
-            print(f"[DEBUG] Running command: {command}")  # DEBUG
-            result = subprocess.run(command, capture_output=True, text=True, shell=True)
-
-            if result.returncode != 0:
-                raise Exception(result.stderr)
-
-            print("[DEBUG] Route successfully deleted")
-            QMessageBox.information(self, "Success", "Route successfully deleted.")
-
-            # Refresh the routing table after deleting the route
-            self.populate_routing_table()
+            self.executor.submit(
+                "route_change", route_delete, destination, netmask, routegateway,
+                on_result=lambda _: self.on_route_changed("Route successfully deleted."),
+                on_error=lambda message: self.show_error(f"Failed to delete route: {message}"))
 
         except Exception as e:
-            print(f"[ERROR] Failed to delete route: {e}")
+            log.error("Failed to delete route: %s", e)
             QMessageBox.critical(self, "Error", f"Failed to delete route: {str(e)}")
 
     def init_mtu_tab(self):
@@ -683,37 +1172,45 @@ class NICViewer(QWidget):
         mtu_layout.addWidget(self.mtu_progress_bar)
 
         # Debug output text area for showing ping results
-        self.debug_output = QTextEdit(self)
+        self.debug_output = QPlainTextEdit(self)
         self.debug_output.setReadOnly(True)
+        self.mtu_log = LogSink(self.debug_output, "mtu", parent=self)
         mtu_layout.addWidget(self.debug_output)
 
         self.mtu_tab.setLayout(mtu_layout)
 
-        # Populate NIC names in the MTU tab
-        self.populate_mtu_nic_list()
-
         # Variable to track if the MTU test is running
-        self.mtu_test_running = False
-        self.mtu_thread = None  # To track the thread instance
+        self.mtu_test_running = False  # Cleared to tell the running test to stop
+        self.mtu_timeout = 2000  # Probe timeout of the last test started, in milliseconds
 
     def populate_mtu_nic_list(self):
         """Populate NIC names in the MTU tab."""
-        print("[DEBUG] Populating NIC list for MTU tab")
+        log.debug("Populating NIC list for MTU tab")
+        self.executor.submit("mtu_nic_list", self.backend.get_nic_names, on_result=self.on_mtu_nic_names,
+                             on_error=self.show_error)
+
+    def on_mtu_nic_names(self, nic_names):
+        """Fill the MTU tab NIC list once the names come back."""
         self.mtu_nic_list.clear()  # Clear the list before repopulating
-        nic_names = get_nic_names()
         for nic in nic_names:
-            print(f"[DEBUG] Adding NIC to MTU tab list: {nic}")  # DEBUG
+            log.debug("Adding NIC to MTU tab list: %s", nic)
             self.mtu_nic_list.addItem(nic)
 
     def show_mtu_details(self):
         """Display the NIC IP, Gateway, and MTU details when an interface is clicked in the MTU tab."""
+        selected_nic = self.mtu_nic_list.currentItem().text()  # Get selected NIC
+        log.debug("Fetching details for %s in MTU tab", selected_nic)
+        self.mtu_details.setText(f"Loading details for {selected_nic}...")
+
+        # Clicking another NIC supersedes this request
+        self.executor.submit(
+            "mtu_details", self.backend.get_nic_details, selected_nic,
+            on_result=lambda nic_details: self.on_mtu_details(selected_nic, nic_details),
+            on_error=lambda message: self.show_error(f"Failed to display NIC details in MTU tab: {message}"))
+
+    def on_mtu_details(self, selected_nic, nic_details):
+        """Show the IP, Gateway and MTU of the NIC selected in the MTU tab."""
         try:
-            selected_nic = self.mtu_nic_list.currentItem().text()  # Get selected NIC
-            print(f"[DEBUG] Fetching details for {selected_nic} in MTU tab")  # DEBUG
-
-            # Call get_nic_details to retrieve NIC details
-            nic_details = get_nic_details(selected_nic)
-
             if not nic_details:
                 raise ValueError(f"No details were retrieved for interface: {selected_nic}")
 
@@ -723,147 +1220,118 @@ class NICViewer(QWidget):
             details_text += f"Gateway: {nic_details.get('Default Gateway', 'No gateway')}\n"
             details_text += f"MTU: {nic_details.get('MTU', 'Unknown')}\n"
 
-            print(f"[DEBUG] Displaying NIC details in MTU tab:\n{details_text}")  # DEBUG
+            log.debug("Displaying NIC details in MTU tab:\n%s", details_text)
             self.mtu_details.setText(details_text)
 
         except Exception as e:
-            print(f"[ERROR] Failed to show NIC details in MTU tab: {e}")
+            log.error("Failed to show NIC details in MTU tab: %s", e)
             QMessageBox.critical(self, "Error", f"Failed to display NIC details in MTU tab: {str(e)}")
 
     def start_mtu_test_thread(self):
-        """Start the MTU test in a separate thread."""
-        if not self.mtu_test_running:
-            self.mtu_test_running = True
-            self.mtu_progress_bar.setValue(0)  # Reset progress bar at the start
-            self.debug_output.clear()  # Clear previous debug output
-            self.mtu_thread = threading.Thread(target=self.run_mtu_test)
-            self.mtu_thread.start()
-        else:
+        """Start the MTU test on the executor; it reports back through on_mtu_test_done()."""
+        if self.executor.is_busy("mtu_test"):
             QMessageBox.warning(self, "Warning", "MTU test is already running.")
-
-    import math
-
-    def run_mtu_test(self):
-        """Run MTU test with iterative halving based on max and min MTU values."""
+            return
+        self.mtu_progress_bar.setValue(0)  # Reset progress bar at the start
+        self.mtu_log.clear()  # Clear previous debug output
         try:
-            # Get values from input fields
-            max_mtu_input = self.max_mtu_input.text()
-            min_mtu_input = self.min_mtu_input.text()
-            remote_host = self.remote_host_input.text()
-            timeout_input = self.timeout_input.text()
-
-            # Check if max_mtu_input is empty and set default value if needed
-            if not max_mtu_input.strip():
-                max_mtu = 1500
-            else:
-                max_mtu = int(max_mtu_input)
-
-            # Check if min_mtu_input is empty and set default value if needed
-            if not min_mtu_input.strip():
-                min_mtu = 1100
-            else:
-                min_mtu = int(min_mtu_input)
-
-            # Check if remote_host is empty and set default value if needed
-            if not remote_host.strip():
-                remote_host = "8.8.8.8"
-
-            # Check if timeout_input is empty and set default value if needed
-            if not timeout_input.strip():
-                timeout = 2000  # Default timeout in milliseconds
-            else:
-                timeout = int(timeout_input)
-
-            if max_mtu <= min_mtu:
-                raise ValueError("Maximum MTU should be greater than Minimum MTU.")
+            settings = self.read_mtu_settings()
+        except ValueError as e:
+            self.update_debug_output(f"[ERROR] Failed to run MTU test: {str(e)}")
+            return
+        self.mtu_timeout = settings[3]
+        self.mtu_test_running = True
+        self.executor.submit("mtu_test", self.run_mtu_test, *settings, on_result=self.on_mtu_test_done,
+                             on_error=lambda error: self.on_mtu_test_done(False))
+
+    def read_mtu_settings(self):
+        """Return (min_mtu, max_mtu, remote_host, timeout) from the input fields, filling in the defaults."""
+        # Get values from input fields
+        max_mtu_input = self.max_mtu_input.text()
+        min_mtu_input = self.min_mtu_input.text()
+        remote_host = self.remote_host_input.text()
+        timeout_input = self.timeout_input.text()
+
+        # Check if max_mtu_input is empty and set default value if needed
+        if not max_mtu_input.strip():
+            max_mtu = 1500
+        else:
+            max_mtu = int(max_mtu_input)
 
-            # Calculate total steps for binary search
-            total_steps = math.ceil(math.log2(max_mtu - min_mtu))
-            current_step = 0
+        # Check if min_mtu_input is empty and set default value if needed
+        if not min_mtu_input.strip():
+            min_mtu = 1100
+        else:
+            min_mtu = int(min_mtu_input)
 
-            # Step 1: Test the max MTU
-            self.update_debug_output(f"[DEBUG] Starting with max MTU: {max_mtu}")
-            self.test_ping_mtu(max_mtu, remote_host, timeout)
-            ping_result = send_ping_with_mtu(max_mtu, remote_host, timeout)
+        # Check if remote_host is empty and set default value if needed
+        if not remote_host.strip():
+            remote_host = "8.8.8.8"
 
-            if ping_result == "success":
-                self.update_debug_output(f"[DEBUG] Ping successful with max MTU: {max_mtu}")
-                self.update_progress_bar(100)
-                QApplication.processEvents()
-                return
-            elif ping_result == "fragmentation":
-                self.update_debug_output(f"[DEBUG] Max MTU {max_mtu} is too large, needs to fragment.")
-            elif ping_result == "timeout":
-                self.update_debug_output(f"[DEBUG] Ping failed: Request timed out with max MTU {max_mtu}.")
-            else:
-                self.update_debug_output(f"[ERROR] Ping test failed for max MTU {max_mtu}.")
-                return
+        # Check if timeout_input is empty and set default value if needed
+        if not timeout_input.strip():
+            timeout = 2000  # Default timeout in milliseconds
+        else:
+            timeout = int(timeout_input)
 
-            # Step 2: Test the min MTU
-            self.update_debug_output(f"[DEBUG] Testing min MTU: {min_mtu}")
-            self.test_ping_mtu(min_mtu, remote_host, timeout)
-            ping_result = send_ping_with_mtu(min_mtu, remote_host, timeout)
+        if max_mtu <= min_mtu:
+            raise ValueError("Maximum MTU should be greater than Minimum MTU.")
+        return min_mtu, max_mtu, remote_host, timeout
 
-            if ping_result != "success":
-                self.update_debug_output(f"[DEBUG] Min MTU {min_mtu} is too large. Exiting.")
-                self.update_progress_bar(100)
-                QApplication.processEvents()
-                return
-            else:
-                self.update_debug_output(f"[DEBUG] Min MTU {min_mtu} succeeded. Continuing with binary search.")
-                QApplication.processEvents()
+    def run_mtu_test(self, min_mtu, max_mtu, remote_host, timeout):
+        """Run the MTU search between the max and min MTU values, several probes at a time.
 
-            # Step 3: Binary search between max and min MTU
-            while max_mtu - min_mtu > 1 and self.mtu_test_running:
-                x = (max_mtu - min_mtu) // 2
-                current_mtu = min_mtu + x
-                self.update_debug_output(f"[DEBUG] Testing MTU: {current_mtu}")
-                self.test_ping_mtu(current_mtu, remote_host, timeout)
-                ping_result = send_ping_with_mtu(current_mtu, remote_host, timeout)
+        Runs on the executor. Returns True if stop_mtu_test() ended the search early.
+        """
+        try:
+            self.update_debug_output(f"[DEBUG] Searching {min_mtu}-{max_mtu} with {MTU_PROBE_FANOUT} probes per round")
 
+            def on_probe(size, ping_result):
                 if ping_result == "success":
-                    self.update_debug_output(f"[DEBUG] Ping successful with MTU {current_mtu}. Increasing MTU.")
-                    min_mtu = current_mtu  # Increase min_mtu to current_mtu
+                    self.update_debug_output(f"[DEBUG] Ping successful with MTU {size}.")
                 elif ping_result == "fragmentation":
-                    self.update_debug_output(f"[DEBUG] MTU {current_mtu} needs to fragment. Decreasing MTU.")
-                    max_mtu = current_mtu  # Decrease max_mtu to current_mtu
+                    self.update_debug_output(f"[DEBUG] MTU {size} needs to fragment.")
                 elif ping_result == "timeout":
-                    self.update_debug_output(f"[DEBUG] Ping failed with MTU {current_mtu}: Request timed out.")
-                    max_mtu = current_mtu  # Decrease max_mtu
+                    self.update_debug_output(f"[DEBUG] Ping failed with MTU {size}: Request timed out.")
                 else:
-                    self.update_debug_output(f"[ERROR] Ping test failed for MTU {current_mtu}.")
+                    self.update_debug_output(f"[ERROR] Ping test failed for MTU {size}.")
 
-                # Increment step count and update progress bar
-                current_step += 1
-                progress_value = (current_step / total_steps) * 100
-                self.update_progress_bar(progress_value)
-                QApplication.processEvents()  # Ensure UI updates are processed
+            result = discover_path_mtu(
+                min_mtu, max_mtu, lambda size: send_ping_with_mtu(size, remote_host, timeout),
+                should_stop=lambda: not self.mtu_test_running, on_probe=on_probe,
+                on_progress=self.update_progress_bar)
 
             # Final result
-            if self.mtu_test_running:
-                self.update_debug_output(f"[DEBUG] Optimal MTU found: {min_mtu}")
-                self.update_progress_bar(100)
-                QApplication.processEvents()
+            summary = f"{result['probes']} probes in {result['rounds']} rounds, {result['elapsed']:.1f}s"
+            if result['stopped']:
+                return True
+            if self.history is not None:
+                self.history.add_mtu_run(remote_host, min_mtu, max_mtu, result)
+            if result['mtu'] is None:
+                self.update_debug_output(f"[DEBUG] Min MTU {min_mtu} is too large. Exiting. ({summary})")
+            elif result['mtu'] == max_mtu:
+                self.update_debug_output(f"[DEBUG] Ping successful with max MTU: {max_mtu} ({summary})")
+            else:
+                self.update_debug_output(f"[DEBUG] Optimal MTU found: {result['mtu']} ({summary})")
+            self.update_progress_bar(100)
 
         except Exception as e:
             self.update_debug_output(f"[ERROR] Failed to run MTU test: {str(e)}")
-        finally:
-            self.mtu_test_running = False
+        return False
 
     def stop_mtu_test(self):
-        """Stop the MTU test by setting the flag to False."""
-        if self.mtu_test_running:
+        """Ask the running MTU test to stop; on_mtu_test_done() reports it once the current round ends."""
+        if self.executor.is_busy("mtu_test") and self.mtu_test_running:
             self.mtu_test_running = False
-            if self.mtu_thread:
-                self.mtu_thread.join()  # Wait for the thread to finish
-            QMessageBox.information(self, "Stopped", "MTU test stopped.")
+            self.update_debug_output("[DEBUG] Stopping MTU test after the current round...")
         else:
             QMessageBox.warning(self, "Warning", "No MTU test is running.")
 
-    def test_ping_mtu(self, mtu, remote_host, timeout):
-        """Test ping with a specific MTU size and update the GUI immediately."""
-        self.update_debug_output(f"[DEBUG] Running command: ping -f -l {mtu} {remote_host} -w {timeout}")
-        QApplication.processEvents()  # Ensure the command is shown immediately
+    def on_mtu_test_done(self, stopped):
+        """Called on the GUI thread when run_mtu_test() returns."""
+        self.mtu_test_running = False
+        if stopped:
+            QMessageBox.information(self, "Stopped", "MTU test stopped.")
 
     def update_progress_bar(self, value):
         """Update the progress bar with the current value."""
@@ -871,8 +1339,7 @@ class NICViewer(QWidget):
 
     def update_debug_output(self, message):
         """Update the debug output text area with the latest message."""
-        QMetaObject.invokeMethod(self.debug_output, "append", Qt.QueuedConnection, Q_ARG(str, message))
-        QApplication.processEvents()  # Ensure the debug output updates immediately
+        self.mtu_log.append(message)
 
     def show_message_box(self, title, message):
         """Helper function to show message box (called from the thread)."""
@@ -913,20 +1380,32 @@ class NICViewer(QWidget):
         try:
             selected_nic = self.nic_list.currentItem().text()  # Retrieve the selected NIC directly from the list
             self.current_nic = selected_nic  # Ensure the current NIC is set
-            print(f"[DEBUG] Refreshing details for NIC: {self.current_nic}")  # DEBUG
+            log.debug("Refreshing details for NIC: %s", self.current_nic)
+            self.nic_details.setText(f"Loading details for {selected_nic}...")
+
+            # Clicking another NIC supersedes this request, so only the latest selection is shown
+            self.executor.submit(
+                "nic_details", self.backend.get_nic_details, selected_nic,
+                on_result=self.on_nic_details,
+                on_error=lambda message: self.show_error(f"Failed to display NIC details: {message}"))
 
-            # Call get_nic_details to retrieve NIC details
-            nic_details = get_nic_details(self.current_nic)
+        except Exception as e:
+            log.error("Failed to show NIC details: %s", e)
+            QMessageBox.critical(self, "Error", f"Failed to display NIC details: {str(e)}")
 
+    def on_nic_details(self, nic_details):
+        """Show the details of the selected NIC and fill the input fields."""
+        try:
             if not nic_details:
                 raise ValueError(f"No NIC details were retrieved for interface: {self.current_nic}")
+            self.current_nic_details = nic_details
 
             # Format the details for display
             details_text = f"Details for {self.current_nic}:\n"
             for key, value in nic_details.items():
                 details_text += f"{key}: {value}\n"
 
-            print(f"[DEBUG] Displaying updated NIC details:\n{details_text}")  # DEBUG
+            log.debug("Displaying updated NIC details:\n%s", details_text)
             self.nic_details.setText(details_text)
 
             # Enable input fields and radio buttons based on DHCP or static
@@ -965,14 +1444,16 @@ class NICViewer(QWidget):
             self.mtu_input.setEnabled(True)
 
         except Exception as e:
-            print(f"[ERROR] Failed to show NIC details: {e}")
+            log.error("Failed to show NIC details: %s", e)
             QMessageBox.critical(self, "Error", f"Failed to display NIC details: {str(e)}")
 
     def apply_network_settings(self):
         """Apply new static IP, DHCP, and DNS settings based on user selection."""
         try:
+            changes = NetworkChangeSet(self.backend)
             if self.dhcp_radio.isChecked():
-                set_dhcp(self.current_nic)
+                changes.set_dhcp(self.current_nic)
+                message = "Successfully changed to DHCP and automatic DNS."
             else:
                 new_ip = self.ip_input.text()
                 new_subnet = self.subnet_input.text()
@@ -984,27 +1465,45 @@ class NICViewer(QWidget):
                 if not new_ip or not new_subnet:
                     raise ValueError("IP Address and Subnet Mask cannot be empty.")
 
-                set_static_ip(self.current_nic, new_ip, new_subnet, new_gateway, primary_dns, backup_dns)
+                # If DNS fields are empty, the current DNS servers are left alone
+                dns = [primary_dns, backup_dns] if primary_dns or backup_dns else None
+                changes.set_static(self.current_nic, new_ip, new_subnet, new_gateway, dns)
+                message = "IP address, Subnet Mask, Default Gateway, and DNS successfully changed."
 
-            # After applying changes, refresh the NIC details
-            self.show_nic_details()
+            # An edited MTU goes into the same netsh run
+            mtu_value = self.mtu_input.text().strip()
+            if mtu_value and mtu_value != self.current_nic_details.get('MTU'):
+                changes.set_mtu(self.current_nic, mtu_value)
+
+            self.executor.submit("apply_network", changes.apply,
+                                 on_result=lambda details: self.on_settings_applied(message, details),
+                                 on_error=self.show_error)
 
         except Exception as e:
-            print(f"[ERROR] Failed to apply network settings: {e}")
+            log.error("Failed to apply network settings: %s", e)
             QMessageBox.critical(self, "Error", f"Failed to apply network settings: {str(e)}")
 
+    def on_settings_applied(self, message, details):
+        """Report a successful NIC change and show the details read back after it."""
+        QMessageBox.information(self, "Success", message)
+        if self.current_nic in details:
+            self.on_nic_details(details[self.current_nic])
+        else:
+            self.show_nic_details()
+
     def apply_mtu(self):
         """Apply the MTU settings."""
         try:
             mtu_value = self.mtu_input.text()
             if mtu_value:
-                set_mtu(self.current_nic, mtu_value)
-
-            # After applying changes, refresh the NIC details
-            self.show_nic_details()
+                changes = NetworkChangeSet(self.backend).set_mtu(self.current_nic, mtu_value)
+                self.executor.submit(
+                    "apply_mtu", changes.apply,
+                    on_result=lambda details: self.on_settings_applied(f"MTU successfully set to {mtu_value}.", details),
+                    on_error=self.show_error)
 
         except Exception as e:
-            print(f"[ERROR] Failed to apply MTU: {e}")
+            log.error("Failed to apply MTU: %s", e)
             QMessageBox.critical(self, "Error", f"Failed to apply MTU: {str(e)}")
 
     def init_ping_tab(self):
@@ -1045,10 +1544,17 @@ class NICViewer(QWidget):
         # Add the checkbox layout to the form layout under one label
         ping_form_layout.addRow("Options:", checkbox_layout)
 
-        # Debug output text area for showing ping results
-        self.ping_output = QTextEdit(self)
+        # Debug output text area for showing ping results, with live statistics next to it
+        self.ping_output = QPlainTextEdit(self)
         self.ping_output.setReadOnly(True)
-        ping_layout.addWidget(self.ping_output)
+        self.ping_log = LogSink(self.ping_output, "ping", parent=self)
+        self.ping_stats_label = QLabel(format_ping_stats(PingStats().summary()), self)
+        self.ping_stats_label.setAlignment(Qt.AlignTop | Qt.AlignLeft)
+        self.ping_stats_label.setMinimumWidth(140)
+        ping_output_layout = QHBoxLayout()
+        ping_output_layout.addWidget(self.ping_output, 1)
+        ping_output_layout.addWidget(self.ping_stats_label)
+        ping_layout.addLayout(ping_output_layout)
 
         # Add the form layout to the main ping layout
         ping_layout.addLayout(ping_form_layout)
@@ -1082,69 +1588,588 @@ class NICViewer(QWidget):
         df_flag = self.df_check.isChecked()
         continuous_flag = self.dash_t.isChecked()
 
-        # Build the ping command based on the inputs
-        ping_command = ["ping"]
+        if get_icmp_prober() is not None:
+            target = self.run_ping_probes
+            args = (remote_host, size, timeout, df_flag, None if continuous_flag else repeat_count)
+        else:
+            # Build the ping command based on the inputs
+            ping_command = ["ping"]
 
-        # Add the host
-        ping_command.append(remote_host)
+            # Add the host
+            ping_command.append(remote_host)
 
-        # Add packet size
-        ping_command.extend(["-l", size])
+            # Add packet size
+            ping_command.extend(["-l", size])
 
-        # Add timeout
-        ping_command.extend(["-w", timeout])
+            # Add timeout
+            ping_command.extend(["-w", timeout])
 
-        # Add repeat count (unless continuous mode is selected)
-        if not continuous_flag:
-            ping_command.extend(["-n", repeat_count])
-        else:
-            # If continuous mode is selected
-            ping_command.append("-t")
+            # Add repeat count (unless continuous mode is selected)
+            if not continuous_flag:
+                ping_command.extend(["-n", repeat_count])
+            else:
+                # If continuous mode is selected
+                ping_command.append("-t")
+
+            # Add the DF (Don't Fragment) flag if checked
+            if df_flag:
+                ping_command.append("-f")
+            target = self.run_ping_process
+            args = (ping_command,)
+
+        # Start the ping in a separate thread
+        self.ping_session = PingSession(remote_host)
+        self.show_ping_stats(self.ping_session.stats.summary())
+        self.ping_running = True
+        self.ping_thread = threading.Thread(target=target, args=args)
+        self.ping_thread.start()
 
-        # Add the DF (Don't Fragment) flag if checked
-        if df_flag:
-            ping_command.append("-f")
+    def run_ping_probes(self, remote_host, size, timeout, df_flag, count):
+        """Ping with the in-process ICMP prober, one probe per second, until count is reached or stopped."""
+        try:
+            # The prober belongs to this thread, so it is opened here rather than in start_ping_test
+            prober = get_icmp_prober()
+            size, timeout = int(size), int(timeout)
+            count = None if count is None else int(count)
+            self.ping_log.append(f"[DEBUG] Pinging {remote_host} with {size} bytes of data"
+                                       f"{' (DF set)' if df_flag else ''}:")
+            sent = 0
+            while self.ping_running and (count is None or sent < count):
+                started = time.monotonic()
+                result = prober.probe(remote_host, size, timeout, df=df_flag)
+                sent += 1
+                record = self.ping_session.record(result['status'], result['rtt'], result['ttl'])
+                if self.history is not None:
+                    self.history.add_ping(remote_host, record)
+                self.ping_stats_changed.emit(self.ping_session.stats.summary())
+
+                if result['status'] == "success":
+                    line = f"Reply from {prober.resolve(remote_host)}: bytes={size} time={result['rtt']:.2f}ms TTL={result['ttl']}"
+                elif result['status'] == "fragmentation":
+                    line = "Packet needs to be fragmented but DF set."
+                elif result['status'] == "timeout":
+                    line = "Request timed out."
+                elif result['status'] == "unreachable":
+                    line = "Destination host unreachable."
+                else:
+                    line = "General failure."
+                self.ping_log.append(line)
 
-        # Start the ping process in a separate thread
-        self.ping_thread = threading.Thread(target=self.run_ping_process, args=(ping_command,))
-        self.ping_thread.start()
-        self.ping_running = True
+                # Keep the one second cadence of ping.exe
+                if count is None or sent < count:
+                    time.sleep(max(0.0, 1.0 - (time.monotonic() - started)))
+
+        except Exception as e:
+            self.ping_log.append(f"[ERROR] Ping test failed: {str(e)}")
+
+        finally:
+            self.ping_running = False
 
     def run_ping_process(self, ping_command):
-        """Run the ping command and output the results to the QTextEdit."""
+        """Run the ping command and output the results to the ping log."""
         try:
-            self.ping_output.append(f"[DEBUG] Running command: {' '.join(ping_command)}")
+            self.ping_log.append(f"[DEBUG] Running command: {' '.join(ping_command)}")
             self.ping_process = subprocess.Popen(ping_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
                                                  text=True)
 
             for line in self.ping_process.stdout:
                 if not self.ping_running:
                     break  # Stop the ping if the stop button is pressed
-                self.ping_output.append(line.strip())  # Add output to the QTextEdit (ping_output)
-
-                # Automatically scroll to the bottom
-                self.ping_output.moveCursor(QTextCursor.End)
-                QApplication.processEvents()  # Ensure the GUI updates
+                self.ping_log.append(line.strip())  # Add output to the ping log view
+                record = self.ping_session.parse_line(line)
+                if record is not None:
+                    if self.history is not None:
+                        self.history.add_ping(self.ping_session.host, record)
+                    self.ping_stats_changed.emit(self.ping_session.stats.summary())
 
         except Exception as e:
-            self.ping_output.append(f"[ERROR] Ping test failed: {str(e)}")
-            self.ping_output.moveCursor(QTextCursor.End)  # Scroll to the bottom after error message
+            self.ping_log.append(f"[ERROR] Ping test failed: {str(e)}")
 
         finally:
             self.ping_running = False
             self.ping_process = None
 
+    def show_ping_stats(self, summary):
+        """Show the running statistics of the ping session."""
+        self.ping_stats_label.setText(format_ping_stats(summary))
+
     def stop_ping_test(self):
         """Stops the running ping test."""
-        if hasattr(self, 'ping_process') and self.ping_process is not None:
+        if getattr(self, 'ping_running', False):
             self.ping_running = False
-            self.ping_process.terminate()  # Stop the ping process
-            self.ping_output.append("[DEBUG] Ping test stopped.")
+            if getattr(self, 'ping_process', None) is not None:
+                self.ping_process.terminate()  # Stop the ping process
+            self.ping_log.append("[DEBUG] Ping test stopped.")
         else:
-            self.ping_output.append("[DEBUG] No ping test is currently running.")
+            self.ping_log.append("[DEBUG] No ping test is currently running.")
+
+    def init_monitor_tab(self):
+        """Initialize the Monitor tab components."""
+        monitor_layout = QVBoxLayout()
+
+        label = QLabel('Ping many targets at once:')
+        monitor_layout.addWidget(label)
+
+        self.monitor_targets_input = QLineEdit(self)
+        self.monitor_targets_input.setText("8.8.8.8, 1.1.1.1")  # Set default targets
+        self.monitor_targets_input.setPlaceholderText("Hosts separated by commas or spaces")
+
+        self.monitor_interval_input = QLineEdit(self)
+        self.monitor_interval_input.setText(str(MONITOR_INTERVAL))  # Set default interval
+
+        monitor_form_layout = QFormLayout()
+        monitor_form_layout.addRow("Targets:", self.monitor_targets_input)
+        monitor_form_layout.addRow("Interval (s):", self.monitor_interval_input)
+        monitor_layout.addLayout(monitor_form_layout)
+
+        # One row per target, refreshed from the monitor's snapshot
+        self.monitor_table = QTableWidget(0, len(MONITOR_COLUMNS), self)
+        self.monitor_table.setHorizontalHeaderLabels(MONITOR_COLUMNS)
+        self.monitor_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.monitor_table.verticalHeader().setVisible(False)
+        monitor_layout.addWidget(self.monitor_table)
+
+        button_layout = QHBoxLayout()
+        self.start_monitor_button = QPushButton("Start Monitor", self)
+        self.start_monitor_button.clicked.connect(self.start_monitor)
+        button_layout.addWidget(self.start_monitor_button)
+
+        self.stop_monitor_button = QPushButton("Stop Monitor", self)
+        self.stop_monitor_button.clicked.connect(self.stop_monitor)
+        self.stop_monitor_button.setEnabled(False)
+        button_layout.addWidget(self.stop_monitor_button)
+        monitor_layout.addLayout(button_layout)
+
+        # The grid is redrawn on a timer, not per reply, so hundreds of targets cost one repaint
+        self.monitor = None
+        self.monitor_timer = QTimer(self)
+        self.monitor_timer.setInterval(MONITOR_REFRESH_MS)
+        self.monitor_timer.timeout.connect(self.refresh_monitor_table)
+
+        self.monitor_tab.setLayout(monitor_layout)
+
+    def start_monitor(self):
+        """Start pinging every target in the Monitor tab."""
+        if self.monitor is not None and self.monitor.is_running():
+            QMessageBox.warning(self, "Monitor Running", "The monitor is already running.")
+            return
+
+        targets = [t for t in re.split(r"[,\s]+", self.monitor_targets_input.text()) if t]
+        if not targets:
+            QMessageBox.warning(self, "No Targets", "Enter at least one host to monitor.")
+            return
+        try:
+            interval = float(self.monitor_interval_input.text().strip() or MONITOR_INTERVAL)
+            if interval <= 0:
+                raise ValueError
+        except ValueError:
+            QMessageBox.warning(self, "Invalid Interval", "The interval must be a positive number of seconds.")
+            return
+        if get_icmp_prober() is None:
+            QMessageBox.critical(self, "Error", "In-process ICMP is not available, so the monitor cannot run.")
+            return
+
+        self.monitor = PingMonitor(targets, interval,
+                                   on_record=self.history.add_ping if self.history is not None else None)
+        self.monitor_table.setRowCount(len(self.monitor.targets))
+        for row, target in enumerate(self.monitor.targets):
+            self.monitor_table.setItem(row, 0, QTableWidgetItem(target))
+            for column in range(1, len(MONITOR_COLUMNS)):
+                self.monitor_table.setItem(row, column, QTableWidgetItem(""))
+        self.monitor.start()
+        self.monitor_timer.start()
+        self.start_monitor_button.setEnabled(False)
+        self.stop_monitor_button.setEnabled(True)
+        log.debug("Monitoring %s targets every %ss", len(self.monitor.targets), interval)
+
+    def stop_monitor(self):
+        """Stop the monitor and leave its last results in the grid."""
+        if self.monitor is not None:
+            self.monitor.stop()
+            self.refresh_monitor_table()
+        self.monitor_timer.stop()
+        self.start_monitor_button.setEnabled(True)
+        self.stop_monitor_button.setEnabled(False)
+
+    def refresh_monitor_table(self):
+        """Copy the monitor's latest results into the grid."""
+        if self.monitor is None:
+            return
+
+        def ms(value):
+            return "" if value is None else f"{value:.1f}"
+
+        for row, (target, last, summary) in enumerate(self.monitor.snapshot()):
+            status = last.status if last is not None else ""
+            values = [
+                status,
+                ms(last.rtt) if last is not None else "",
+                ms(summary['avg']),
+                f"{summary['loss']:.0f}%" if summary['sent'] else "",
+                ms(summary['p95']),
+                str(summary['sent']),
+            ]
+            for column, value in enumerate(values, start=1):
+                item = self.monitor_table.item(row, column)
+                if item.text() != value:
+                    item.setText(value)
+            self.monitor_table.item(row, 1).setBackground(QColor(MONITOR_STATUS_COLORS.get(status, "white")))
+
+    def init_diagnostics_tab(self):
+        """Initialize the Diagnostics tab components."""
+        diagnostics_layout = QVBoxLayout()
+
+        label = QLabel('Time spent in external commands and in parsing their output (ms):')
+        diagnostics_layout.addWidget(label)
+
+        self.diagnostics_table = QTableWidget(0, len(DIAGNOSTICS_COLUMNS), self)
+        self.diagnostics_table.setHorizontalHeaderLabels(DIAGNOSTICS_COLUMNS)
+        self.diagnostics_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.diagnostics_table.verticalHeader().setVisible(False)
+        diagnostics_layout.addWidget(self.diagnostics_table)
+
+        button_layout = QHBoxLayout()
+        refresh_button = QPushButton("Refresh", self)
+        refresh_button.clicked.connect(self.refresh_diagnostics)
+        button_layout.addWidget(refresh_button)
+
+        reset_button = QPushButton("Reset", self)
+        reset_button.clicked.connect(self.reset_diagnostics)
+        button_layout.addWidget(reset_button)
+
+        export_button = QPushButton("Export JSON", self)
+        export_button.clicked.connect(self.export_diagnostics)
+        button_layout.addWidget(export_button)
+
+        button_layout.addWidget(QLabel("Log level:"))
+        self.log_level_box = QComboBox(self)
+        self.log_level_box.addItems(LOG_LEVELS)
+        self.log_level_box.setCurrentText(logging.getLevelName(log.getEffectiveLevel()))
+        self.log_level_box.currentTextChanged.connect(log.setLevel)
+        button_layout.addWidget(self.log_level_box)
+        diagnostics_layout.addLayout(button_layout)
+
+        # Only redrawn while the tab is showing
+        self.diagnostics_timer = QTimer(self)
+        self.diagnostics_timer.setInterval(DIAGNOSTICS_REFRESH_MS)
+        self.diagnostics_timer.timeout.connect(self.refresh_diagnostics)
+
+        self.diagnostics_tab.setLayout(diagnostics_layout)
+
+    def on_tab_changed(self, index):
+        """Run the Diagnostics and Traffic redraw timers only while their tab is current."""
+        if self.tabs.widget(index) is self.history_tab:
+            self.populate_history_names()
+
+        if self.tabs.widget(index) is self.diagnostics_tab:
+            self.refresh_diagnostics()
+            self.diagnostics_timer.start()
+        else:
+            self.diagnostics_timer.stop()
+
+        if self.tabs.widget(index) is self.traffic_tab and self.traffic_sampler is not None \
+                and self.traffic_sampler.is_running():
+            self.refresh_traffic()
+            self.traffic_timer.start()
+        else:
+            self.traffic_timer.stop()
+
+    def refresh_diagnostics(self):
+        """Redraw the Diagnostics table from the command statistics."""
+        def ms(value):
+            return f"{value:.1f}" if value is not None else ""
+
+        stats = command_stats.snapshot()
+        self.diagnostics_table.setRowCount(len(stats))
+        for row, (kind, summary) in enumerate(stats.items()):
+            average = summary['avg_output_bytes']
+            values = [
+                kind,
+                str(summary['calls']),
+                str(summary['failures']),
+                ms(summary['spawn_ms']['p50']),
+                ms(summary['runtime_ms']['p50']),
+                ms(summary['runtime_ms']['p95']),
+                ms(summary['runtime_ms']['max']),
+                f"{average / 1024:.1f} KB" if average is not None else "",
+                ms(summary['parse_ms']['p50']),
+                ms(summary['parse_ms']['p95']),
+            ]
+            for column, value in enumerate(values):
+                item = self.diagnostics_table.item(row, column)
+                if item is None:
+                    self.diagnostics_table.setItem(row, column, QTableWidgetItem(value))
+                elif item.text() != value:
+                    item.setText(value)
+
+    def reset_diagnostics(self):
+        """Forget every recorded command timing."""
+        command_stats.reset()
+        self.refresh_diagnostics()
+
+    def export_diagnostics(self):
+        """Save the command statistics to a JSON file."""
+        path, _ = QFileDialog.getSaveFileName(self, "Export Diagnostics", "diagnostics.json", "JSON files (*.json)")
+        if not path:
+            return
+        try:
+            with open(path, "w") as f:
+                json.dump(command_stats.snapshot(), f, indent=2)
+            log.debug("Exported command statistics to %s", path)
+        except OSError as e:
+            log.error("Failed to export diagnostics: %s", e)
+            QMessageBox.critical(self, "Error", f"Failed to export diagnostics: {str(e)}")
+
+    def init_traffic_tab(self):
+        """Initialize the Traffic tab components."""
+        traffic_layout = QVBoxLayout()
+
+        label = QLabel('Live throughput of each interface:')
+        traffic_layout.addWidget(label)
+
+        self.traffic_interval_input = QLineEdit(self)
+        self.traffic_interval_input.setText(str(COUNTER_INTERVAL))  # Set default interval
+
+        self.traffic_nic_box = QComboBox(self)
+        self.traffic_nic_box.currentTextChanged.connect(self.refresh_traffic)
+
+        traffic_form_layout = QFormLayout()
+        traffic_form_layout.addRow("Interval (s):", self.traffic_interval_input)
+        traffic_form_layout.addRow("Interface:", self.traffic_nic_box)
+        traffic_layout.addLayout(traffic_form_layout)
+
+        self.traffic_graph = ThroughputGraph(self)
+        traffic_layout.addWidget(self.traffic_graph, 2)
+
+        self.traffic_table = QTableWidget(0, len(TRAFFIC_COLUMNS), self)
+        self.traffic_table.setHorizontalHeaderLabels(TRAFFIC_COLUMNS)
+        self.traffic_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.traffic_table.verticalHeader().setVisible(False)
+        traffic_layout.addWidget(self.traffic_table, 1)
+
+        button_layout = QHBoxLayout()
+        self.start_traffic_button = QPushButton("Start Sampling", self)
+        self.start_traffic_button.clicked.connect(self.start_traffic)
+        button_layout.addWidget(self.start_traffic_button)
+
+        self.stop_traffic_button = QPushButton("Stop Sampling", self)
+        self.stop_traffic_button.clicked.connect(self.stop_traffic)
+        self.stop_traffic_button.setEnabled(False)
+        button_layout.addWidget(self.stop_traffic_button)
+
+        # What the sampling thread itself costs
+        self.traffic_cost_label = QLabel("")
+        button_layout.addWidget(self.traffic_cost_label)
+        traffic_layout.addLayout(button_layout)
+
+        # Samples are taken on the sampler's thread; the graph only reads them, and only while the tab shows
+        self.traffic_sampler = None
+        self.traffic_timer = QTimer(self)
+        self.traffic_timer.setInterval(TRAFFIC_REFRESH_MS)
+        self.traffic_timer.timeout.connect(self.refresh_traffic)
+
+        # Averages are written to the history once a second while sampling, whichever tab is showing
+        self.traffic_history_timer = QTimer(self)
+        self.traffic_history_timer.setInterval(int(HISTORY_COUNTER_INTERVAL * 1000))
+        self.traffic_history_timer.timeout.connect(self.record_traffic_history)
+
+        self.traffic_tab.setLayout(traffic_layout)
+
+    def start_traffic(self):
+        """Start sampling the counters of every interface."""
+        if self.traffic_sampler is not None and self.traffic_sampler.is_running():
+            return
+        try:
+            interval = float(self.traffic_interval_input.text().strip() or COUNTER_INTERVAL)
+            if interval <= 0:
+                raise ValueError
+        except ValueError:
+            QMessageBox.warning(self, "Invalid Interval", "The interval must be a positive number of seconds.")
+            return
+        source = select_counter_source()
+        if source is None:
+            QMessageBox.critical(self, "Error", "Interface counters are not available on this system.")
+            return
+
+        self.traffic_sampler = CounterSampler(source, interval)
+        self.traffic_sampler.start()
+        if self.tabs.currentWidget() is self.traffic_tab:
+            self.traffic_timer.start()
+        if self.history is not None:
+            self.traffic_history_timer.start()
+        self.start_traffic_button.setEnabled(False)
+        self.stop_traffic_button.setEnabled(True)
+        log.debug("Sampling interface counters every %ss", interval)
+
+    def stop_traffic(self):
+        """Stop sampling and leave the last rates on screen."""
+        if self.traffic_sampler is not None:
+            self.traffic_sampler.stop()
+            self.traffic_sampler.source.close()
+            self.refresh_traffic()
+        self.traffic_timer.stop()
+        self.traffic_history_timer.stop()
+        self.start_traffic_button.setEnabled(True)
+        self.stop_traffic_button.setEnabled(False)
+
+    def refresh_traffic(self):
+        """Redraw the graph of the chosen interface and the table of every interface's newest rates."""
+        sampler = self.traffic_sampler
+        if sampler is None:
+            return
+
+        snapshot = sampler.snapshot()
+        names = sorted(snapshot)
+        if names != [self.traffic_nic_box.itemText(i) for i in range(self.traffic_nic_box.count())]:
+            current = self.traffic_nic_box.currentText()
+            self.traffic_nic_box.blockSignals(True)
+            self.traffic_nic_box.clear()
+            self.traffic_nic_box.addItems(names)
+            if current in names:
+                self.traffic_nic_box.setCurrentText(current)
+            self.traffic_nic_box.blockSignals(False)
+
+        name = self.traffic_nic_box.currentText()
+        self.traffic_graph.set_series(time.monotonic(), sampler.capacity * sampler.interval,
+                                      {field: sampler.series(name, field) for field in TRAFFIC_LINE_COLORS})
+
+        self.traffic_table.setRowCount(len(names))
+        for row, name in enumerate(names):
+            rates = dict(zip(COUNTER_FIELDS, snapshot[name]))
+            values = [
+                name,
+                format_bit_rate(rates['bytes_in']),
+                format_bit_rate(rates['bytes_out']),
+                f"{rates['packets_in']:.0f}",
+                f"{rates['packets_out']:.0f}",
+                f"{rates['errors_in'] + rates['errors_out']:.0f}",
+                f"{rates['discards_in'] + rates['discards_out']:.0f}",
+            ]
+            for column, value in enumerate(values):
+                item = self.traffic_table.item(row, column)
+                if item is None:
+                    self.traffic_table.setItem(row, column, QTableWidgetItem(value))
+                elif item.text() != value:
+                    item.setText(value)
+        self.traffic_cost_label.setText(f"Sampling: {sampler.cpu_percent():.2f}% CPU")
+
+    def record_traffic_history(self):
+        """Queue every interface's average rates over the last HISTORY_COUNTER_INTERVAL for the history."""
+        if self.traffic_sampler is not None and self.history is not None:
+            self.history.add_counters(self.traffic_sampler.averages(HISTORY_COUNTER_INTERVAL))
+
+    def init_history_tab(self):
+        """Initialize the History tab components."""
+        history_layout = QVBoxLayout()
+
+        label = QLabel('Saved ping, MTU and traffic results:')
+        history_layout.addWidget(label)
+
+        self.history_kind_box = QComboBox(self)
+        self.history_kind_box.addItems(HISTORY_COLUMNS)
+        self.history_kind_box.currentTextChanged.connect(self.populate_history_names)
+
+        self.history_name_box = QComboBox(self)
+        self.history_range_box = QComboBox(self)
+        self.history_range_box.addItems(HISTORY_RANGES)
+
+        history_form_layout = QFormLayout()
+        history_form_layout.addRow("Show:", self.history_kind_box)
+        history_form_layout.addRow("Host or interface:", self.history_name_box)
+        history_form_layout.addRow("Range:", self.history_range_box)
+        history_layout.addLayout(history_form_layout)
+
+        self.history_table = QTableWidget(0, 0, self)
+        self.history_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.history_table.verticalHeader().setVisible(False)
+        history_layout.addWidget(self.history_table)
+
+        self.history_refresh_button = QPushButton("Show", self)
+        self.history_refresh_button.clicked.connect(self.query_history)
+        self.history_refresh_button.setEnabled(self.history is not None)
+        history_layout.addWidget(self.history_refresh_button)
+
+        self.history_tab.setLayout(history_layout)
+
+    def populate_history_names(self):
+        """List the hosts or interfaces that have history of the chosen kind."""
+        if self.history is None:
+            return
+        kind = HISTORY_KINDS[self.history_kind_box.currentText()]
+        self.executor.submit("history_names", self.history.names, kind, on_result=self.on_history_names)
+
+    def on_history_names(self, names):
+        current = self.history_name_box.currentText()
+        self.history_name_box.clear()
+        self.history_name_box.addItems(names)
+        if current in names:
+            self.history_name_box.setCurrentText(current)
+
+    def query_history(self):
+        """Read the chosen history off the GUI thread, summarized per bucket of the chosen range."""
+        name = self.history_name_box.currentText()
+        if self.history is None or not name:
+            self.populate_history_names()
+            return
+        kind = self.history_kind_box.currentText()
+        seconds, bucket = HISTORY_RANGES[self.history_range_box.currentText()]
+        end = time.time()
+        if kind == "Ping":
+            query = (self.history.ping_summary, name, end - seconds, end, bucket)
+        elif kind == "MTU runs":
+            query = (self.history.mtu_runs, name, end - seconds, end)
+        else:
+            query = (self.history.counter_summary, name, end - seconds, end, bucket)
+        self.executor.submit("history", *query, on_result=lambda rows: self.on_history_rows(kind, rows))
+
+    def on_history_rows(self, kind, rows):
+        """Fill the History table, newest first."""
+        def ms(value):
+            return "" if value is None else f"{value:.1f}"
+
+        columns = HISTORY_COLUMNS[kind]
+        self.history_table.setColumnCount(len(columns))
+        self.history_table.setHorizontalHeaderLabels(columns)
+        self.history_table.setRowCount(len(rows))
+        for row, values in enumerate(reversed(rows)):
+            when = time.strftime("%Y-%m-%d %H:%M", time.localtime(values[0]))
+            if kind == "Ping":
+                _, sent, received, low, average, high = values
+                cells = [when, str(sent), f"{100.0 * (sent - received) / sent:.0f}%", ms(low), ms(average), ms(high)]
+            elif kind == "MTU runs":
+                _, min_mtu, max_mtu, mtu, probes, rounds, elapsed = values
+                cells = [when, f"{min_mtu}-{max_mtu}", "" if mtu is None else str(mtu), str(probes), str(rounds),
+                         f"{elapsed:.1f}"]
+            else:
+                cells = [when, *map(format_bit_rate, values[2:6]), *(f"{value:.0f}" for value in values[6:])]
+            for column, value in enumerate(cells):
+                self.history_table.setItem(row, column, QTableWidgetItem(value))
+
+    def closeEvent(self, event):
+        """Stop everything that records history, then write out what it queued before the window closes."""
+        self.stop_monitor()
+        self.stop_traffic()
+        self.ping_running = False
+        ping_process = getattr(self, 'ping_process', None)
+        if ping_process is not None:
+            ping_process.terminate()
+        self.mtu_test_running = False
+        # Both stop within one probe timeout once their flags are cleared
+        ping_thread = getattr(self, 'ping_thread', None)
+        if ping_thread is not None:
+            ping_thread.join()
+        if self.executor.is_busy("mtu_test"):
+            self.executor.pool.waitForDone(self.mtu_timeout + 1000)
+        if self.history is not None:
+            self.history.close()
+        super().closeEvent(event)
+
 
 def main():
     """Main entry point for the application."""
+    configure_logging()
+    # Automatically request elevated privileges
+    elevate()
     app = QApplication(sys.argv)
     viewer = NICViewer()
     viewer.show()
@@ -0,0 +1,134 @@
+"""Single-pass parsers for the netsh and 'route print' output NIC Manager reads.
+
+Each parser runs a compiled regular expression over the whole output, or walks its lines once as a small
+state machine, and returns namedtuple records. Nothing here runs a command or touches the GUI.
+"""
+import re
+from collections import namedtuple
+
+# Fields are kept as the text netsh and route print show; callers convert what they need
+
+# 'netsh interface ipv4 show interfaces'
+Interface = namedtuple("Interface", "index metric mtu state name")
+
+# 'netsh interface ipv4 show subinterface'
+SubInterface = namedtuple("SubInterface", "mtu media_sense_state bytes_in bytes_out name")
+
+# One block of 'netsh interface ipv4 show config'; ip_addresses and dns_servers are lists, in netsh's order
+InterfaceConfig = namedtuple("InterfaceConfig",
+                             "name dhcp ip_addresses subnet_mask default_gateway dns_servers interface_metric")
+
+# 'route print': the Interface List, the IPv4 Active Routes and the IPv4 Persistent Routes
+RouteInterface = namedtuple("RouteInterface", "index mac description")
+RouteRow = namedtuple("RouteRow", "destination netmask gateway interface metric")
+PersistentRoute = namedtuple("PersistentRoute", "destination netmask gateway metric")
+RoutePrint = namedtuple("RoutePrint", "interfaces active persistent")
+
+# The name is everything after the fixed columns, up to its last non-blank character
+INTERFACE_LINE = re.compile(r"^ *(\d+) +(\d+) +(\d+) +(\S+) +(\S(?:[^\r\n]*\S)?)", re.M)
+SUBINTERFACE_LINE = re.compile(r"^ *(\d+) +(\d+) +(\d+) +(\d+) +(\S(?:[^\r\n]*\S)?)", re.M)
+
+CONFIG_HEADER = 'Configuration for interface "'
+SUBNET_MASK = re.compile(r"\(mask ([\d.]+)\)")
+
+# 'route print' sections, and the rows inside them
+ROUTE_SECTION = re.compile(r"^(Interface List|IPv4 Route Table|IPv6 Route Table|Active Routes:|Persistent Routes:)",
+                           re.M)
+ROUTE_INTERFACE_LINE = re.compile(r"^ *(\d+)\.\.\.((?:[0-9a-fA-F]{2} )*)\.*(\S(?:[^\r\n]*\S)?)", re.M)
+ROUTE_ACTIVE_LINE = re.compile(r"^ *([\d.]+) +([\d.]+) +(\S+) +([\d.]+) +(\d+)[ \t]*\r?$", re.M)
+ROUTE_PERSISTENT_LINE = re.compile(r"^ *([\d.]+) +([\d.]+) +(\S+) +(\d+)[ \t]*\r?$", re.M)
+
+
+def parse_interfaces(output):
+    """Parse 'netsh interface ipv4 show interfaces' into Interface records."""
+    return list(map(Interface._make, INTERFACE_LINE.findall(output)))
+
+
+def parse_subinterfaces(output):
+    """Parse 'netsh interface ipv4 show subinterface' into SubInterface records."""
+    return list(map(SubInterface._make, SUBINTERFACE_LINE.findall(output)))
+
+
+def parse_config_block(name, lines):
+    """Parse the lines of one interface block of 'netsh interface ipv4 show config' into an InterfaceConfig."""
+    dhcp = None
+    ip_addresses = []
+    subnet_mask = None
+    default_gateway = None
+    dns_servers = None
+    interface_metric = None
+    in_dns = False  # Whether value-only lines are further DNS servers
+
+    for line in lines:
+        key, colon, value = line.partition(":")
+        if not colon:
+            if in_dns and dns_servers is not None and line.strip():
+                dns_servers.append(line.strip())
+            continue
+
+        key = key.strip()
+        value = value.strip()
+        in_dns = False
+        if key == "IP Address":
+            ip_addresses.append(value)
+        elif key == "Subnet Prefix":
+            mask = SUBNET_MASK.search(value)
+            if mask is not None and subnet_mask is None:
+                subnet_mask = mask.group(1)
+        elif key == "Default Gateway":
+            default_gateway = value
+        elif key == "DHCP enabled":
+            dhcp = value
+        elif key == "InterfaceMetric":
+            interface_metric = value
+        elif key == "Statically Configured DNS Servers" or key == "DNS servers configured through DHCP":
+            dns_servers = value.split() if value and value != "None" else []
+            in_dns = True
+
+    return InterfaceConfig(name, dhcp, ip_addresses, subnet_mask, default_gateway, dns_servers, interface_metric)
+
+
+def parse_configs(output):
+    """Parse 'netsh interface ipv4 show config' for every interface into a dict of name -> InterfaceConfig.
+
+    Output for a single interface that lacks the header line (netsh's error text, for one) is returned
+    under the name None.
+    """
+    configs = {}
+    name = None
+    lines = []
+    for line in output.splitlines():
+        if line.startswith(CONFIG_HEADER):
+            # netsh starts with a blank line, which is not a headerless block
+            if name is not None or any(line.strip() for line in lines):
+                configs[name] = parse_config_block(name, lines)
+            name = line[len(CONFIG_HEADER):].rstrip().rstrip('"')
+            lines = []
+        else:
+            lines.append(line)
+
+    if name is not None or any(line.strip() for line in lines):
+        configs[name] = parse_config_block(name, lines)
+    return configs
+
+
+def parse_route_print(output):
+    """Parse 'route print' into a RoutePrint of the Interface List and the IPv4 active and persistent routes.
+
+    The section headings are found in one scan, then each section is matched as a whole.
+    """
+    sections = {}
+    headings = list(ROUTE_SECTION.finditer(output))
+    for index, heading in enumerate(headings):
+        end = headings[index + 1].start() if index + 1 < len(headings) else len(output)
+        name = heading.group(1)
+        if name == "IPv6 Route Table":
+            break
+        sections.setdefault(name, output[heading.end():end])
+
+    interfaces = [RouteInterface(index, mac.strip().replace(" ", "-"), description)
+                  for index, mac, description in ROUTE_INTERFACE_LINE.findall(sections.get("Interface List", ""))]
+    active = list(map(RouteRow._make, ROUTE_ACTIVE_LINE.findall(sections.get("Active Routes:", ""))))
+    persistent = list(map(PersistentRoute._make,
+                          ROUTE_PERSISTENT_LINE.findall(sections.get("Persistent Routes:", ""))))
+    return RoutePrint(interfaces, active, persistent)
@@ -0,0 +1,180 @@
+"""Configuration snapshots: every interface's settings and the routing table, captured, diffed and restored.
+
+A snapshot holds what a backend reads (get_all_nic_details() for every NIC plus get_routing_table()),
+captured in one pass and saved as compact JSON, gzipped when the file name ends in .gz. Route metrics are
+the ones 'route print' shows, route metric + interface metric, and each NIC's 'Interface Metric' detail
+is kept so the route metric can be worked out again. diff_snapshots()
+compares two snapshots structurally. plan_restore() turns the difference into the fewest netsh lines that
+make the current configuration match a snapshot, and restore_snapshot() runs them as one script and
+captures again to check.
+"""
+import gzip
+import json
+import socket
+import time
+from collections import namedtuple
+
+from core import NetworkChangeSet, log, resolve_route_interface, route_interfaces, route_script_line
+
+SNAPSHOT_VERSION = 1
+
+# The NIC details that set_static() and set_dhcp() restore together; the MTU is restored on its own
+ADDRESS_KEYS = ("DHCP", "IP Address", "Subnet Mask", "Default Gateway", "Primary DNS", "Backup DNS")
+
+# taken is a Unix time and elapsed the seconds the capture took; errors maps NICs that could not be read
+ConfigSnapshot = namedtuple("ConfigSnapshot", "host taken nics routes errors elapsed")
+
+
+def capture_snapshot(backend, host=None):
+    """Read every NIC's details and the routing table from the backend, bypassing its cache."""
+    started = time.perf_counter()
+    backend.invalidate()
+    names = backend.get_nic_names()
+    details, errors = backend.get_all_nic_details(names)
+    routes = backend.get_routing_table()
+    elapsed = time.perf_counter() - started
+    log.debug("Captured %s NICs and %s routes in %.0f ms", len(details), len(routes), elapsed * 1000)
+    return ConfigSnapshot(host or socket.gethostname(), time.time(), details, routes, errors, elapsed)
+
+
+def save_snapshot(snapshot, path):
+    """Write a snapshot as compact JSON (gzipped for a .gz path) and return the bytes written."""
+    data = json.dumps({'version': SNAPSHOT_VERSION, **snapshot._asdict()}, separators=(",", ":")).encode()
+    if path.endswith(".gz"):
+        data = gzip.compress(data)
+    with open(path, "wb") as f:
+        f.write(data)
+    return len(data)
+
+
+def load_snapshot(path):
+    """Read a snapshot written by save_snapshot()."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:2] == b"\x1f\x8b":
+        data = gzip.decompress(data)
+    fields = json.loads(data)
+    if fields.pop('version', None) != SNAPSHOT_VERSION:
+        raise ValueError(f"{path} is not a version {SNAPSHOT_VERSION} snapshot")
+    return ConfigSnapshot(**fields)
+
+
+def diff_snapshots(old, new):
+    """Return what changed from `old` to `new`: NICs added, removed and changed (key -> [old, new]), and
+    routes added, removed and changed (same destination, netmask, gateway and interface, other metric)."""
+    changed_nics = {}
+    for name in old.nics.keys() & new.nics.keys():
+        before, after = old.nics[name], new.nics[name]
+        changes = {key: [before.get(key), after.get(key)] for key in sorted(before.keys() | after.keys())
+                   if before.get(key) != after.get(key)}
+        if changes:
+            changed_nics[name] = changes
+
+    old_routes = {tuple(row[:4]): row for row in old.routes}
+    new_routes = {tuple(row[:4]): row for row in new.routes}
+    return {
+        'nics': {'added': sorted(new.nics.keys() - old.nics.keys()),
+                 'removed': sorted(old.nics.keys() - new.nics.keys()),
+                 'changed': dict(sorted(changed_nics.items()))},
+        'routes': {'added': [row for key, row in new_routes.items() if key not in old_routes],
+                   'removed': [row for key, row in old_routes.items() if key not in new_routes],
+                   'changed': [[row, new_routes[key]] for key, row in old_routes.items()
+                               if key in new_routes and row[4] != new_routes[key][4]]},
+    }
+
+
+def diff_count(diff):
+    """Return the number of differences in a diff_snapshots() result."""
+    return sum(len(items) for section in diff.values() for items in section.values())
+
+
+def interface_owned(row, nics):
+    """Return whether a route comes with an interface's address: on-link, or the default route to its gateway."""
+    if row[2] == "On-link":
+        return True
+    return row[0] == "0.0.0.0" and row[1] == "0.0.0.0" and any(
+        details.get('Default Gateway') == row[2] and details.get('IP Address') == row[3] for details in nics.values())
+
+
+def plan_restore(backend, current, target):
+    """Return {'lines', 'change_set', 'skipped'}: the netsh script that turns `current` into `target`.
+
+    Only what differs is touched: NICs whose address settings or MTU differ, and routes that are missing,
+    extra or have another metric. Routes that come with an interface's address are left to the address
+    change. Deletes go first, while the interfaces they name still have their current addresses, then the
+    NIC changes, then the adds and metric changes. Interface metrics are not restored, so the route metric
+    netsh sets is the snapshot's metric less the interface's current metric.
+    """
+    change_set = NetworkChangeSet(backend)
+    skipped = []
+    for name, wanted in target.nics.items():
+        have = current.nics.get(name)
+        if have is None:
+            skipped.append(f"{name}: not present now")
+            continue
+        if wanted.get('DHCP') == "Yes":
+            address_differs = have.get('DHCP') != "Yes"
+        else:
+            address_differs = any(have.get(key) != wanted.get(key) for key in ADDRESS_KEYS)
+        if address_differs:
+            address = {key: value for key, value in wanted.items() if key != 'MTU'}
+            change_set.changes.update(NetworkChangeSet.from_details(backend, {name: address}).changes)
+        if have.get('MTU') != wanted.get('MTU') and str(wanted.get('MTU', '')).isdigit():
+            change_set.set_mtu(name, wanted['MTU'])
+
+    # Deleted routes name interfaces by their current address, added and changed ones by the snapshot's
+    routes = diff_snapshots(current, target)['routes']
+    before = (current.nics, route_interfaces(current.nics))
+    after = (target.nics, route_interfaces(target.nics))
+    interface_metrics = {**after[1][2], **before[1][2]}
+    operations = [("delete", row, before) for row in routes['removed']]
+    operations += [("add", row, after) for row in routes['added']]
+    operations += [("set", new, after) for _, new in routes['changed']]
+
+    route_lines = {"delete": [], "add": [], "set": []}
+    for action, row, (nics, interfaces) in operations:
+        if interface_owned(row, nics):
+            continue
+        try:
+            resolved, name = resolve_route_interface(list(row), interfaces)
+            route_lines[action].append(route_script_line(action, resolved, name, interface_metrics[name]))
+        except ValueError as e:
+            skipped.append(f"{action} route {row[0]}/{row[1]} via {row[2]}: {e}")
+
+    lines = route_lines["delete"] + change_set.script_lines() + route_lines["add"] + route_lines["set"]
+    return {'lines': lines, 'change_set': change_set, 'skipped': skipped}
+
+
+def restore_snapshot(backend, target, dry_run=False):
+    """Make the configuration match a snapshot with one netsh script, then capture again to check.
+
+    Returns the lines run, what was skipped, the netsh error if any, the lines that would still be needed
+    afterwards (none when the restore took) and the seconds spent capturing, planning, applying and checking.
+    """
+    timings = {}
+    started = time.perf_counter()
+    current = capture_snapshot(backend, target.host)
+    timings['capture'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    plan = plan_restore(backend, current, target)
+    timings['plan'] = time.perf_counter() - started
+    result = {'lines': plan['lines'], 'skipped': plan['skipped'], 'error': None, 'remaining': plan['lines'],
+              'timings': timings}
+    if dry_run or not plan['lines']:
+        return result
+
+    started = time.perf_counter()
+    try:
+        backend.run_netsh_script(plan['lines'])
+    except Exception as e:
+        log.error("Restore script failed: %s", e)
+        result['error'] = str(e)
+    timings['apply'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    after = capture_snapshot(backend, target.host)
+    result['remaining'] = plan_restore(backend, after, target)['lines']
+    timings['verify'] = time.perf_counter() - started
+    log.debug("Restore ran %s lines, %s still differ", len(plan['lines']), len(result['remaining']))
+    return result
@@ -0,0 +1,106 @@
+"""Stand-ins shared by the tests."""
+import ipaddress
+import os
+from collections import Counter
+import shlex
+import subprocess
+
+import core
+from core import NetworkBackend
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def use_recorded_outputs(monkeypatch):
+    """Make core's netsh and 'route print' calls answer with the outputs recorded in tests/fixtures.
+
+    Returns a Counter of the commands run, by kind ('route print', 'netsh interface ipv4 show config', ...).
+    """
+    configs = read_fixture("show_config.txt")
+    calls = Counter()
+
+    def run_netsh(kind, args):
+        calls[kind] += 1
+        if args[-1] == "interfaces":
+            return read_fixture("show_interfaces.txt")
+        if args[-1] == "subinterface":
+            return read_fixture("show_subinterface.txt")
+        if args[-1] == "config":
+            return configs
+        header = f'Configuration for interface "{args[-1]}"'
+        if header not in configs:
+            return "The filename, directory name, or volume label syntax is incorrect.\n"
+        return "\n" + header + configs.split(header)[1].split("\n\n")[0] + "\n\n"
+
+    def run_command(kind, command, shell=False):
+        assert command == ["route", "print"], command
+        calls[kind] += 1
+        return subprocess.CompletedProcess(command, 0, read_fixture("route_print.txt"), "")
+
+    monkeypatch.setattr(core, "netsh_host_enabled", lambda: False)
+    monkeypatch.setattr(core, "run_netsh", run_netsh)
+    monkeypatch.setattr(core, "run_command", run_command)
+    core.netsh_snapshot.invalidate()
+    core.route_print_snapshot.invalidate()
+    return calls
+
+
+class RouteTableBackend(NetworkBackend):
+    """Two NICs with different interface metrics and a routing table that netsh route lines change.
+
+    Routes keep their route metric, and get_routing_table() shows route metric + interface metric like
+    'route print' does. Every script run is kept in `scripts`.
+    """
+
+    name = "test"
+
+    def __init__(self):
+        self.details = {
+            "Ethernet": {'DHCP': "No", 'IP Address': "10.0.0.10", 'Subnet Mask': "255.255.255.0",
+                         'Default Gateway': "10.0.0.1", 'Interface Metric': "25", 'MTU': "1500"},
+            "Wi-Fi": {'DHCP': "Yes", 'IP Address': "192.168.1.20", 'Subnet Mask': "255.255.255.0",
+                      'Default Gateway': "192.168.1.1", 'Interface Metric': "50", 'MTU': "1500"},
+        }
+        self.routes = {}  # (destination, netmask, gateway, interface IP) -> route metric
+        for details in self.details.values():
+            network = ipaddress.ip_interface(f"{details['IP Address']}/{details['Subnet Mask']}").network
+            self.routes[(str(network.network_address), details['Subnet Mask'], "On-link", details['IP Address'])] = 256
+            self.routes[(details['IP Address'], "255.255.255.255", "On-link", details['IP Address'])] = 256
+        self.scripts = []
+
+    def interface_metric(self, ip_address):
+        return next(int(details['Interface Metric']) for details in self.details.values()
+                    if details['IP Address'] == ip_address)
+
+    def get_nic_names(self):
+        return list(self.details)
+
+    def get_nic_details(self, interface):
+        return dict(self.details[interface])
+
+    def get_routing_table(self):
+        return [list(key) + [str(metric + self.interface_metric(key[3]))] for key, metric in self.routes.items()]
+
+    def run_netsh_script(self, lines):
+        self.scripts.append(list(lines))
+        for line in lines:
+            words = shlex.split(line)
+            verb, options = words[2], dict(word.split("=", 1) for word in words[4:] if "=" in word)
+            network = ipaddress.ip_network(options['prefix'])
+            key = (str(network.network_address), str(network.netmask), options.get('nexthop', "On-link"),
+                   self.details[options['interface']]['IP Address'])
+            if verb == "add":
+                if key in self.routes:
+                    raise Exception("netsh failed with error: The object already exists.")
+                self.routes[key] = int(options.get('metric', 256))
+            elif key not in self.routes:
+                raise Exception("netsh failed with error: Element not found.")
+            elif verb == "delete":
+                del self.routes[key]
+            else:
+                self.routes[key] = int(options.get('metric', self.routes[key]))
@@ -0,0 +1,68 @@
+import json
+import os
+
+import pytest
+
+import cli
+from core import BACKEND_ENV, FIXTURE_ENV, FixtureBackend, NetshBackend, inventory, record_fixture, \
+    select_backend
+from fakes import FIXTURES, use_recorded_outputs
+
+BACKEND_FIXTURE = os.path.join(FIXTURES, "backend.json")
+
+
+@pytest.fixture
+def backend():
+    return FixtureBackend(BACKEND_FIXTURE)
+
+
+def test_fixture_backend_serves_the_recording(backend):
+    assert backend.get_nic_names() == ["Loopback Pseudo-Interface 1", "Ethernet", "vEthernet (Default Switch)"]
+    assert backend.get_nic_details("Ethernet") == {
+        'IP Address': "192.168.1.23", 'Subnet Mask': "255.255.255.0", 'Default Gateway': "192.168.1.1",
+        'Primary DNS': "192.168.1.1", 'Backup DNS': "8.8.8.8", 'DHCP': "Yes", 'Interface Metric': "25",
+        'MTU': "1500"}
+    routes = backend.get_routing_table()
+    assert len(routes) == 17
+    assert routes[1] == ["10.8.0.0", "255.255.0.0", "192.168.1.254", "192.168.1.23", "35"]
+
+
+def test_fixture_backend_reports_missing_interfaces(backend):
+    with pytest.raises(Exception, match="Interface not found in fixture: Wi-Fi"):
+        backend.get_nic_details("Wi-Fi")
+    details, errors = backend.get_all_nic_details(["Ethernet", "Wi-Fi"])
+    assert list(details) == ["Ethernet"]
+    assert list(errors) == ["Wi-Fi"]
+
+
+def test_fixture_backend_hands_out_copies(backend):
+    backend.get_nic_details("Ethernet")['MTU'] = "9000"
+    backend.get_routing_table()[0][4] = "1"
+    assert backend.get_nic_details("Ethernet")['MTU'] == "1500"
+    assert backend.get_routing_table()[0][4] == "25"
+
+
+def test_netsh_backend_reads_what_the_fixture_recorded(monkeypatch, backend):
+    use_recorded_outputs(monkeypatch)
+    netsh = NetshBackend()
+    try:
+        assert inventory(netsh) == inventory(backend)
+    finally:
+        netsh.invalidate()
+
+
+def test_record_fixture_round_trips(tmp_path, backend):
+    path = str(tmp_path / "recorded.json")
+    record_fixture(backend, path)
+    assert inventory(FixtureBackend(path)) == inventory(backend)
+
+
+def test_environment_selects_the_fixture(monkeypatch, capsys):
+    monkeypatch.setenv(BACKEND_ENV, "fixture")
+    monkeypatch.setenv(FIXTURE_ENV, BACKEND_FIXTURE)
+    assert isinstance(select_backend(), FixtureBackend)
+
+    assert cli.main(["details", "vEthernet (Default Switch)"]) == 0
+    result = json.loads(capsys.readouterr().out)
+    assert result['details']["vEthernet (Default Switch)"]['MTU'] == "1400"
+    assert result['errors'] == {}
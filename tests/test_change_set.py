@@ -0,0 +1,81 @@
+import time
+
+import pytest
+
+from core import NetworkChangeSet
+from fleet import FakeTransport, RemoteBackend
+
+
+@pytest.fixture
+def host():
+    transport = FakeTransport(["host1"], latency=0, connect_latency=0)
+    return transport.hosts["host1"], RemoteBackend("host1", transport.connect("host1"), time.monotonic() + 60)
+
+
+def make_static(backend, mtu):
+    return NetworkChangeSet(backend).set_static("Ethernet 2", "172.16.0.99", "255.255.0.0", "172.16.0.1",
+                                                ["10.255.0.53"]).set_mtu("Ethernet 2", mtu)
+
+
+def test_changes_are_applied_in_one_script_and_read_back(host):
+    fake, backend = host
+    details = make_static(backend, 1400).apply()
+    assert details["Ethernet 2"]['DHCP'] == "No" and details["Ethernet 2"]['IP Address'] == "172.16.0.99"
+    assert details["Ethernet 2"]['MTU'] == "1400"
+    nic = fake.nics["Ethernet 2"]
+    assert (nic['dhcp'], nic['ip'], nic['gateway'], nic['dns'], nic['mtu']) == (
+        False, "172.16.0.99", "172.16.0.1", ["10.255.0.53"], 1400)
+
+
+def test_a_failed_script_is_rolled_back_and_checked(host):
+    fake, backend = host
+    with pytest.raises(Exception, match=r"The parameter is incorrect.*\(previous settings restored\)"):
+        make_static(backend, 100).apply()
+    nic = fake.nics["Ethernet 2"]
+    assert (nic['dhcp'], nic['ip'], nic['mtu']) == (True, "172.16.0.20", 1500)
+
+
+def test_a_change_that_does_not_show_is_rolled_back(host, monkeypatch):
+    fake, backend = host
+    change = fake.change
+
+    def ignore_mtu(verb, noun, args):
+        # A driver that accepts the MTU but keeps its own
+        return (0, "") if noun == "subinterface" else change(verb, noun, args)
+
+    monkeypatch.setattr(fake, "change", ignore_mtu)
+    with pytest.raises(Exception, match=r"Ethernet 2: MTU is 1500, expected 1400 \(previous settings restored\)"):
+        make_static(backend, 1400).apply()
+    assert (fake.nics["Ethernet 2"]['dhcp'], fake.nics["Ethernet 2"]['ip']) == (True, "172.16.0.20")
+
+
+def test_a_rollback_that_does_not_take_is_reported(host):
+    fake, backend = host
+    fake.leases.clear()  # The DHCP server is gone, so switching back does not bring the address back
+    with pytest.raises(Exception, match=r"\(rollback incomplete: Ethernet 2: IP Address is 169\.254\.14\.1, "
+                                        r"expected 172\.16\.0\.20\)"):
+        make_static(backend, 100).apply()
+
+
+def test_a_failed_rollback_is_reported(host, monkeypatch):
+    fake, backend = host
+    scripts = []
+    run_netsh_script = backend.run_netsh_script
+
+    def fail_the_rollback(lines):
+        scripts.append(lines)
+        if len(scripts) > 1:
+            raise Exception("netsh failed on host1: connection lost")
+        run_netsh_script(lines)
+
+    monkeypatch.setattr(backend, "run_netsh_script", fail_the_rollback)
+    with pytest.raises(Exception, match=r"\(rollback also failed: netsh failed on host1: connection lost\)"):
+        make_static(backend, 100).apply()
+    assert scripts[1] == ['interface ipv4 set address name="Ethernet 2" source=dhcp',
+                          'interface ipv4 set dns name="Ethernet 2" source=dhcp',
+                          'interface ipv4 set subinterface "Ethernet 2" mtu=1500 store=persistent']
+    assert fake.nics["Ethernet 2"]['ip'] == "172.16.0.99"
+
+
+def test_nothing_to_change_runs_nothing(host):
+    assert NetworkChangeSet(host[1]).apply() == {}
@@ -0,0 +1,25 @@
+import json
+import os
+import subprocess
+import sys
+
+import cli
+from fleet import FLEET_QUERIES
+
+
+def test_fleet_and_snapshots_load_only_when_used():
+    code = "import sys, cli; cli.build_parser(); print(sorted({'fleet', 'snapshots'} & set(sys.modules)))"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(cli.__file__)).stdout
+    assert output.strip() == "[]"
+
+
+def test_fleet_operations_cover_the_fleet_queries():
+    assert cli.FLEET_OPERATIONS == sorted(FLEET_QUERIES) + ["set-dhcp", "set-mtu"]
+
+
+def test_fleet_command_uses_the_fleet_defaults(capsys):
+    assert cli.main(["fleet", "nics", "host1", "host2", "--transport", "fake"]) == 0
+    result = json.loads(capsys.readouterr().out)
+    assert result['summary']['ok'] == 2
+    assert result['results']['host1'] == ["Ethernet", "Ethernet 2"]
@@ -0,0 +1,90 @@
+import time
+
+import pytest
+
+import core
+from core import NetshBackend, NetshSnapshot, NetworkChangeSet, backend_route_interfaces, export_routes, \
+    plan_route_import
+from fakes import use_recorded_outputs
+from fleet import FakeTransport, RemoteBackend
+
+
+def test_one_refresh_runs_route_print_once(monkeypatch, tmp_path):
+    calls = use_recorded_outputs(monkeypatch)
+    backend = NetshBackend()
+    path = str(tmp_path / "routes.csv")
+    export_routes(backend.get_routing_table(), path)
+
+    # A route import followed by the table refresh it triggers: every read shares the snapshots
+    backend.invalidate()
+    calls.clear()
+    plan = plan_route_import(backend, path)
+    assert plan['adds'] == [] and plan['unchanged'] > 0
+    backend.get_routing_table()
+    backend_route_interfaces(backend)
+    assert calls["route print"] == 1
+    assert calls["netsh interface ipv4 show interfaces"] == calls["netsh interface ipv4 show subinterface"] == 1
+
+    backend.invalidate()
+    backend.get_routing_table()
+    assert calls["route print"] == 2
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self):
+        return self.now
+
+    perf_counter = staticmethod(time.perf_counter)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(core, "time", clock)
+    return clock
+
+
+def test_netsh_queries_run_once_per_ttl(monkeypatch, clock):
+    calls = use_recorded_outputs(monkeypatch)
+    snapshot = NetshSnapshot(ttl=5)
+    configs = snapshot.configs()
+    clock.now += 4.9
+    assert snapshot.configs() is configs
+    snapshot.interfaces()
+    snapshot.mtus()
+    assert calls == {"netsh interface ipv4 show config": 1, "netsh interface ipv4 show interfaces": 1,
+                     "netsh interface ipv4 show subinterface": 1}
+
+    # Each query expires on its own, counted from when it ran
+    clock.now += 0.1
+    assert snapshot.configs() == configs and snapshot.configs() is not configs
+    assert calls["netsh interface ipv4 show config"] == 2
+    snapshot.interfaces()
+    assert calls["netsh interface ipv4 show interfaces"] == 1
+    clock.now += 4.9
+    snapshot.interfaces()
+    assert calls["netsh interface ipv4 show interfaces"] == 2
+
+
+def test_invalidate_makes_the_next_read_run_netsh(monkeypatch, clock):
+    calls = use_recorded_outputs(monkeypatch)
+    snapshot = NetshSnapshot(ttl=60)
+    snapshot.configs()
+    snapshot.mtus()
+    snapshot.invalidate()
+    snapshot.configs()
+    snapshot.mtus()
+    assert calls["netsh interface ipv4 show config"] == calls["netsh interface ipv4 show subinterface"] == 2
+
+
+def test_a_change_set_leaves_the_shared_snapshot_invalidated(monkeypatch):
+    calls = use_recorded_outputs(monkeypatch)
+    core.netsh_snapshot.configs()
+    transport = FakeTransport(["host1"], latency=0, connect_latency=0)
+    backend = RemoteBackend("host1", transport.connect("host1"), time.monotonic() + 60)
+    NetworkChangeSet(backend).set_mtu("Ethernet", 1400).apply()
+    core.netsh_snapshot.configs()
+    assert calls["netsh interface ipv4 show config"] == 2
@@ -0,0 +1,90 @@
+import shutil
+import sys
+import threading
+import time
+
+import pytest
+
+from core import SHELL_DIALECT, CommandHost, CommandHostError, HostDialect
+
+pytestmark = pytest.mark.skipif(shutil.which("sh") is None, reason="needs sh")
+
+# Answers like interactive netsh: a prompt before each reply, and unknown commands echoed back in an error
+NETSH_STAND_IN = r"""
+import sys
+for line in sys.stdin:
+    line = line.strip()
+    if line == "show interfaces":
+        print("netsh>Idx  Met  MTU  State  Name\n  1   75  1500  connected  Loopback", flush=True)
+    else:
+        print(f"netsh>The following command was not found: {line}.", flush=True)
+"""
+
+
+@pytest.fixture
+def host():
+    host = CommandHost(SHELL_DIALECT, timeout=5)
+    yield host
+    host.close()
+
+
+def test_returns_output_and_exit_status(host):
+    assert host.run("echo hi; echo there") == (0, "hi\nthere\n")
+    assert host.run("echo oops >&2; exit_code() { return 3; }; exit_code") == (3, "oops\n")
+    assert host.run("true") == (0, "")
+    assert host.run("printf partial") == (0, "partial")
+
+
+def test_one_process_serves_every_command(host):
+    host.run("GREETING=hello")
+    assert host.run("echo $GREETING") == (0, "hello\n")
+    assert host.starts == 1
+
+
+def test_a_host_that_exits_is_replaced(host):
+    with pytest.raises(CommandHostError, match="exited"):
+        host.run("exit 3")
+    assert host.run("echo back") == (0, "back\n")
+    assert host.starts == 2
+
+
+def test_a_host_that_hangs_is_killed(host):
+    started = time.perf_counter()
+    with pytest.raises(CommandHostError, match="did not answer within 0.3s"):
+        host.run("sleep 10", timeout=0.3)
+    assert time.perf_counter() - started < 2
+    assert host.run("echo back") == (0, "back\n")
+    assert host.starts == 2
+
+
+def test_concurrent_callers_get_their_own_output(host):
+    results = {}
+
+    def call(name):
+        results[name] = [host.run(f"echo {name} {number}") for number in range(25)]
+
+    threads = [threading.Thread(target=call, args=(f"caller{index}",)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == {name: [(0, f"{name} {number}\n") for number in range(25)] for name in results}
+    assert len(results) == 8 and host.starts == 1
+
+
+def test_close_ends_the_host_and_the_next_command_starts_one(host):
+    host.run("true")
+    host.close()
+    assert host.run("echo again") == (0, "again\n")
+    assert host.starts == 2
+
+
+def test_netsh_framing_strips_prompts_and_has_no_status():
+    dialect = HostDialect("netsh stand-in", [sys.executable, "-u", "-c", NETSH_STAND_IN], "{marker}", "netsh>")
+    host = CommandHost(dialect, timeout=5)
+    try:
+        assert host.run("show interfaces") == (None, "Idx  Met  MTU  State  Name\n  1   75  1500  connected  Loopback")
+        assert host.run("bogus") == (None, "The following command was not found: bogus.")
+        assert host.starts == 1
+    finally:
+        host.close()
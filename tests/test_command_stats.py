@@ -0,0 +1,65 @@
+import sys
+import threading
+
+from core import CommandStats, run_command
+
+
+def within_bucket(value, exact):
+    """Histogram percentiles are the upper edge of the exact value's 5% bucket."""
+    return exact * (1 - 1e-9) <= value <= exact * 1.05 * (1 + 1e-9)
+
+
+def test_runs_and_parses_are_aggregated_per_kind():
+    stats = CommandStats()
+    for runtime in range(1, 101):
+        stats.record_run("route print", 2.0, float(runtime), runtime * 10, failed=runtime % 25 == 0)
+    for parse in (0.5, 0.25, 4.0):
+        stats.record_parse("route print", parse)
+    stats.record_run("netsh interface ipv4 show config", 3.0, 40.0, 900, False)
+
+    snapshot = stats.snapshot()
+    assert list(snapshot) == ["netsh interface ipv4 show config", "route print"]
+    route = snapshot["route print"]
+    assert (route['calls'], route['failures']) == (100, 4)
+    assert route['output_bytes'] == sum(range(10, 1001, 10))
+    assert (route['avg_output_bytes'], route['max_output_bytes']) == (505.0, 1000)
+    assert route['spawn_ms'] == {'count': 100, 'p50': 2.0, 'p95': 2.0, 'max': 2.0}
+    runtime = route['runtime_ms']
+    assert (runtime['count'], runtime['max']) == (100, 100.0)
+    assert within_bucket(runtime['p50'], 50) and within_bucket(runtime['p95'], 95)
+    assert route['parse_ms']['count'] == 3 and route['parse_ms']['max'] == 4.0
+    assert within_bucket(route['parse_ms']['p50'], 0.5)
+
+    # A kind that was only parsed has no runs to average
+    stats.record_parse("parse only", 1.0)
+    assert stats.snapshot()["parse only"]['avg_output_bytes'] is None
+    stats.reset()
+    assert stats.snapshot() == {}
+
+
+def test_concurrent_recording_loses_nothing():
+    stats = CommandStats()
+
+    def record():
+        for _ in range(2000):
+            stats.record_run("netsh", 1.0, 5.0, 3, False)
+
+    threads = [threading.Thread(target=record) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    summary = stats.snapshot()["netsh"]
+    assert summary['calls'] == summary['runtime_ms']['count'] == 16000
+    assert summary['output_bytes'] == 48000
+
+
+def test_run_command_records_its_run(monkeypatch):
+    stats = CommandStats()
+    monkeypatch.setattr("core.command_stats", stats)
+    result = run_command("python exit", [sys.executable, "-c", "print('hello'); raise SystemExit(3)"])
+    assert (result.returncode, result.stdout) == (3, "hello\n")
+    summary = stats.snapshot()["python exit"]
+    assert (summary['calls'], summary['failures'], summary['output_bytes']) == (1, 1, 6)
+    assert summary['spawn_ms']['max'] > 0 and summary['runtime_ms']['max'] > 0
+
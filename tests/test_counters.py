@@ -0,0 +1,127 @@
+import os
+import time
+from array import array
+
+import pytest
+
+import core
+from core import COUNTER_FIELDS, CounterSampler, ProcNetDevCounterSource, RateHistory, format_bit_rate
+from fakes import FIXTURES
+
+STEP = 0.5  # Seconds between reads of the scripted source
+
+
+class ScriptedSource:
+    """Returns the given counters one read at a time, each read STEP seconds after the last on `clock`."""
+
+    def __init__(self, clock, reads, sampler=None):
+        self.clock = clock
+        self.reads = list(reads)
+        self.sampler = sampler
+
+    def read(self):
+        counters = self.reads.pop(0)
+        if not self.reads:
+            self.sampler._stop.set()  # The sampling loop ends after this round
+        self.clock.now += STEP
+        return counters
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    thread_time = staticmethod(time.thread_time)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(core, "time", clock)
+    return clock
+
+
+def sample(clock, reads, interval=STEP, history_seconds=60):
+    """Run the sampling loop over scripted reads on this thread and return the sampler."""
+    sampler = CounterSampler(None, interval, history_seconds)
+    sampler.source = ScriptedSource(clock, reads, sampler)
+    sampler._run()
+    return sampler
+
+
+def counters(*values):
+    return tuple(values) + (0,) * (len(COUNTER_FIELDS) - len(values))
+
+
+def test_rates_are_differences_over_the_time_between_reads(clock):
+    sampler = sample(clock, [
+        {"eth0": counters(1000, 500, 10, 5)},
+        {"eth0": counters(3000, 600, 30, 6), "wlan0": counters(7, 7)},
+        {"eth0": counters(3000, 1600, 31, 16), "wlan0": counters(57, 7)},
+    ])
+    assert sampler.rounds == 2
+    times, rates = sampler.series("eth0", "bytes_in")
+    assert list(times) == [1000.5, 1001.0] and list(rates) == [4000.0, 0.0]
+    assert list(sampler.series("eth0", "bytes_out")[1]) == [200.0, 2000.0]
+    assert sampler.snapshot() == {"eth0": counters(0.0, 2000.0, 2.0, 20.0), "wlan0": counters(100.0, 0.0)}
+    # An interface only gets rates from its second read on
+    assert list(sampler.series("wlan0", "bytes_in")[0]) == [1001.0]
+    assert sampler.series("missing", "bytes_in") == (array('d'), array('d'))
+    assert sampler.interfaces() == ["eth0", "wlan0"]
+
+
+def test_a_counter_that_goes_down_counts_as_no_traffic(clock):
+    # A 32-bit counter wrapping, or a driver reset, makes the counter smaller than the last read
+    sampler = sample(clock, [
+        {"eth0": counters(2 ** 32 - 100, 900)},
+        {"eth0": counters(400, 1000)},
+        {"eth0": counters(900, 1100)},
+    ])
+    assert list(sampler.series("eth0", "bytes_in")[1]) == [0.0, 1000.0]
+    assert list(sampler.series("eth0", "bytes_out")[1]) == [200.0, 200.0]
+
+
+def test_history_keeps_only_the_window_oldest_first(clock):
+    reads = [{"eth0": counters(index * index)} for index in range(12)]
+    sampler = sample(clock, reads, interval=STEP, history_seconds=2.0)
+    assert sampler.capacity == 4 and sampler.rounds == 11
+    times, rates = sampler.series("eth0", "bytes_in")
+    assert list(times) == [1000.0 + STEP * index for index in range(8, 12)]
+    assert list(rates) == [(index * index - (index - 1) ** 2) / STEP for index in range(8, 12)]
+
+
+def test_rate_history_ring_average_and_latest():
+    history = RateHistory(3)
+    assert history.latest() is None and history.average(0) is None
+    for index in range(5):
+        history.append(float(index), [float(index)] * len(COUNTER_FIELDS))
+    assert list(history.series("packets_out")[0]) == [2.0, 3.0, 4.0]
+    assert history.latest() == (4.0,) * len(COUNTER_FIELDS)
+    assert history.average(3.0) == (3.5,) * len(COUNTER_FIELDS)
+    assert history.average(0.0) == (3.0,) * len(COUNTER_FIELDS)
+    assert history.average(10.0) is None
+
+
+def test_proc_net_dev_is_parsed_without_the_loopback(monkeypatch):
+    monkeypatch.setattr(core, "PROC_NET_DEV", os.path.join(FIXTURES, "proc_net_dev.txt"))
+    source = ProcNetDevCounterSource()
+    try:
+        first = source.read()
+        assert first == {
+            "eth0": (8553160142, 29319004, 6242871, 278112, 3, 1, 17, 2),
+            "wlp2s0": (12345678901234, 4294967296, 99999999, 1234, 0, 0, 5, 0),
+            "docker0": (0, 0, 0, 0, 0, 0, 0, 0),
+        }
+        # The descriptor stays open and is read again from the start
+        assert source.read() == first
+    finally:
+        source.close()
+    assert source.fd is None
+
+
+def test_format_bit_rate():
+    assert [format_bit_rate(rate) for rate in (0, 100, 1250, 1_562_500, 2e9)] == [
+        "0 bit/s", "800 bit/s", "10.0 kbit/s", "12.5 Mbit/s", "16.0 Gbit/s"]
@@ -0,0 +1,92 @@
+import math
+import threading
+import time
+
+from fleet import FLEET_QUERIES, ConnectionPool, FakeTransport, FleetExecutor, fleet_summary
+
+
+def test_results_come_back_per_host_in_the_given_order():
+    transport = FakeTransport(["b", "a", "c"], latency=0, connect_latency=0)
+    executor = FleetExecutor(transport, max_workers=2)
+    finished = []
+    results = executor.run(["b", "a", "c", "a"], FLEET_QUERIES['nics'], on_result=finished.append)
+    assert list(results) == ["b", "a", "c"]
+    assert sorted(result.host for result in finished) == ["a", "b", "c"]
+    assert all(result.ok and result.value == ["Ethernet", "Ethernet 2"] for result in results.values())
+    assert executor.run([], FLEET_QUERIES['nics']) == {}
+
+
+def test_a_host_that_hangs_only_fails_itself_within_the_timeout():
+    transport = FakeTransport(["good", "hangs", "slow"], latency=0.01, connect_latency=0,
+                              host_latency={"hangs": math.inf, "slow": 0.2})
+    executor = FleetExecutor(transport, timeout=0.5)
+    started = time.monotonic()
+    results = executor.run(["good", "hangs", "slow"], FLEET_QUERIES['inventory'])
+    assert time.monotonic() - started < 1.5
+    assert results["good"].ok
+    assert not results["hangs"].ok and "did not answer" in results["hangs"].error
+    assert 0.4 < results["hangs"].elapsed < 1.0
+    # The slow host answers every command, but not all of them within its deadline
+    assert not results["slow"].ok and results["slow"].elapsed < 1.0
+
+
+def test_down_and_unknown_hosts_show_up_in_the_summary():
+    transport = FakeTransport(["up1", "up2", "down"], latency=0, connect_latency=0, down=["down"])
+    results = FleetExecutor(transport).run(["up1", "down", "up2", "nowhere"], FLEET_QUERIES['mtus'])
+    summary = fleet_summary(results)
+    assert summary['hosts'] == 4 and summary['ok'] == 2
+    assert summary['failed'] == {"down": "Connection to down refused", "nowhere": "Connection to nowhere refused"}
+    assert summary['elapsed_p50'] <= summary['elapsed_max']
+    assert fleet_summary({}) == {'hosts': 0, 'ok': 0, 'failed': {}, 'elapsed_p50': None, 'elapsed_max': None}
+
+
+def test_connections_are_reused_and_broken_ones_replaced():
+    transport = FakeTransport(["a", "b"], latency=0, connect_latency=0)
+    executor = FleetExecutor(transport)
+    executor.run(["a", "b"], FLEET_QUERIES['nics'])
+    executor.run(["a", "b"], FLEET_QUERIES['routes'])
+    assert transport.connections_opened == 2
+
+    def fail_on_a(backend):
+        if backend.host == "a":
+            raise RuntimeError("lost mid-command")
+        return backend.get_nic_names()
+
+    results = executor.run(["a", "b"], fail_on_a)
+    assert results["a"].error == "lost mid-command" and results["b"].ok
+    # The connection that failed is closed, so the next run on that host reconnects
+    executor.run(["a", "b"], FLEET_QUERIES['nics'])
+    assert transport.connections_opened == 3
+    executor.close()
+    executor.run(["a"], FLEET_QUERIES['nics'])
+    assert transport.connections_opened == 4
+
+
+def test_pool_hands_out_idle_connections_before_opening_new_ones():
+    transport = FakeTransport(["a"], latency=0, connect_latency=0)
+    pool = ConnectionPool(transport)
+    first, second = pool.acquire("a"), pool.acquire("a")
+    assert first is not second and transport.connections_opened == 2
+    pool.release("a", first)
+    assert pool.acquire("a") is first and transport.connections_opened == 2
+
+
+def test_no_more_than_max_workers_hosts_run_at_once():
+    hosts = [f"host{index}" for index in range(12)]
+    transport = FakeTransport(hosts, latency=0, connect_latency=0)
+    lock = threading.Lock()
+    running = [0]
+    peak = [0]
+
+    def operation(backend):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        return backend.get_nic_names()
+
+    results = FleetExecutor(transport, max_workers=3).run(hosts, operation)
+    assert all(result.ok for result in results.values())
+    assert peak[0] == 3
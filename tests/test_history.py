@@ -0,0 +1,133 @@
+import random
+import time
+
+import pytest
+
+import history
+from core import COUNTER_FIELDS, PingRecord
+from history import HistoryStore
+
+DAY = 86400
+# The writer's own retention pass uses the clock, so the samples are placed around it
+NOW = time.time() // 60 * 60
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def ping(rtt, status="success"):
+    return PingRecord(0, rtt, 64, status)
+
+
+def brute_force_summary(samples, bucket):
+    """[(slot, sent, received, min, avg, max)] from (time, rtt or None) samples, None meaning no reply."""
+    slots = {}
+    for when, rtt in samples:
+        slots.setdefault(int(when // bucket) * bucket, []).append(rtt)
+    rows = []
+    for slot, rtts in sorted(slots.items()):
+        replies = [rtt for rtt in rtts if rtt is not None]
+        rows.append((slot, len(rtts), len(replies), min(replies, default=None),
+                     sum(replies) / len(replies) if replies else None, max(replies, default=None)))
+    return rows
+
+
+def assert_summaries_equal(actual, expected):
+    assert len(actual) == len(expected)
+    for row, wanted in zip(actual, expected):
+        assert row[:3] == wanted[:3]
+        assert row[3:] == pytest.approx(wanted[3:])
+
+
+def test_writer_commits_full_batches_and_the_rest_on_close(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.sqlite3"), batch_size=3, flush_interval=60).start()
+    for index in range(7):
+        store.add_ping("8.8.8.8", ping(10.0 + index), when=NOW + index)
+    # Two full batches go out at once; the seventh record waits for the flush interval or close()
+    wait_for(lambda: store.written == 6)
+    time.sleep(0.05)
+    assert store.written == 6
+    store.close()
+    assert store.written == 7 and store.dropped == 0
+    assert [row[1] for row in store.ping_samples("8.8.8.8", NOW, NOW + 10)] == [10.0 + index for index in range(7)]
+
+
+def test_flush_waits_for_queued_records(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.sqlite3"), flush_interval=60).start()
+    try:
+        store.add_mtu_run("8.8.8.8", 1100, 1500, {'mtu': 1472, 'probes': 12, 'rounds': 3, 'elapsed': 0.4}, when=NOW)
+        store.add_counters({"Ethernet": [float(index) for index in range(len(COUNTER_FIELDS))]}, when=NOW)
+        assert store.flush(5)
+        assert store.mtu_runs("8.8.8.8", NOW, NOW + 1) == [(NOW, 1100, 1500, 1472, 12, 3, 0.4)]
+        assert store.names('counters') == ["Ethernet"] and store.names('mtu') == ["8.8.8.8"]
+    finally:
+        store.close()
+
+
+def test_records_past_the_queue_bound_are_dropped_and_counted(tmp_path, monkeypatch):
+    monkeypatch.setattr(history, "HISTORY_QUEUE_SIZE", 5)
+    store = HistoryStore(str(tmp_path / "history.sqlite3"))
+    for index in range(8):
+        store.add_ping("8.8.8.8", ping(1.0), when=NOW + index)
+    assert store.dropped == 3
+    store.start().close()
+    assert store.written == 5
+    assert len(store.ping_samples("8.8.8.8", NOW, NOW + 10)) == 5
+
+
+def test_summaries_are_the_same_before_and_after_rollup(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.sqlite3")).start()
+    rng = random.Random(5)
+    samples = []
+    # Ten days of samples, so the first three are rolled up and the rest stay raw
+    for index in range(3000):
+        when = NOW - 10 * DAY + index * 288 + rng.random()
+        rtt = None if rng.random() < 0.1 else rng.uniform(1, 80)
+        samples.append((when, rtt))
+        store.add_ping("8.8.8.8", ping(rtt) if rtt is not None else ping(None, "timeout"), when=when)
+        store.add_counters({"Ethernet": [100.0 + index] + [1.0] * (len(COUNTER_FIELDS) - 1)}, when=when)
+    store.close()
+
+    start, end = NOW - 11 * DAY, NOW + DAY
+    for bucket in (3600, DAY, 30 * DAY):
+        assert_summaries_equal(store.ping_summary("8.8.8.8", start, end, bucket), brute_force_summary(samples, bucket))
+    counters_before = store.counter_summary("Ethernet", start, end, DAY)
+
+    store.maintain(now=NOW)
+    raw = store.ping_samples("8.8.8.8", start, end)
+    assert 0 < len(raw) < len(samples) and raw[0][0] >= NOW - 7 * DAY - 60
+    # A 30 day bucket holds both rollups and raw rows, which the summary merges
+    for bucket in (3600, DAY, 30 * DAY):
+        assert_summaries_equal(store.ping_summary("8.8.8.8", start, end, bucket), brute_force_summary(samples, bucket))
+    counters_after = store.counter_summary("Ethernet", start, end, DAY)
+    assert [row[:2] for row in counters_after] == [row[:2] for row in counters_before]
+    assert [row[2:] for row in counters_after] == [pytest.approx(row[2:]) for row in counters_before]
+
+    # A second pass changes nothing
+    store.maintain(now=NOW)
+    assert_summaries_equal(store.ping_summary("8.8.8.8", start, end, DAY), brute_force_summary(samples, DAY))
+    store.close()
+
+
+def test_rows_past_the_rollup_retention_are_dropped(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.sqlite3"), raw_days=7, rollup_days=90).start()
+    result = {'mtu': 1472, 'probes': 12, 'rounds': 3, 'elapsed': 0.4}
+    for days in (100, 30):
+        store.add_ping("old.example", ping(5.0), when=NOW - days * DAY)
+        store.add_mtu_run("old.example", 1100, 1500, result, when=NOW - days * DAY)
+        store.add_counters({"Ethernet": [1.0] * len(COUNTER_FIELDS)}, when=NOW - days * DAY)
+    store.close()
+
+    store.maintain(now=NOW)
+    assert [row[1] for row in store.ping_summary("old.example", 0, NOW, DAY)] == [1]
+    assert [row[0] for row in store.mtu_runs("old.example", 0, NOW)] == [NOW - 30 * DAY]
+    assert [row[1] for row in store.counter_summary("Ethernet", 0, NOW, DAY)] == [1]
+
+    store.maintain(now=NOW + 61 * DAY)
+    assert store.ping_summary("old.example", 0, NOW + 61 * DAY, DAY) == []
+    assert store.names('ping') == [] and store.names('mtu') == [] and store.names('counters') == []
+    store.close()
@@ -0,0 +1,55 @@
+import time
+
+import pytest
+
+from core import IcmpProber, icmp_checksum
+
+# TEST-NET-2 (RFC 5737): never assigned, so nothing answers; some networks report it unreachable instead
+UNROUTABLE = "198.51.100.7"
+
+
+@pytest.fixture
+def prober():
+    try:
+        prober = IcmpProber()
+    except OSError as e:
+        pytest.skip(f"neither a datagram nor a raw ICMP socket is available: {e}")
+    yield prober
+    prober.close()
+
+
+def test_checksum_of_an_echo_request():
+    # The worked example of RFC 1071: the bytes sum to 0xddf2
+    assert icmp_checksum(bytes([0x00, 0x01, 0xF2, 0x03, 0xF4, 0xF5, 0xF6, 0xF7])) == 0x220D
+    header = bytes([8, 0, 0, 0, 0x12, 0x34, 0x00, 0x01])
+    checksum = icmp_checksum(header + b"abc")
+    # A packet carrying its own checksum sums to zero
+    assert icmp_checksum(header[:2] + checksum.to_bytes(2, "big") + header[4:] + b"abc") == 0
+
+
+def test_loopback_answers_one_probe(prober):
+    result = prober.probe("127.0.0.1", 56, 1000)
+    assert result['status'] == "success" and result['size'] == 56
+    assert 0 < result['rtt'] < 1000 and result['ttl'] > 0
+
+
+def test_a_probe_to_an_unroutable_address_gives_up_by_the_timeout(prober):
+    started = time.perf_counter()
+    result = prober.probe(UNROUTABLE, 56, 300)
+    assert time.perf_counter() - started < 1.0
+    assert result['status'] in ("timeout", "unreachable") and result['rtt'] is None
+
+
+def test_probe_many_matches_each_reply_to_its_host(prober):
+    hosts = ["127.0.0.1", "127.0.0.2", "localhost", UNROUTABLE, "127.0.0.3"]
+    started = time.perf_counter()
+    results = prober.probe_many(hosts, 32, 300)
+    assert time.perf_counter() - started < 1.0
+    assert list(results) == hosts
+    # localhost is 127.0.0.1 too: its own sequence number keeps the two replies apart
+    for host in ("127.0.0.1", "127.0.0.2", "localhost", "127.0.0.3"):
+        assert results[host]['status'] == "success" and results[host]['rtt'] is not None, host
+    assert results[UNROUTABLE]['status'] in ("timeout", "unreachable")
+
+    # The socket is reused, so a second round matches its own replies, not the first round's
+    assert all(result['status'] == "success" for result in prober.probe_many(hosts[:3], 32, 300).values())
@@ -0,0 +1,95 @@
+import os
+import threading
+from collections import Counter
+
+import pytest
+
+pytest.importorskip("PyQt5")
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtWidgets import QApplication, QPlainTextEdit
+
+from main import LOG_VIEW_QUEUE_LINES, LogSink
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def sink(app, tmp_path):
+    sink = LogSink(QPlainTextEdit(), "test", max_lines=50)
+    sink.timer.stop()  # Flushed by hand so the tests decide when lines are shown
+    sink.spill_path = str(tmp_path / "spill.log")
+    yield sink
+    if sink._spill_file is not None:
+        sink._spill_file.close()
+
+
+def shown(sink):
+    return sink.view.toPlainText().splitlines()
+
+
+def spilled(sink):
+    if not os.path.exists(sink.spill_path):
+        return []
+    with open(sink.spill_path, encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+def test_lines_appended_from_a_thread_show_on_flush(sink):
+    worker = threading.Thread(target=lambda: [sink.append(f"line {number}") for number in range(10)])
+    worker.start()
+    worker.join()
+    assert shown(sink) == []
+    sink.flush()
+    assert shown(sink) == [f"line {number}" for number in range(10)]
+
+
+def test_view_keeps_the_last_lines_and_spills_the_rest_in_order(sink):
+    lines = [f"line {number}" for number in range(500)]
+    for start in range(0, len(lines), 30):
+        for line in lines[start:start + 30]:
+            sink.append(line)
+        sink.flush()
+    assert shown(sink) == lines[-50:]
+    assert spilled(sink) == lines[:-50]
+
+
+def test_queue_overflow_is_spilled_not_lost(sink):
+    lines = [f"line {number}" for number in range(20)]
+    for line in lines:
+        sink.append(line)
+    sink.flush()
+    lines += [f"burst {number}" for number in range(LOG_VIEW_QUEUE_LINES * 3)]
+    for line in lines[20:]:
+        sink.append(line)
+    sink.flush()
+    assert shown(sink) == lines[-50:]
+    assert spilled(sink) == lines[:-50]
+
+
+def test_concurrent_writers_lose_nothing(sink):
+    def write(name):
+        for number in range(2000):
+            sink.append(f"{name} {number}")
+
+    workers = [threading.Thread(target=write, args=(f"writer {index}",)) for index in range(4)]
+    for worker in workers:
+        worker.start()
+    while any(worker.is_alive() for worker in workers):
+        sink.flush()
+    sink.flush()
+    assert len(shown(sink)) == 50
+    assert Counter(spilled(sink) + shown(sink)) == Counter(
+        f"writer {index} {number}" for index in range(4) for number in range(2000))
+
+
+def test_clear_empties_the_view_and_the_queue(sink):
+    sink.append("shown")
+    sink.flush()
+    sink.append("queued")
+    sink.clear()
+    sink.flush()
+    assert shown(sink) == []
@@ -0,0 +1,36 @@
+import threading
+
+import core
+from core import get_all_nic_details
+from fakes import use_recorded_outputs
+
+
+def test_every_interface_is_read_and_failures_are_kept_apart(monkeypatch):
+    use_recorded_outputs(monkeypatch)
+    details, errors = get_all_nic_details(["Ethernet", "Missing", "vEthernet (Default Switch)"])
+    assert sorted(details) == ["Ethernet", "vEthernet (Default Switch)"]
+    assert details["Ethernet"]['IP Address'] == "192.168.1.23"
+    assert details["vEthernet (Default Switch)"]['MTU'] == "1400"
+    assert list(errors) == ["Missing"]
+    assert "volume label syntax is incorrect" in errors["Missing"]
+
+
+def test_interfaces_are_queried_at_the_same_time(monkeypatch):
+    use_recorded_outputs(monkeypatch)
+    # Each query waits for all four to have started, which only happens if they run concurrently
+    barrier = threading.Barrier(4, timeout=5)
+
+    def query_nic_config(name):
+        barrier.wait()
+        return {'IP Address': name}
+
+    monkeypatch.setattr(core, "query_nic_config", query_nic_config)
+    names = [f"10.0.0.{number}" for number in range(4)]
+    details, errors = get_all_nic_details(names, max_workers=4)
+    assert errors == {}
+    assert {name: nic_details['IP Address'] for name, nic_details in details.items()} == dict(zip(names, names))
+
+
+def test_no_names_runs_nothing(monkeypatch):
+    monkeypatch.setattr(core, "run_netsh", None)
+    assert get_all_nic_details([]) == ({}, {})
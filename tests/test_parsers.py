@@ -0,0 +1,90 @@
+import os
+
+import pytest
+
+from core import parse_mtus, parse_nic_config, parse_nic_configs, parse_nic_names
+from parsers import Interface, InterfaceConfig, PersistentRoute, RouteInterface, RouteRow, SubInterface, \
+    parse_configs, parse_interfaces, parse_route_print, parse_subinterfaces
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def fixture(name, newline="\n"):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read().replace("\n", newline)
+
+
+@pytest.fixture(params=["\n", "\r\n"], ids=["lf", "crlf"])
+def newline(request):
+    return request.param
+
+
+def test_show_interfaces(newline):
+    assert parse_interfaces(fixture("show_interfaces.txt", newline)) == [
+        Interface("1", "75", "4294967295", "connected", "Loopback Pseudo-Interface 1"),
+        Interface("12", "25", "1500", "connected", "Ethernet"),
+        Interface("14", "35", "1500", "disconnected", "Wi-Fi"),
+        Interface("22", "15", "1400", "connected", "vEthernet (Default Switch)"),
+    ]
+
+
+def test_show_subinterface(newline):
+    assert parse_subinterfaces(fixture("show_subinterface.txt", newline)) == [
+        SubInterface("4294967295", "1", "0", "54122", "Loopback Pseudo-Interface 1"),
+        SubInterface("1500", "1", "2793218512", "183012114", "Ethernet"),
+        SubInterface("1500", "5", "0", "0", "Wi-Fi"),
+        SubInterface("1400", "1", "1934211", "4501123", "vEthernet (Default Switch)"),
+    ]
+
+
+def test_show_config(newline):
+    assert parse_configs(fixture("show_config.txt", newline)) == {
+        "Ethernet": InterfaceConfig("Ethernet", "Yes", ["192.168.1.23"], "255.255.255.0", "192.168.1.1",
+                                    ["192.168.1.1", "8.8.8.8"], "25"),
+        "Wi-Fi": InterfaceConfig("Wi-Fi", "Yes", [], None, None, [], "35"),
+        "vEthernet (Default Switch)": InterfaceConfig("vEthernet (Default Switch)", "No", ["172.24.80.1"],
+                                                      "255.255.240.0", None, [], "15"),
+        "Loopback Pseudo-Interface 1": InterfaceConfig("Loopback Pseudo-Interface 1", "No", ["127.0.0.1"],
+                                                       "255.0.0.0", None, [], "75"),
+    }
+
+
+def test_route_print(newline):
+    parsed = parse_route_print(fixture("route_print.txt", newline))
+    assert parsed.interfaces == [
+        RouteInterface("12", "00-15-5d-01-02-03", "Intel(R) Ethernet Connection (7) I219-V"),
+        RouteInterface("14", "a4-c3-f0-11-22-33", "Intel(R) Wi-Fi 6 AX201 160MHz"),
+        RouteInterface("22", "00-15-5d-8a-4b-01", "Hyper-V Virtual Ethernet Adapter"),
+        RouteInterface("1", "", "Software Loopback Interface 1"),
+    ]
+    assert len(parsed.active) == 17
+    assert parsed.active[:3] == [
+        RouteRow("0.0.0.0", "0.0.0.0", "192.168.1.1", "192.168.1.23", "25"),
+        RouteRow("10.8.0.0", "255.255.0.0", "192.168.1.254", "192.168.1.23", "35"),
+        RouteRow("127.0.0.0", "255.0.0.0", "On-link", "127.0.0.1", "331"),
+    ]
+    assert parsed.active[-1] == RouteRow("255.255.255.255", "255.255.255.255", "On-link", "172.24.80.1", "271")
+    # The IPv6 table's Active Routes are not read as IPv4 routes
+    assert all(":" not in row.destination for row in parsed.active)
+    assert parsed.persistent == [PersistentRoute("10.8.0.0", "255.255.0.0", "192.168.1.254", "10")]
+
+
+def test_core_adapters():
+    assert parse_nic_names(fixture("show_interfaces.txt")) == (
+        ["Loopback Pseudo-Interface 1", "Ethernet", "vEthernet (Default Switch)"],
+        {"Loopback Pseudo-Interface 1": "1", "Ethernet": "12", "vEthernet (Default Switch)": "22"})
+    assert parse_mtus(fixture("show_subinterface.txt"))["vEthernet (Default Switch)"] == "1400"
+    assert parse_nic_configs(fixture("show_config.txt"))["Wi-Fi"] == {
+        'Primary DNS': "None", 'Backup DNS': "None", 'DHCP': "Yes", 'Interface Metric': "35"}
+
+
+def test_single_interface_config_skips_the_leading_blank_line():
+    output = fixture("show_config.txt").split('\nConfiguration for interface "Wi-Fi"')[0]
+    assert parse_nic_config(output) == {
+        'IP Address': "192.168.1.23", 'Subnet Mask': "255.255.255.0", 'Default Gateway': "192.168.1.1",
+        'Primary DNS': "192.168.1.1", 'Backup DNS': "8.8.8.8", 'DHCP': "Yes", 'Interface Metric': "25"}
+
+
+def test_error_text_is_a_headerless_block():
+    configs = parse_configs("The filename, directory name, or volume label syntax is incorrect.\n")
+    assert list(configs) == [None]
@@ -0,0 +1,50 @@
+import pytest
+
+from core import SimulatedPath, discover_path_mtu
+
+
+def largest_passing(min_mtu, max_mtu, path):
+    """Brute force: the largest size in the range the path lets through, probing every size."""
+    passing = [size for size in range(min_mtu, max_mtu + 1) if path(size) == "success"]
+    return passing[-1] if passing else None
+
+
+@pytest.mark.parametrize("fanout", [1, 2, 4, 8])
+def test_finds_the_same_mtu_as_probing_every_size(fanout):
+    for mtu in list(range(1090, 1511, 29)) + [1099, 1100, 1101, 1499, 1500, 1501]:
+        result = discover_path_mtu(1100, 1500, SimulatedPath(mtu), fanout)
+        assert result['mtu'] == largest_passing(1100, 1500, SimulatedPath(mtu)), (fanout, mtu)
+
+
+def test_timeouts_count_as_too_large():
+    assert discover_path_mtu(576, 9000, SimulatedPath(1472, oversize="timeout"))['mtu'] == 1472
+
+
+def test_wider_fanout_takes_fewer_rounds():
+    rounds = [discover_path_mtu(1100, 1500, SimulatedPath(1337), fanout)['rounds'] for fanout in (1, 4, 8)]
+    # Halving 401 sizes takes 8 rounds after the first; splitting them 5 or 9 ways takes 4 and 3 in all
+    assert rounds == [8, 4, 3]
+
+
+def test_lost_probes_below_the_mtu_do_not_narrow_the_bracket():
+    lost = {1200, 1300}
+
+    def probe(size):
+        return "timeout" if size in lost else SimulatedPath(1400)(size)
+
+    assert discover_path_mtu(1100, 1500, probe)['mtu'] == 1400
+
+
+def test_errors_are_inconclusive():
+    with pytest.raises(Exception, match="Every probe in the round failed"):
+        discover_path_mtu(1100, 1500, lambda size: "error")
+
+
+def test_stops_when_asked():
+    result = discover_path_mtu(1100, 1500, SimulatedPath(1400), should_stop=lambda: True)
+    assert result['stopped'] and result['probes'] == 0
+
+
+def test_rejects_an_empty_range():
+    with pytest.raises(ValueError):
+        discover_path_mtu(1500, 1500, SimulatedPath(1500))
@@ -0,0 +1,99 @@
+import threading
+import time
+
+import pytest
+
+import core
+from core import PingMonitor
+
+
+class FakeProber:
+    """Answers every round at once: 'near' in 10 ms, 'far' in 20 ms plus the round number, 'dead' never."""
+
+    sock = None
+
+    def __init__(self, busy=0.0):
+        self.busy = busy
+        self.calls = []  # (monotonic time, hosts, timeout_ms)
+        self.round = 0
+
+    def probe_many(self, hosts, size, timeout_ms, df=False):
+        self.calls.append((time.monotonic(), list(hosts), timeout_ms))
+        self.round += 1
+        time.sleep(self.busy)
+        answers = {'near': 10.0, 'far': 20.0 + self.round}
+        return {host: {'status': "success", 'rtt': answers[host], 'ttl': 64, 'size': size} if host in answers
+                else {'status': "timeout", 'rtt': None, 'ttl': None, 'size': size} for host in hosts}
+
+
+@pytest.fixture
+def prober(monkeypatch):
+    prober = FakeProber()
+    monkeypatch.setattr(core, "get_icmp_prober", lambda: prober)
+    return prober
+
+
+def run_rounds(monitor, prober, rounds):
+    monitor.start()
+    deadline = time.monotonic() + 5
+    while prober.round < rounds:
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+    monitor.stop()
+
+
+def test_each_target_keeps_its_own_statistics(prober):
+    records = []
+    lock = threading.Lock()
+
+    def on_record(target, record):
+        with lock:
+            records.append((target, record.seq, record.status))
+
+    monitor = PingMonitor(["near", "far", "dead", "near"], interval=0.01, on_record=on_record)
+    run_rounds(monitor, prober, 5)
+    rounds = monitor.rounds
+    assert monitor.targets == ["near", "far", "dead"]
+    assert all(hosts == ["near", "far", "dead"] for _, hosts, _ in prober.calls)
+
+    snapshot = {target: (last, summary) for target, last, summary in monitor.snapshot()}
+    assert [target for target, _, _ in monitor.snapshot()] == ["near", "far", "dead"]
+    near, far, dead = snapshot["near"][1], snapshot["far"][1], snapshot["dead"][1]
+    assert (near['sent'], near['received'], near['min'], near['max']) == (rounds, rounds, 10.0, 10.0)
+    assert far['min'] == 21.0 and far['max'] == 20.0 + rounds
+    assert far['avg'] == pytest.approx(20 + (rounds + 1) / 2)
+    assert far['jitter'] > 0 and near['jitter'] == 0
+    assert (dead['sent'], dead['received'], dead['loss'], dead['avg']) == (rounds, 0, 100.0, None)
+    assert snapshot["dead"][0].status == "timeout" and snapshot["far"][0].rtt == 20.0 + rounds
+
+    # Every result is handed on, round by round, in target order
+    assert records == [(target, seq, "timeout" if target == "dead" else "success")
+                       for seq in range(1, rounds + 1) for target in ("near", "far", "dead")]
+
+
+def test_rounds_start_every_interval_however_long_a_round_takes(prober):
+    prober.busy = 0.03
+    monitor = PingMonitor(["near"], interval=0.1, timeout_ms=1000)
+    run_rounds(monitor, prober, 5)
+    starts = [when for when, _, _ in prober.calls]
+    gaps = [later - earlier for earlier, later in zip(starts, starts[1:])]
+    assert all(0.09 < gap < 0.13 for gap in gaps), gaps
+    # A reply may not arrive later than the next round
+    assert {timeout for _, _, timeout in prober.calls} == {100}
+
+
+def test_stop_ends_the_rounds(prober):
+    monitor = PingMonitor(["near"], interval=0.01)
+    run_rounds(monitor, prober, 2)
+    assert not monitor.is_running()
+    rounds = prober.round
+    time.sleep(0.05)
+    assert prober.round == rounds == monitor.rounds
+
+
+def test_without_icmp_the_monitor_ends_at_once(monkeypatch):
+    monkeypatch.setattr(core, "get_icmp_prober", lambda: None)
+    monitor = PingMonitor(["near"], interval=0.01)
+    monitor.start()
+    monitor._thread.join(1)
+    assert not monitor.is_running() and monitor.rounds == 0
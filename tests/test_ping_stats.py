@@ -0,0 +1,98 @@
+import math
+import random
+import statistics
+
+import pytest
+
+from core import LogHistogram, PingRecord, PingSession, PingStats
+
+
+def replies(rtts):
+    return [PingRecord(seq, rtt, 64, "success") for seq, rtt in enumerate(rtts, start=1)]
+
+
+def exact_percentile(values, percent):
+    values = sorted(values)
+    return values[max(math.ceil(len(values) * percent / 100), 1) - 1]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_running_statistics_match_brute_force(seed):
+    rng = random.Random(seed)
+    rtts = [rng.lognormvariate(3, 0.8) for _ in range(rng.randint(2, 3000))]
+    stats = PingStats()
+    lost = 0
+    for record in replies(rtts):
+        stats.add(record)
+        if rng.random() < 0.1:
+            stats.add(PingRecord(0, None, None, "timeout"))
+            lost += 1
+
+    jitter = 0.0
+    for previous, rtt in zip(rtts, rtts[1:]):
+        jitter += (abs(rtt - previous) - jitter) / 16  # RFC 3550, section 6.4.1
+    assert (stats.sent, stats.received) == (len(rtts) + lost, len(rtts))
+    assert stats.loss == pytest.approx(100 * lost / (len(rtts) + lost))
+    assert (stats.min, stats.max) == (min(rtts), max(rtts))
+    assert stats.mean == pytest.approx(statistics.fmean(rtts), rel=1e-12)
+    assert stats.stddev == pytest.approx(statistics.stdev(rtts), rel=1e-9)
+    assert stats.jitter == pytest.approx(jitter, rel=1e-12)
+    # Percentiles are the upper edge of the exact value's 5% bucket, never past the largest reply
+    for percent in (1, 50, 90, 95, 99, 100):
+        exact = exact_percentile(rtts, percent)
+        assert exact * (1 - 1e-9) <= stats.percentile(percent) <= min(exact * 1.05 * (1 + 1e-9), max(rtts))
+
+
+def test_welford_keeps_precision_on_a_large_offset():
+    rtts = [1e6 + value for value in (4.0, 7.0, 13.0, 16.0)]
+    stats = PingStats()
+    for record in replies(rtts):
+        stats.add(record)
+    assert stats.stddev == pytest.approx(statistics.stdev(rtts), rel=1e-9)
+
+
+def test_empty_and_single_reply_statistics():
+    stats = PingStats()
+    assert stats.summary() == {'sent': 0, 'received': 0, 'loss': 0.0, 'min': None, 'avg': None, 'max': None,
+                               'stddev': 0.0, 'jitter': 0.0, 'p50': None, 'p95': None, 'p99': None}
+    stats.add(PingRecord(1, 12.5, 64, "success"))
+    assert (stats.mean, stats.stddev, stats.jitter, stats.percentile(99)) == (12.5, 0.0, 0.0, 12.5)
+
+
+def test_histogram_clamps_values_outside_its_buckets():
+    histogram = LogHistogram(base=1.0, growth=2.0, buckets=4)
+    for value in (0.001, 0.5, 3.0, 1000.0):
+        histogram.add(value)
+    assert histogram.percentile(50) == 2.0  # Everything up to base * growth shares the first bucket
+    assert histogram.percentile(75) == 4.0
+    assert histogram.percentile(100) == 1000.0  # Counted in the last bucket, reported as the largest value
+
+
+def test_parse_line_reads_results_and_skips_the_rest():
+    session = PingSession("8.8.8.8")
+    lines = [
+        "Pinging 8.8.8.8 with 32 bytes of data:",
+        "Reply from 8.8.8.8: bytes=32 time=14ms TTL=117",
+        "Reply from 127.0.0.1: bytes=32 time<1ms TTL=128",
+        "Request timed out.",
+        "Reply from 10.0.0.1: Destination host unreachable.",
+        "Packet needs to be fragmented but DF set.",
+        "PING: transmit failed. General failure.",
+        "",
+        "Ping statistics for 8.8.8.8:",
+        "    Packets: Sent = 6, Received = 3, Lost = 3 (50% loss),",
+        "Approximate round trip times in milli-seconds:",
+        "    Minimum = 1ms, Maximum = 14ms, Average = 7ms",
+    ]
+    records = [session.parse_line(line) for line in lines]
+    assert records == [
+        None,
+        PingRecord(1, 14.0, 117, "success"),
+        PingRecord(2, 1.0, 128, "success"),
+        PingRecord(3, None, None, "timeout"),
+        PingRecord(4, None, None, "unreachable"),
+        PingRecord(5, None, None, "fragmentation"),
+        PingRecord(6, None, None, "error"),
+        None, None, None, None, None,
+    ]
+    assert (session.stats.sent, session.stats.received, session.stats.loss) == (6, 2, pytest.approx(200 / 3))
@@ -0,0 +1,92 @@
+import functools
+import ipaddress
+import random
+from collections import Counter
+
+import pytest
+
+from core import analyze_route_rows, analyze_routes, parse_route
+
+
+@functools.lru_cache(maxsize=None)
+def network(route):
+    return ipaddress.ip_network(f"{route.destination}/{route.netmask}", strict=False)
+
+
+def brute_analyze(routes):
+    """analyze_routes() by comparing every prefix with every other one."""
+    groups = {}
+    for route in routes:
+        groups.setdefault(network(route), []).append(route)
+    issues = []
+    for prefix, group in groups.items():
+        # The lowest metric per gateway is used, the first of any tie
+        used = {}
+        for route in sorted(group, key=lambda route: route.metric):
+            if route.gateway in used:
+                issues.append((route, "duplicate", used[route.gateway]))
+            else:
+                used[route.gateway] = route
+
+        wider = [other for other in groups if other.prefixlen < prefix.prefixlen and prefix.subnet_of(other)]
+        if wider:
+            parent = max(wider, key=lambda other: other.prefixlen)
+            first = min(groups[parent], key=lambda route: route.metric)
+            if parent.prefixlen > 0:
+                for route in used.values():
+                    if route.gateway != "On-link":
+                        same_path = (route.gateway, route.interface) == (first.gateway, first.interface)
+                        issues.append((route, "redundant" if same_path else "overlap", first))
+
+        inside = [other for other in groups if other.prefixlen > prefix.prefixlen and other.subnet_of(prefix)]
+        if list(ipaddress.collapse_addresses(inside)) == [prefix]:
+            issues += [(route, "shadowed", None) for route in group]
+    return issues
+
+
+def random_routes(count, seed):
+    generator = random.Random(seed)
+    routes = []
+    for _ in range(count):
+        length = generator.choice([0, 8, 16, 20, 23, 24, 24, 25, 25, 26, 32])
+        address = 10 << 24 | generator.getrandbits(9) << 15 | generator.getrandbits(15) & generator.choice(
+            [0, 0x7F00, 0x7FFF])
+        prefixes = [ipaddress.ip_network((address, length), strict=False)]
+        if 0 < length < 32 and generator.random() < 0.2:
+            prefixes += prefixes[0].subnets()  # Both halves, which shadow it
+        for prefix in prefixes:
+            routes.append(parse_route([str(prefix.network_address), str(prefix.netmask),
+                                       generator.choice(["On-link", "10.0.0.1", "10.0.0.2"]),
+                                       generator.choice(["10.0.0.10", "10.0.0.11"]),
+                                       str(generator.choice([1, 5, 25]))]))
+    return routes
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_a_brute_force_comparison(seed):
+    routes = random_routes(400, seed)
+    found = analyze_routes(routes)
+    assert Counter(found) == Counter(brute_analyze(routes))
+    assert {category for _, category, _ in found} == {"shadowed", "duplicate", "redundant", "overlap"}
+
+
+def test_each_category_on_a_small_table():
+    rows = [
+        ["0.0.0.0", "0.0.0.0", "10.0.0.1", "10.0.0.10", "25"],
+        ["10.1.0.0", "255.255.0.0", "10.0.0.1", "10.0.0.10", "5"],
+        ["10.1.0.0", "255.255.255.0", "10.0.0.1", "10.0.0.10", "5"],
+        ["10.1.1.0", "255.255.255.0", "10.0.0.2", "10.0.0.10", "5"],
+        ["10.1.1.0", "255.255.255.0", "10.0.0.2", "10.0.0.10", "9"],
+        ["10.2.0.0", "255.255.255.0", "10.0.0.1", "10.0.0.10", "5"],
+        ["10.2.0.0", "255.255.255.128", "10.0.0.2", "10.0.0.10", "5"],
+        ["10.2.0.128", "255.255.255.128", "10.0.0.2", "10.0.0.10", "5"],
+    ]
+    issues = analyze_route_rows(rows)
+    categories = {key: sorted(category for category, _ in found) for key, found in issues.items()}
+    assert categories == {
+        ("10.1.0.0", "255.255.255.0", "10.0.0.1", "10.0.0.10"): ["redundant"],
+        ("10.1.1.0", "255.255.255.0", "10.0.0.2", "10.0.0.10"): ["duplicate", "overlap"],
+        ("10.2.0.0", "255.255.255.0", "10.0.0.1", "10.0.0.10"): ["shadowed"],
+        ("10.2.0.0", "255.255.255.128", "10.0.0.2", "10.0.0.10"): ["overlap"],
+        ("10.2.0.128", "255.255.255.128", "10.0.0.2", "10.0.0.10"): ["overlap"],
+    }
@@ -0,0 +1,53 @@
+import pytest
+
+from core import apply_route_batch, export_routes, import_routes, plan_route_import, route_script_line
+from fakes import RouteTableBackend
+
+STATIC_ROUTES = {
+    ("10.20.0.0", "255.255.0.0", "10.0.0.1", "10.0.0.10"): 10,
+    ("8.8.8.8", "255.255.255.255", "10.0.0.1", "10.0.0.10"): 256,
+    ("172.16.0.0", "255.240.0.0", "192.168.1.1", "192.168.1.20"): 5,
+}
+
+
+def test_route_script_line_takes_the_interface_metric_off():
+    row = ["10.20.0.0", "255.255.0.0", "10.0.0.1", "10.0.0.10", "35"]
+    assert route_script_line("add", row, "Ethernet", 25) == (
+        'interface ipv4 add route prefix=10.20.0.0/16 interface="Ethernet" nexthop=10.0.0.1 metric=10 store=active')
+    assert "metric" not in route_script_line("delete", row, "Ethernet", 25)
+
+
+@pytest.mark.parametrize("extension", ["csv", "json"])
+def test_export_then_import_restores_the_same_table(tmp_path, extension):
+    backend = RouteTableBackend()
+    backend.routes.update(STATIC_ROUTES)
+    table = backend.get_routing_table()
+    path = str(tmp_path / f"routes.{extension}")
+    export_routes(table, path)
+
+    for key in STATIC_ROUTES:
+        del backend.routes[key]
+    plan = plan_route_import(backend, path)
+    assert plan['unresolved'] == []
+    assert len(plan['adds']) == len(STATIC_ROUTES)
+    assert apply_route_batch(backend, plan['adds'], [], plan['interfaces']) == []
+    assert sorted(backend.get_routing_table()) == sorted(table)
+
+    # A second import finds nothing to do
+    assert plan_route_import(backend, path)['adds'] == []
+
+
+def test_import_infers_the_interface_from_the_gateway(tmp_path):
+    path = tmp_path / "routes.csv"
+    path.write_text("destination,netmask,gateway,interface,metric\n10.30.0.0/16,,192.168.1.1,,60\n")
+    backend = RouteTableBackend()
+    plan = plan_route_import(backend, str(path))
+    assert apply_route_batch(backend, plan['adds'], [], plan['interfaces']) == []
+    assert backend.routes[("10.30.0.0", "255.255.0.0", "192.168.1.1", "192.168.1.20")] == 10
+
+
+def test_import_rejects_a_bad_metric(tmp_path):
+    path = tmp_path / "routes.csv"
+    path.write_text("destination,netmask,gateway,interface,metric\n10.30.0.0/16,,192.168.1.1,,low\n")
+    with pytest.raises(ValueError, match="Route 1: invalid metric low"):
+        import_routes(str(path))
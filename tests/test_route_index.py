@@ -0,0 +1,100 @@
+import functools
+import ipaddress
+import random
+
+import pytest
+
+from core import RouteIndex, parse_route
+
+
+def random_rows(count, seed):
+    """Routes crowded into a few /8s with every prefix length and few metrics, so prefixes nest and tie."""
+    generator = random.Random(seed)
+    rows = []
+    for _ in range(count):
+        length = generator.randint(0, 32)
+        address = generator.choice([10, 172, 192]) << 24 | generator.getrandbits(24) & generator.choice(
+            [0xFF0000, 0xFFFF00, 0xFFFFFF])
+        network = ipaddress.ip_network((address, length), strict=False)
+        rows.append([str(network.network_address), str(network.netmask), f"192.168.0.{generator.randint(1, 3)}",
+                     "192.168.0.10", str(generator.choice([1, 5, 25]))])
+    return rows
+
+
+@functools.lru_cache(maxsize=None)
+def network(route):
+    return ipaddress.ip_network(f"{route.destination}/{route.netmask}", strict=False)
+
+
+def best(routes):
+    """The route Windows uses among routes for one prefix: the lowest metric, the first of any tie."""
+    return min(routes, key=lambda route: route.metric) if routes else None
+
+
+def brute_lookup(routes, address):
+    address = ipaddress.ip_address(address)
+    matching = [route for route in routes if address in network(route)]
+    longest = max((route.prefix_length for route in matching), default=None)
+    return best([route for route in matching if route.prefix_length == longest])
+
+
+def brute_lookup_prefix(routes, block):
+    block = ipaddress.ip_network(block)
+    covering = [route for route in routes if route.prefix_length <= block.prefixlen
+                and block.subnet_of(network(route))]
+    longest = max((route.prefix_length for route in covering), default=None)
+    by_prefix = {}
+    for route in routes:
+        if route.prefix_length > block.prefixlen and network(route).subnet_of(block):
+            by_prefix.setdefault((route.network, route.prefix_length), []).append(route)
+    inside = [best(group) for key, group in sorted(by_prefix.items())]
+    return best([route for route in covering if route.prefix_length == longest]), inside
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_lookup_matches_a_brute_force_scan(seed):
+    rows = random_rows(400, seed)
+    routes = [parse_route(row) for row in rows]
+    index = RouteIndex(rows)
+    generator = random.Random(seed)
+    addresses = [str(ipaddress.ip_address(generator.choice([10, 172, 192, 8]) << 24 | generator.getrandbits(24)))
+                 for _ in range(300)]
+    addresses += [route.destination for route in routes[:50]]
+    for address in addresses:
+        assert index.lookup(address) == brute_lookup(routes, address), address
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_lookup_prefix_matches_a_brute_force_scan(seed):
+    rows = random_rows(400, seed)
+    routes = [parse_route(row) for row in rows]
+    index = RouteIndex(rows)
+    generator = random.Random(seed)
+    blocks = []
+    for _ in range(100):
+        length = generator.randint(0, 32)
+        address = generator.choice([10, 172, 192]) << 24 | generator.getrandbits(24)
+        blocks.append(str(ipaddress.ip_network((address, length), strict=False)))
+    blocks += [f"{route.destination}/{route.prefix_length}" for route in routes[:50]]
+    for block in blocks:
+        target, covering, inside = index.lookup_many([block])[0]
+        assert (covering, inside) == brute_lookup_prefix(routes, block), block
+
+
+def test_lookup_many_keeps_the_order_and_rejects_bad_lengths():
+    index = RouteIndex([["0.0.0.0", "0.0.0.0", "192.168.0.1", "192.168.0.10", "25"],
+                        ["10.0.0.0", "255.0.0.0", "192.168.0.2", "192.168.0.10", "5"],
+                        ["10.1.0.0", "255.255.0.0", "192.168.0.3", "192.168.0.10", "5"]])
+    results = index.lookup_many(["10.1.2.3", "8.8.8.8", "10.0.0.0/8"])
+    assert [(target, route.gateway) for target, route, _ in results] == [
+        ("10.1.2.3", "192.168.0.3"), ("8.8.8.8", "192.168.0.1"), ("10.0.0.0/8", "192.168.0.2")]
+    assert [route.destination for route in results[2][2]] == ["10.1.0.0"]
+    with pytest.raises(ValueError):
+        index.lookup_many(["10.0.0.0/33"])
+
+
+def test_unparsable_rows_are_skipped():
+    index = RouteIndex([["10.0.0.0", "255.0.255.0", "On-link", "10.0.0.1", "1"], ["bad", "row", "", "", ""]])
+    assert index.routes == []
+    assert len(index.skipped) == 2
+    assert index.lookup("10.0.0.1") is None
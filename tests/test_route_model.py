@@ -0,0 +1,76 @@
+import os
+import random
+
+import pytest
+
+pytest.importorskip("PyQt5")
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtWidgets import QApplication
+
+from main import RouteTableModel
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def model(app):
+    model = RouteTableModel()
+    model.signals = []
+    model.rowsRemoved.connect(lambda parent, first, last: model.signals.append(("removed", first, last)))
+    model.rowsInserted.connect(lambda parent, first, last: model.signals.append(("inserted", first, last)))
+    model.dataChanged.connect(lambda top, bottom, roles: model.signals.append(("changed", top.row(), top.column())))
+    return model
+
+
+def route(number, metric=25):
+    return [f"10.0.{number}.0", "255.255.255.0", "192.168.1.1", "192.168.1.10", str(metric)]
+
+
+def contents(model):
+    return [model.route(row) for row in range(model.rowCount())]
+
+
+def test_refresh_signals_only_what_changed(model):
+    model.update([route(number) for number in range(10)])
+    model.signals.clear()
+
+    new = [route(number) for number in (0, 1, 4, 5, 6, 9)] + [route(20), route(21)]
+    new[3][4] = "99"  # 10.0.5.0
+    assert model.update(new) == {'added': 2, 'removed': 4, 'changed': 1}
+    # Removals from the bottom up, one per contiguous run, then the metric cell, then one insert
+    assert model.signals == [("removed", 7, 8), ("removed", 2, 3), ("changed", 3, 4), ("inserted", 6, 7)]
+    assert contents(model) == new
+
+    model.signals.clear()
+    assert model.update(new) == {'added': 0, 'removed': 0, 'changed': 0}
+    assert model.signals == []
+
+
+def test_matches_the_new_table_after_random_refreshes(model):
+    generator = random.Random(11)
+    for _ in range(50):
+        new = [route(number, generator.choice([25, 35])) for number in generator.sample(range(60), 30)]
+        model.update(new)
+        assert sorted(contents(model)) == sorted(new)
+        assert model.rows == {tuple(row[:4]): index for index, row in enumerate(contents(model))}
+
+
+def test_edits_stay_apart_from_the_loaded_route(model):
+    model.update([route(1), route(2)])
+    model.setData(model.index(0, 4), " 45 ")
+    assert model.route(0) == route(1)
+    assert model.edited_route(0) == route(1, 45)
+
+    # A refresh that does not touch the route keeps the edit; one that applies it drops it
+    model.update([route(1), route(2), route(3)])
+    assert model.edited_route(0) == route(1, 45)
+    model.update([route(1, 45), route(2), route(3)])
+    assert model.edits == {}
+
+    model.setData(model.index(1, 2), "192.168.1.254")
+    model.update([route(1, 45), route(3)])
+    assert model.edits == {}
@@ -0,0 +1,46 @@
+import pytest
+
+from core import route_modify
+from fakes import RouteTableBackend
+
+KEY = ("10.20.0.0", "255.255.0.0", "10.0.0.1", "10.0.0.10")
+
+
+@pytest.fixture
+def backend():
+    backend = RouteTableBackend()
+    backend.routes[KEY] = 10  # Shown as 35 behind the interface metric of 25
+    return backend
+
+
+def test_metric_change_is_made_in_place(backend):
+    result = route_modify(backend, list(KEY) + ["35"], list(KEY) + ["45"])
+    assert result['method'] == "in place"
+    assert backend.scripts == [[
+        'interface ipv4 set route prefix=10.20.0.0/16 interface="Ethernet" nexthop=10.0.0.1 metric=20 store=active']]
+    assert backend.routes[KEY] == 20
+
+
+def test_gateway_change_adds_before_deleting(backend):
+    new = ["10.20.0.0", "255.255.0.0", "10.0.0.2", "10.0.0.10", "35"]
+    assert route_modify(backend, list(KEY) + ["35"], new)['method'] == "make-before-break"
+    assert [line.split()[2] for line in backend.scripts[0]] == ["add", "delete"]
+    assert KEY not in backend.routes
+    assert [row for row in backend.get_routing_table() if row[2] == "10.0.0.2"] == [new]
+
+
+def test_metric_below_the_interface_metric_converges(backend):
+    route_modify(backend, list(KEY) + ["35"], list(KEY) + ["5"])
+    assert backend.routes[KEY] == 0
+
+
+@pytest.mark.parametrize("route_metric, current, new", [
+    (10, "35", "35"),  # Nothing edited
+    (10, "35", ""),  # No metric to set
+    (0, "25", "20"),  # Already at the lowest metric the interface allows
+])
+def test_change_that_leaves_the_route_as_it_is_is_rejected(backend, route_metric, current, new):
+    backend.routes[KEY] = route_metric
+    with pytest.raises(ValueError, match="unchanged"):
+        route_modify(backend, list(KEY) + [current], list(KEY) + [new])
+    assert backend.scripts == []
@@ -0,0 +1,71 @@
+import threading
+import time
+
+from core import FakeRouteSource, PollingRouteSource
+
+
+class Counter:
+    def __init__(self):
+        self.count = 0
+        self.changed = threading.Event()
+
+    def __call__(self):
+        self.count += 1
+        self.changed.set()
+
+
+def test_polling_reports_a_change_once_and_nothing_while_the_table_is_still():
+    table = [["0.0.0.0", "0.0.0.0", "10.0.0.1", "10.0.0.10", "25"]]
+    reads = []
+
+    def fetch():
+        reads.append(1)
+        return [list(row) for row in table]
+
+    events = Counter()
+    source = PollingRouteSource(fetch, interval=0.01)
+    source.start(events)
+    try:
+        while len(reads) < 5:
+            time.sleep(0.01)
+        assert events.count == 0
+
+        table.append(["10.1.0.0", "255.255.0.0", "10.0.0.1", "10.0.0.10", "35"])
+        assert events.changed.wait(2)
+        read = len(reads)
+        while len(reads) < read + 5:
+            time.sleep(0.01)
+        assert events.count == 1
+    finally:
+        source.stop()
+    assert source._thread is None
+
+
+def test_polling_keeps_going_when_a_read_fails():
+    answers = iter([[["a"]], OSError("route print failed"), [["a"]], [["b"]]])
+
+    def fetch():
+        answer = next(answers, [["b"]])
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    events = Counter()
+    source = PollingRouteSource(fetch, interval=0.01)
+    source.start(events)
+    try:
+        assert events.changed.wait(2)
+    finally:
+        source.stop()
+    assert events.count == 1
+
+
+def test_fake_source_fires_into_the_started_callback_only():
+    events = Counter()
+    source = FakeRouteSource()
+    source.fire()
+    source.start(events)
+    source.fire(3)
+    source.stop()
+    source.fire()
+    assert events.count == 3
@@ -0,0 +1,82 @@
+import os
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("PyQt5")
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtWidgets import QApplication
+
+import main
+from core import FakeRouteSource
+from main import RouteWatcher
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def watcher(app, monkeypatch):
+    monkeypatch.setattr(main, "ROUTE_WATCH_DEBOUNCE_MS", 50)
+    monkeypatch.setattr(main, "ROUTE_WATCH_MAX_DELAY_MS", 420)
+    watcher = RouteWatcher(FakeRouteSource())
+    watcher.changes = []
+    watcher.routes_changed.connect(watcher.changes.append)
+    watcher.start()
+    yield watcher
+    watcher.stop()
+
+
+def pump(app, seconds):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.005)
+
+
+def test_a_burst_from_another_thread_becomes_one_refresh(app, watcher):
+    thread = threading.Thread(target=watcher.source.fire, args=(200,))
+    thread.start()
+    thread.join()
+    pump(app, 0.3)
+    assert watcher.changes == [200]
+
+    # A later burst is a refresh of its own
+    watcher.source.fire(5)
+    pump(app, 0.3)
+    assert watcher.changes == [200, 5]
+
+
+def test_a_flapping_route_still_refreshes_by_the_max_delay(app, watcher):
+    started = time.monotonic()
+    while time.monotonic() - started < 0.7:
+        watcher.source.fire()
+        pump(app, 0.02)
+    pump(app, 0.2)
+    # Events never stop for the debounce interval, so only the max delay lets refreshes through
+    assert 1 <= len(watcher.changes) <= 3
+    assert sum(watcher.changes) > 20
+
+    # The burst cut short by the max delay leaves the debounce as it was
+    watcher.changes.clear()
+    for _ in range(10):
+        watcher.source.fire()
+        pump(app, 0.02)
+        assert watcher.timer.interval() == main.ROUTE_WATCH_DEBOUNCE_MS
+    pump(app, 0.2)
+    assert watcher.changes == [10]
+
+
+def test_stop_drops_events_that_have_not_been_reported(app, watcher):
+    watcher.source.fire(3)
+    watcher.stop()
+    pump(app, 0.2)
+    assert watcher.changes == []
+    watcher.start()
+    watcher.source.fire()
+    pump(app, 0.2)
+    assert watcher.changes == [1]
@@ -0,0 +1,47 @@
+import time
+
+import pytest
+
+from fleet import FakeTransport, RemoteBackend
+from snapshots import capture_snapshot, diff_count, diff_snapshots, load_snapshot, restore_snapshot, save_snapshot
+
+
+@pytest.fixture
+def host():
+    transport = FakeTransport(["host1"], latency=0, connect_latency=0, static_routes=3)
+    return transport.hosts["host1"], RemoteBackend("host1", transport.connect("host1"), time.monotonic() + 60)
+
+
+def test_snapshot_records_interface_metrics(host, tmp_path):
+    fake, backend = host
+    snapshot = capture_snapshot(backend)
+    assert {name: details['Interface Metric'] for name, details in snapshot.nics.items()} == {
+        "Ethernet": "25", "Ethernet 2": "35"}
+    # Route metrics are shown with the interface metric added
+    assert sorted(int(row[4]) for row in snapshot.routes if row[2] == fake.nics["Ethernet"]['gateway']) == [
+        25, 35, 35, 35]
+
+    path = str(tmp_path / "snapshot.json.gz")
+    save_snapshot(snapshot, path)
+    assert diff_count(diff_snapshots(snapshot, load_snapshot(path))) == 0
+
+
+def test_restore_puts_route_metrics_back_and_converges(host):
+    fake, backend = host
+    target = capture_snapshot(backend)
+    ethernet = fake.nics["Ethernet"]
+    keys = sorted(fake.routes)
+    fake.routes[keys[0]] = 99
+    del fake.routes[keys[1]]
+    fake.routes[("10.99.0.0", "255.255.0.0", ethernet['gateway'], ethernet['ip'])] = 5
+    ethernet['mtu'] = 1400
+
+    result = restore_snapshot(backend, target)
+    assert result['error'] is None and result['skipped'] == []
+    assert len(result['lines']) == 4
+    assert result['remaining'] == []
+    assert fake.routes[keys[0]] == fake.routes[keys[1]] == 10
+    assert diff_count(diff_snapshots(target, capture_snapshot(backend))) == 0
+
+    # Nothing is left to do on a second run
+    assert restore_snapshot(backend, target)['lines'] == []